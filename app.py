@@ -5,14 +5,18 @@ Simplified single-page flow
 import streamlit as st
 from trending_finder import TrendingFinder
 from post_generator import PostGenerator
-from linkedin_poster import LinkedInPoster
+from jobs import JobExecutor, SUCCEEDED, FAILED
+from similarity_index import record_post
+from local_llm import local_llm_enabled
+from models import Topic
 import time
-import requests
+import uuid
 from datetime import datetime
 
 
 def apply_custom_prompt_with_llm(original_post: str, custom_prompt: str, groq_key: str = "", together_key: str = "", hf_key: str = "") -> str:
     """Apply custom prompt to modify a post using LLM"""
+    from post_generator import get_http_session
     try:
         # Create modification prompt
         modification_prompt = f"""Original LinkedIn Post:
@@ -50,7 +54,7 @@ Modified Post:"""
                     "temperature": 0.7,
                     "max_tokens": 500
                 }
-                response = requests.post(
+                response = get_http_session().post(
                     "https://api.groq.com/openai/v1/chat/completions",
                     headers=headers,
                     json=payload,
@@ -96,7 +100,7 @@ Modified Post:"""
                     "temperature": 0.7,
                     "max_tokens": 500
                 }
-                response = requests.post(
+                response = get_http_session().post(
                     "https://api.together.xyz/v1/chat/completions",
                     headers=headers,
                     json=payload,
@@ -138,6 +142,8 @@ if 'current_post' not in st.session_state:
     st.session_state.current_post = None
 if 'current_topic' not in st.session_state:
     st.session_state.current_topic = None
+if 'current_provider' not in st.session_state:
+    st.session_state.current_provider = None
 if 'topics' not in st.session_state:
     st.session_state.topics = []
 if 'selected_topic_idx' not in st.session_state:
@@ -154,14 +160,73 @@ if 'hf_api_key' not in st.session_state:
 # Track modifications
 if 'modification_count' not in st.session_state:
     st.session_state.modification_count = 0
+# Background jobs started by this session (results live in the shared executor)
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex[:8]
+if 'generation_job_id' not in st.session_state:
+    st.session_state.generation_job_id = None
+if 'publish_job_id' not in st.session_state:
+    st.session_state.publish_job_id = None
 
 # Initialize components
 @st.cache_resource
 def get_finder():
     return TrendingFinder()
 
-def get_generator(use_llm=False):
-    return PostGenerator(use_llm=use_llm)
+@st.cache_resource(max_entries=16)
+def get_generator(use_llm=False, groq_key="", together_key="", hf_key=""):
+    """Shared generator per key set - survives reruns, rebuilt only when keys change"""
+    generator = PostGenerator(use_llm=use_llm)
+    generator.groq_api_key = groq_key
+    generator.together_api_key = together_key
+    generator.hf_api_key = hf_key
+    return generator
+
+@st.cache_resource
+def get_job_executor():
+    """One worker pool per server process, shared by all sessions"""
+    return JobExecutor(max_workers=4)
+
+def run_generation_job(job, generator, topic):
+    job.update("🤖 Generating AI-powered post..." if generator.use_llm else "Generating post...")
+    # The generator is shared by every session and worker, so take the provider from this call
+    return generator.generate_post_with_provider(topic)
+
+def run_publish_job(job, email, password, content, lean):
+    from linkedin_poster import LinkedInPoster
+    job.update("Launching browser...")
+    poster = LinkedInPoster(profile="lean" if lean else None)
+    poster.email = email
+    poster.password = password
+    try:
+        poster.setup_driver()
+        job.update("Logging in to LinkedIn...")
+        if not poster.login():
+            raise RuntimeError("Login failed. Please check your credentials.")
+        job.update("Publishing post...")
+        if not poster.post_content(content, automated=True):
+            raise RuntimeError("Failed to post. Please check the terminal logs for details.")
+        record_post(content, kind="posted")
+        return True
+    finally:
+        poster.close()
+
+def start_generation(topic):
+    """Queue post generation for a topic dict using the current AI settings"""
+    use_llm = st.session_state.get('use_llm', False)
+    groq_key = st.session_state.get('groq_api_key', '')
+    together_key = st.session_state.get('together_api_key', '')
+    hf_key = st.session_state.get('hf_api_key', '')
+    
+    if use_llm and (groq_key or together_key or hf_key or local_llm_enabled()):
+        generator = get_generator(True, groq_key, together_key, hf_key)
+    else:
+        generator = get_generator(False)
+    
+    st.session_state.generation_job_id = get_job_executor().submit(
+        "generate", run_generation_job, generator, topic,
+        description=topic.get('title', ''), owner=st.session_state.session_id
+    )
 
 # Clean, Professional CSS Styling
 st.markdown("""
@@ -361,6 +426,8 @@ with st.sidebar:
     st.markdown("### Settings")
     topics_count = st.slider("Number of topics to fetch", 1, 10, 5)
     headless_mode = st.checkbox("Headless Browser Mode", value=False, help="Run browser in background")
+    lean_browser = st.checkbox("Lean Browser Profile", value=False,
+                               help="Low-memory headless Chrome (no images/fonts/media) for automated posting")
     
     st.markdown("---")
     st.markdown("### 🤖 AI Generation (Free LLM APIs)")
@@ -443,6 +510,16 @@ with st.sidebar:
             st.success(f"💾 Your API keys are saved: {', '.join(saved_keys)}. Toggle ON to use them.")
         st.session_state['use_llm'] = False
     
+    my_jobs = get_job_executor().list_jobs(owner=st.session_state.session_id)
+    if my_jobs:
+        st.markdown("---")
+        st.markdown("### ⏳ Background Jobs")
+        for job in my_jobs[:5]:
+            icon = {"queued": "🕒", "running": "🔄", "succeeded": "✅", "failed": "❌"}[job.status]
+            label = job.description[:40] or job.kind
+            detail = job.progress if not job.done else (job.error or "done")
+            st.caption(f"{icon} **{job.kind}** · {label} · {detail} ({job.elapsed():.0f}s)")
+    
     st.markdown("---")
     st.markdown("### About")
     st.info("""
@@ -464,13 +541,18 @@ col1, col2 = st.columns(2)
 
 with col1:
     st.markdown("#### 📊 Option 1: Find Trending Topics")
+    bypass_cache = st.checkbox("Bypass cache (fetch fresh)", value=False,
+                               help="Trending results are shared across sessions for a few minutes")
     if st.button("🔍 Find Trending Topics", type="primary", use_container_width=True):
         with st.spinner("Fetching trending topics from various sources..."):
             finder = get_finder()
-            st.session_state.topics = finder.get_trending_topics(limit=topics_count)
+            st.session_state.topics = finder.get_cached_trending_topics(limit=topics_count, force_refresh=bypass_cache)
         
         if st.session_state.topics:
             st.success(f"✅ Found {len(st.session_state.topics)} trending topics!")
+            cache_age = finder.cache_age(limit=topics_count)
+            if cache_age is not None and cache_age >= 1:
+                st.caption(f"🕒 Cached result from {int(cache_age)}s ago")
             st.session_state.selected_topic_idx = 0  # Auto-select first topic
 
 with col2:
@@ -486,49 +568,10 @@ with col2:
         manual_topic_value = st.session_state.get('manual_topic_input', '')
         
         if manual_topic_value:
-            manual_topic_dict = {
-                "title": manual_topic_value,
-                "description": "",
-                "url": "",
-                "source": "manual",
-                "timestamp": "manual"
-            }
-            
-            use_llm = st.session_state.get('use_llm', False)
-            groq_key = st.session_state.get('groq_api_key', '')
-            together_key = st.session_state.get('together_api_key', '')
-            hf_key = st.session_state.get('hf_api_key', '')
+            manual_topic = Topic(title=manual_topic_value, description="", url="", source="manual",
+                                 timestamp="manual")
             
-            if use_llm and (groq_key or together_key or hf_key):
-                with st.spinner("🤖 Generating AI-powered post..."):
-                    import os
-                    if groq_key:
-                        os.environ['GROQ_API_KEY'] = groq_key
-                    if together_key:
-                        os.environ['TOGETHER_API_KEY'] = together_key
-                    if hf_key:
-                        os.environ['HF_API_KEY'] = hf_key
-                    
-                    generator = PostGenerator(use_llm=True)
-                    generator.groq_api_key = groq_key
-                    generator.together_api_key = together_key
-                    generator.hf_api_key = hf_key
-                    
-                    generated_post = generator.generate_post(manual_topic_dict)
-                    st.session_state.current_post = generated_post
-                    st.session_state.current_topic = manual_topic_value
-                    st.session_state.modification_count = 0
-                    st.success("✅ Post generated!")
-                    st.rerun()
-            else:
-                with st.spinner("Generating post..."):
-                    generator = PostGenerator(use_llm=False)
-                    generated_post = generator.generate_post(manual_topic_dict)
-                    st.session_state.current_post = generated_post
-                    st.session_state.current_topic = manual_topic_value
-                    st.session_state.modification_count = 0
-                    st.success("✅ Post generated!")
-                    st.rerun()
+            start_generation(manual_topic)
         else:
             st.warning("⚠️ Please enter a topic first")
 
@@ -548,42 +591,25 @@ if st.session_state.topics:
     
     if st.button("✍️ Generate Post from Selected Topic", type="primary", use_container_width=True):
         selected_topic = st.session_state.topics[selected_idx]
-        
-        use_llm = st.session_state.get('use_llm', False)
-        groq_key = st.session_state.get('groq_api_key', '')
-        together_key = st.session_state.get('together_api_key', '')
-        hf_key = st.session_state.get('hf_api_key', '')
-        
-        if use_llm and (groq_key or together_key or hf_key):
-            with st.spinner("🤖 Generating AI-powered post..."):
-                import os
-                if groq_key:
-                    os.environ['GROQ_API_KEY'] = groq_key
-                if together_key:
-                    os.environ['TOGETHER_API_KEY'] = together_key
-                if hf_key:
-                    os.environ['HF_API_KEY'] = hf_key
-                
-                generator = PostGenerator(use_llm=True)
-                generator.groq_api_key = groq_key
-                generator.together_api_key = together_key
-                generator.hf_api_key = hf_key
-                
-                generated_post = generator.generate_post(selected_topic)
-                st.session_state.current_post = generated_post
-                st.session_state.current_topic = selected_topic.get('title', '')
-                st.session_state.modification_count = 0
-                st.success("✅ Post generated!")
-                st.rerun()
-        else:
-            with st.spinner("Generating post..."):
-                generator = PostGenerator(use_llm=False)
-                generated_post = generator.generate_post(selected_topic)
-                st.session_state.current_post = generated_post
-                st.session_state.current_topic = selected_topic.get('title', '')
-                st.session_state.modification_count = 0
-                st.success("✅ Post generated!")
-                st.rerun()
+        start_generation(selected_topic)
+
+# Pick up the result of this session's generation job
+if st.session_state.generation_job_id:
+    generation_job = get_job_executor().get(st.session_state.generation_job_id)
+    if generation_job is None:
+        st.session_state.generation_job_id = None
+    elif generation_job.status == SUCCEEDED:
+        st.session_state.current_post, st.session_state.current_provider = generation_job.result
+        st.session_state.current_topic = generation_job.description
+        st.session_state.modification_count = 0
+        st.session_state.generation_job_id = None
+        st.session_state.publish_job_id = None
+        st.success("✅ Post generated!")
+    elif generation_job.status == FAILED:
+        st.session_state.generation_job_id = None
+        st.error(f"❌ Generation failed: {generation_job.error}")
+    else:
+        st.info(f"⏳ {generation_job.progress or 'Waiting for a worker...'} ({generation_job.elapsed():.0f}s)")
 
 # Step 2: Show generated post and editing options
 if st.session_state.current_post:
@@ -727,13 +753,9 @@ if st.session_state.current_post:
             
             if st.button("📅 Schedule Post", type="primary", use_container_width=True):
                 try:
-                    from scheduler import PostScheduler
-                    
-                    # Initialize scheduler
-                    if 'post_scheduler' not in st.session_state:
-                        st.session_state.post_scheduler = PostScheduler()
-                    
-                    scheduler = st.session_state.post_scheduler
+                    # One scheduler per server process, shared by every session
+                    from scheduler import get_scheduler
+                    scheduler = get_scheduler()
                     
                     # Combine date and time
                     scheduled_datetime = datetime.combine(schedule_date, schedule_time)
@@ -747,7 +769,9 @@ if st.session_state.current_post:
                         post_content=post_content,
                         schedule_time=schedule_time_str,
                         topic=topic,
-                        use_llm=use_llm_for_scheduled
+                        use_llm=use_llm_for_scheduled,
+                        generate_from_trending=generate_from_trending,
+                        provider=st.session_state.current_provider if not generate_from_trending else None
                     )
                     
                     if success:
@@ -769,70 +793,140 @@ if st.session_state.current_post:
             st.markdown("---")
             st.markdown("#### 📋 Scheduled Posts")
             
-            if 'post_scheduler' in st.session_state:
-                scheduler = st.session_state.post_scheduler
-                scheduled_posts = scheduler.get_scheduled_posts()
-                
-                if scheduled_posts:
-                    for post in scheduled_posts:
-                        with st.expander(f"📅 {post['scheduled_time']} - {post.get('topic', 'No topic')[:50]}"):
-                            col1, col2 = st.columns([3, 1])
-                            with col1:
-                                st.text_area("Content", post.get('content', 'No content yet'), height=100, disabled=True, key=f"scheduled_{post['id']}")
-                            with col2:
-                                st.write(f"**Status:** {post.get('status', 'scheduled')}")
-                                if st.button("🗑️ Remove", key=f"remove_{post['id']}"):
-                                    scheduler.remove_scheduled_post(post['id'])
-                                    st.rerun()
+            from scheduler import get_scheduler
+            scheduler = get_scheduler()
+            scheduled_posts = scheduler.get_scheduled_posts()
+            
+            if scheduled_posts:
+                for post in scheduled_posts:
+                    with st.expander(f"📅 {post['scheduled_time']} - {post.get('topic', 'No topic')[:50]}"):
+                        col1, col2 = st.columns([3, 1])
+                        with col1:
+                            st.text_area("Content", post.get('content', 'No content yet'), height=100, disabled=True, key=f"scheduled_{post['id']}")
+                        with col2:
+                            st.write(f"**Status:** {post.get('status', 'scheduled')}")
+                            if st.button("🗑️ Remove", key=f"remove_{post['id']}"):
+                                scheduler.remove_scheduled_post(post['id'])
+                                st.rerun()
+            else:
+                st.info("No scheduled posts. Schedule one above!")
+            
+            failed_posts = scheduler.get_failed_posts()
+            if failed_posts:
+                st.markdown("#### ⚠️ Retries & Failed Posts")
+                for post in failed_posts:
+                    col1, col2 = st.columns([3, 1])
+                    with col1:
+                        when = f" · next try {post['next_attempt_at']}" if post.get('status') == 'retrying' else ""
+                        st.write(f"**{post.get('status')}** · {post.get('topic') or post['id']} · "
+                                 f"{post.get('attempts', 0)} attempt(s) · {post.get('error_class', '')}: {post.get('error', '')}{when}")
+                    with col2:
+                        if st.button("🔁 Retry now", key=f"retry_{post['id']}"):
+                            scheduler.retry_post_now(post['id'])
+                            if not scheduler.running:
+                                scheduler.start_scheduler()
+                            st.rerun()
+            
+            import config
+            if config.POST_ARCHIVE_DIR:
+                with st.expander("🗄️ Post history (archived)"):
+                    from post_archive import get_post_archive
+                    history = get_post_archive().summary()
+                    latency = history["median_publish_latency"]
+                    col1, col2 = st.columns(2)
+                    col1.metric("Archived posts", history["archived"])
+                    col2.metric("Median publish latency", f"{latency / 60:.1f} min" if latency is not None else "-")
+                    if history["posts_per_day"]:
+                        st.bar_chart(history["posts_per_day"])
+                    for provider, stats in history["failure_rate_by_provider"].items():
+                        st.write(f"**{provider}**: {stats['failed']}/{stats['total']} failed "
+                                 f"({stats['failure_rate']:.0%})")
+            
+            # Recurring rules
+            st.markdown("#### 🔁 Recurring Posts")
+            col_rec1, col_rec2 = st.columns(2)
+            with col_rec1:
+                cron_expr = st.text_input("Cron expression", value="0 9 * * mon-fri",
+                                          help="minute hour day month weekday, e.g. '30 9 * * mon,wed,fri' or '@daily'")
+                rule_timezone = st.text_input("Timezone", value=config.SCHEDULE_TIMEZONE,
+                                              placeholder="Europe/Berlin (empty = server local time)")
+            with col_rec2:
+                jitter_minutes = st.number_input("Jitter (minutes)", min_value=0, max_value=120, value=0,
+                                                 help="Publish at a random time up to this many minutes after each slot")
+                catch_up = st.selectbox("After downtime", ["skip", "latest", "all"],
+                                        index=["skip", "latest", "all"].index(config.RECURRING_CATCH_UP)
+                                        if config.RECURRING_CATCH_UP in ("skip", "latest", "all") else 0,
+                                        help="What to do with slots missed while the scheduler was not running")
+            
+            if st.button("🔁 Add Recurring Post", use_container_width=True):
+                rule_id = scheduler.add_recurring_rule(
+                    cron_expr,
+                    topic=st.session_state.current_topic if not generate_from_trending else "",
+                    use_llm=use_llm_for_scheduled,
+                    generate_from_trending=generate_from_trending,
+                    timezone=rule_timezone.strip(),
+                    jitter_minutes=jitter_minutes,
+                    catch_up=catch_up
+                )
+                if rule_id:
+                    st.success("✅ Recurring post added. A fresh post is generated for every slot.")
+                    if not scheduler.running:
+                        scheduler.start_scheduler()
                 else:
-                    st.info("No scheduled posts. Schedule one above!")
+                    st.error("❌ Invalid cron expression or timezone")
+            
+            for rule in scheduler.get_recurring_rules():
+                col1, col2 = st.columns([3, 1])
+                with col1:
+                    label = "Trending topic" if rule.get('generate_from_trending') else (rule.get('topic') or 'No topic')[:50]
+                    st.write(f"`{rule['cron']}` {rule.get('timezone') or ''} · {label} · next: {rule.get('next_post') or '-'}")
+                with col2:
+                    if st.button("🗑️ Remove", key=f"remove_rule_{rule['id']}"):
+                        scheduler.remove_recurring_rule(rule['id'])
+                        st.rerun()
         
         elif posting_mode == "Fully Automated":
             # Fully automated posting
             st.info("🤖 **Automated Mode:** The bot will automatically post to LinkedIn without manual confirmation.")
             
-            if st.button("🚀 Post Now (Automated)", type="primary", use_container_width=True):
-                with st.spinner("Posting to LinkedIn automatically..."):
-                    try:
-                        # Update config with credentials
-                        import config
-                        import os
-                        os.environ['LINKEDIN_EMAIL'] = linkedin_email
-                        os.environ['LINKEDIN_PASSWORD'] = linkedin_password
-                        os.environ['HEADLESS_MODE'] = str(headless_mode)
-                        
-                        # Reload config
-                        import importlib
-                        importlib.reload(config)
-                        
-                        # Create poster instance
-                        poster = LinkedInPoster()
-                        poster.email = linkedin_email
-                        poster.password = linkedin_password
-                        poster.setup_driver()
-                        
-                        if poster.login():
-                            if poster.post_content(st.session_state.current_post, automated=True):
-                                st.success("✅ Post published successfully!")
-                                st.balloons()
-                                
-                                # Option to create new post
-                                if st.button("🔄 Create New Post", key="new_post_auto", use_container_width=True):
-                                    st.session_state.current_post = None
-                                    st.session_state.current_topic = None
-                                    st.session_state.modification_count = 0
-                                    st.rerun()
-                            else:
-                                st.error("❌ Failed to post. Please check the terminal logs for details.")
-                        else:
-                            st.error("❌ Login failed. Please check your credentials.")
-                        
-                        poster.close()
-                        
-                    except Exception as e:
-                        st.error(f"❌ Error: {str(e)}")
-                        import traceback
-                        st.code(traceback.format_exc())
+            publish_job = get_job_executor().get(st.session_state.publish_job_id) if st.session_state.publish_job_id else None
+            publishing = publish_job is not None and not publish_job.done
+            
+            if st.button("🚀 Post Now (Automated)", type="primary", use_container_width=True, disabled=publishing):
+                # Update config with credentials
+                import config
+                import os
+                os.environ['LINKEDIN_EMAIL'] = linkedin_email
+                os.environ['LINKEDIN_PASSWORD'] = linkedin_password
+                os.environ['HEADLESS_MODE'] = str(headless_mode)
+                
+                # Reload config
+                import importlib
+                importlib.reload(config)
+                
+                st.session_state.publish_job_id = get_job_executor().submit(
+                    "publish", run_publish_job, linkedin_email, linkedin_password,
+                    st.session_state.current_post, lean_browser,
+                    description=st.session_state.current_topic or "", owner=st.session_state.session_id
+                )
+                st.rerun()
+            
+            if publish_job is not None:
+                if not publish_job.done:
+                    st.info(f"⏳ {publish_job.progress or 'Waiting for a worker...'} ({publish_job.elapsed():.0f}s)")
+                elif publish_job.status == SUCCEEDED:
+                    st.success("✅ Post published successfully!")
+                    
+                    # Option to create new post
+                    if st.button("🔄 Create New Post", key="new_post_auto", use_container_width=True):
+                        st.session_state.current_post = None
+                        st.session_state.current_topic = None
+                        st.session_state.current_provider = None
+                        st.session_state.modification_count = 0
+                        st.session_state.publish_job_id = None
+                        st.rerun()
+                else:
+                    st.error(f"❌ {publish_job.error}")
         
         else:  # Manual Confirmation
             # Manual confirmation interface
@@ -874,6 +968,7 @@ if st.session_state.current_post:
                             importlib.reload(config)
                             
                             # Create a new poster instance with updated config
+                            from linkedin_poster import LinkedInPoster
                             poster = LinkedInPoster()
                             poster.email = linkedin_email
                             poster.password = linkedin_password
@@ -906,6 +1001,7 @@ if st.session_state.current_post:
                                         if st.button("🔄 Create New Post", key="new_post_btn", use_container_width=True):
                                             st.session_state.current_post = None
                                             st.session_state.current_topic = None
+                                            st.session_state.current_provider = None
                                             st.session_state.modification_count = 0
                                             st.rerun()
                                 else:
@@ -954,3 +1050,8 @@ st.markdown("""
     </p>
 </div>
 """, unsafe_allow_html=True)
+
+# Poll while this session has work in flight so results show up without a click
+if get_job_executor().list_jobs(owner=st.session_state.session_id, active_only=True):
+    time.sleep(1.5)
+    st.rerun()
@@ -0,0 +1,485 @@
+"""
+Offline benchmark suite
+
+Replays recorded fixtures (Reddit JSON, RSS XML, Groq/Together/Hugging Face
+responses) through a local stub server with configurable injected latency,
+and measures latency/throughput of trending fetch, draft generation, post
+formatting, the scheduler loop and schedule record reads/scans, plus cold import time of the entry modules (parsed from
+`python -X importtime` in fresh interpreters). Results are saved as JSON for
+regression comparison.
+
+Usage:
+    python benchmark.py
+    python benchmark.py --llm-latency-ms 300 --feed-latency-ms 50
+    python benchmark.py --baseline benchmark_results/<previous>.json
+    python benchmark.py --import-report cli
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List
+from rich.console import Console
+from rich.table import Table
+import config
+import hashtag_index
+import rate_limiter
+from trending_finder import TrendingFinder
+from post_generator import PostGenerator
+from scheduler import PostScheduler
+from models import ScheduledPost
+from schedule_store import ScheduleStore
+
+console = Console()
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+RESULTS_DIR = "benchmark_results"
+IMPORT_MODULES = ["cli", "scheduler", "trending_finder", "post_generator", "linkedin_poster"]
+
+
+class FixtureServer:
+    """Local HTTP server that replays recorded responses with injected latency"""
+
+    # (method, path prefix, fixture file, content type, latency group)
+    ROUTES = [
+        ("GET", "/r/", "reddit_hot.json", "application/json", "feed"),
+        ("GET", "/feeds/", "rss_feed.xml", "application/rss+xml", "feed"),
+        ("POST", "/groq/", "groq_chat.json", "application/json", "llm"),
+        ("POST", "/together/", "together_chat.json", "application/json", "llm"),
+        ("POST", "/hf/", "hf_generate.json", "application/json", "llm"),
+    ]
+    # Multi-topic chat prompts (they ask for {"posts": [...]}) get a recorded batch response
+    BATCH_FIXTURE = "chat_batch.json"
+
+    def __init__(self, latency_ms: Dict[str, float] = None, fixtures_dir: str = FIXTURES_DIR):
+        self.latency_ms = {"feed": 0.0, "llm": 0.0}
+        self.latency_ms.update(latency_ms or {})
+        self.fixtures = {}
+        for name in [route[2] for route in self.ROUTES] + [self.BATCH_FIXTURE]:
+            with open(os.path.join(fixtures_dir, name), 'rb') as f:
+                self.fixtures[name] = f.read()
+        self.request_count = 0
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> str:
+        """Start serving on a free local port and return the base URL"""
+        fixture_server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _respond(self, method):
+                route = fixture_server._match(method, self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                request_body = self.rfile.read(length) if length else b""
+                if route is None:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                _, _, name, content_type, group = route
+                delay = fixture_server.latency_ms.get(group, 0)
+                if delay:
+                    time.sleep(delay / 1000.0)
+                if fixture_server._is_batch(route, request_body):
+                    name = fixture_server.BATCH_FIXTURE
+                body = fixture_server.fixtures[name]
+                with fixture_server._lock:
+                    fixture_server.request_count += 1
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                self._respond("GET")
+
+            def do_POST(self):
+                self._respond("POST")
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self.base_url
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def _is_batch(self, route, request_body: bytes) -> bool:
+        if route[1] not in ("/groq/", "/together/"):
+            return False
+        try:
+            messages = json.loads(request_body).get("messages", [])
+            return '"posts"' in messages[-1].get("content", "")
+        except (ValueError, AttributeError, IndexError):
+            return False
+
+    def _match(self, method: str, path: str):
+        for route in self.ROUTES:
+            if route[0] == method and path.startswith(route[1]):
+                return route
+        return None
+
+
+def offline_finder(base_url: str) -> TrendingFinder:
+    """TrendingFinder wired to the fixture server"""
+    finder = TrendingFinder()
+    finder.sources = ["reddit", "rss"]
+    finder.reddit_base_url = base_url
+    finder.rss_feeds = [f"{base_url}/feeds/{name}.xml" for name in ("nytimes", "oreilly", "techcrunch")]
+    return finder
+
+
+def offline_generator(base_url: str, provider: str) -> PostGenerator:
+    """PostGenerator wired to the fixture server with a single provider enabled"""
+    # The stub server has no quota; keep the limiter from throttling the measurement
+    config.LLM_RATE_LIMITS = {name: {"rpm": 1e9} for name in ("groq", "together", "huggingface")}
+    rate_limiter.reset_limiters()
+    generator = PostGenerator(use_llm=provider != "template")
+    generator.groq_api_key = "bench" if provider == "groq" else ""
+    generator.together_api_key = "bench" if provider == "together" else ""
+    generator.hf_api_key = "bench" if provider == "huggingface" else ""
+    generator.groq_api_url = f"{base_url}/groq/openai/v1/chat/completions"
+    generator.together_api_url = f"{base_url}/together/v1/chat/completions"
+    generator.hf_router_url = f"{base_url}/hf"
+    generator.hf_models_url = f"{base_url}/hf/models"
+    return generator
+
+
+class OfflineScheduler(PostScheduler):
+    """Scheduler that generates through the fixture server instead of opening a browser"""
+
+    def __init__(self, generator: PostGenerator):
+        super().__init__()
+        self.generator = generator
+
+    def _make_generator(self, use_llm: bool) -> PostGenerator:
+        return self.generator
+
+    def _publish_batch(self, account: str, items: List) -> Dict[str, bool]:
+        for post_data, content in items:
+            self._update_post(post_data, content=content, status='posted',
+                              posted_at=datetime.now().strftime("%Y-%m-%d %H:%M:%S"), **self._generated_by(post_data))
+        return {post_data.get('id'): True for post_data, _ in items}
+
+
+def measure(func: Callable, iterations: int, warmup: int = 1, items_per_call: int = 1) -> Dict:
+    """Run func repeatedly and summarize latency and throughput"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(warmup):
+            func()
+        latencies = []
+        started = time.perf_counter()
+        for _ in range(iterations):
+            t0 = time.perf_counter()
+            func()
+            latencies.append((time.perf_counter() - t0) * 1000)
+        total = time.perf_counter() - started
+
+    latencies.sort()
+    p95_index = min(len(latencies) - 1, int(round(0.95 * (len(latencies) - 1))))
+    return {
+        "iterations": iterations,
+        "mean_ms": round(statistics.mean(latencies), 3),
+        "p50_ms": round(statistics.median(latencies), 3),
+        "p95_ms": round(latencies[p95_index], 3),
+        "min_ms": round(latencies[0], 3),
+        "max_ms": round(latencies[-1], 3),
+        "throughput_per_s": round(iterations * items_per_call / total, 3) if total else None
+    }
+
+
+def bench_trending(base_url: str, iterations: int, limit: int = 5) -> Dict:
+    finder = offline_finder(base_url)
+    return measure(lambda: finder.get_trending_topics(limit=limit, force_refresh=True), iterations)
+
+
+def bench_drafts(base_url: str, provider: str, iterations: int, count: int = 5) -> Dict:
+    finder = offline_finder(base_url)
+    with contextlib.redirect_stdout(io.StringIO()):
+        topics = finder.get_trending_topics(limit=count)
+    generator = offline_generator(base_url, provider)
+    return measure(lambda: generator.generate_multiple_drafts(topics, count=count), iterations,
+                   items_per_call=len(topics[:count]))
+
+
+def synthetic_generations(count: int, seed: int = 7) -> List:
+    """(generated_text, topic) pairs shaped like real LLM output, reproducible from seed"""
+    rng = random.Random(seed)
+    sentences = [
+        "Open-source models are closing the gap with proprietary ones.",
+        "Teams that write things down ship faster.",
+        "Cloud bills are the new technical debt.",
+        "Data quality beats model size",
+        "Here's my take on what it means for engineering leaders.",
+        "Most of the cost sits in the workflow around the model.",
+    ]
+    titles = ["AI startup raises new round", "Why data teams need product managers",
+              "Cloud strategy for a small business", "Leadership lessons from remote teams"]
+    pairs = []
+    for i in range(count):
+        body = " ".join(rng.choice(sentences) for _ in range(rng.randint(3, 12)))
+        if i % 4 == 0:
+            body = f"LinkedIn Post:\n\n{body}"
+        topic = {"title": rng.choice(titles), "source": "rss", "url": f"https://example.com/{i}" if i % 2 else ""}
+        pairs.append((body, topic))
+    return pairs
+
+
+def bench_formatter(iterations: int, posts: int = 2000) -> Dict:
+    """Format a large batch of synthetic generations (pure CPU, no I/O)"""
+    generator = PostGenerator()
+    pairs = synthetic_generations(posts)
+    random.seed(0)
+    return measure(lambda: [generator._format_generated_post(text, topic) for text, topic in pairs],
+                   iterations, items_per_call=posts)
+
+
+def bench_scheduler(base_url: str, iterations: int, posts: int = 200, due: int = 5) -> Dict:
+    """Time check_and_execute_posts over a schedule with a few due posts"""
+    generator = offline_generator(base_url, "groq")
+    original_dir = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            scheduler = OfflineScheduler(generator)
+            now = datetime.now()
+
+            def reset():
+                scheduler.scheduled_posts = []
+                for i in range(posts):
+                    when = now if i < due else now + timedelta(days=1, minutes=i)
+                    scheduler.scheduled_posts.append(ScheduledPost(
+                        id=f"post_{i}",
+                        content="",
+                        topic=f"Benchmark topic {i} about AI and cloud data",
+                        scheduled_time=when.strftime("%Y-%m-%d %H:%M:%S"),
+                        status="scheduled",
+                        use_llm=True,
+                        created_at=now.strftime("%Y-%m-%d %H:%M:%S")
+                    ))
+                scheduler.save_scheduled_posts()
+
+            def run():
+                reset()
+                scheduler.check_and_execute_posts()
+
+            result = measure(run, iterations, items_per_call=due)
+        finally:
+            os.chdir(original_dir)
+    result.update({"posts": posts, "due": due})
+    return result
+
+
+def bench_schedule_records(iterations: int, posts: int = 1000) -> Dict:
+    """Read a 1000-post schedule from the store and scan it the way the scheduler loop does"""
+    now = datetime.now()
+    statuses = ("scheduled", "posted", "retrying", "dead_letter")
+    with tempfile.TemporaryDirectory() as workdir:
+        store = ScheduleStore(os.path.join(workdir, "scheduled_posts.json"), record=ScheduledPost)
+        store.replace([ScheduledPost(id=f"post_{i}", content=f"Benchmark post {i} " * 20, topic=f"Topic {i}",
+                                     scheduled_time=(now + timedelta(minutes=i)).strftime("%Y-%m-%d %H:%M:%S"),
+                                     status=statuses[i % len(statuses)], use_llm=bool(i % 2),
+                                     created_at=now.strftime("%Y-%m-%d %H:%M:%S"))
+                       for i in range(posts)])
+        cutoff = now.strftime("%Y-%m-%d %H:%M:%S")
+
+        def run():
+            snapshot = store.read()
+            due = [p.id for p in snapshot if p.status == "scheduled" and p.scheduled_time <= cutoff]
+            failed = [p for p in snapshot if p.status in ("retrying", "dead_letter")]
+            return due, failed
+
+        result = measure(run, iterations, items_per_call=posts)
+    result["posts"] = posts
+    return result
+
+
+def import_times(module: str) -> List[Dict]:
+    """Import a module in a fresh interpreter and parse the -X importtime log"""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr else f"cannot import {module}")
+    entries = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        entries.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000
+        })
+    return entries
+
+
+def bench_import(module: str, runs: int) -> Dict:
+    """Cold import time of a module (cumulative, as reported by -X importtime)"""
+    samples = []
+    for _ in range(runs):
+        entries = import_times(module)
+        samples.append(next(e["cumulative_ms"] for e in entries if e["module"] == module and e["depth"] == 0))
+    samples.sort()
+    return {
+        "iterations": runs,
+        "mean_ms": round(statistics.mean(samples), 3),
+        "p50_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(samples[min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))], 3),
+        "min_ms": round(samples[0], 3),
+        "max_ms": round(samples[-1], 3),
+        "throughput_per_s": round(1000 / statistics.mean(samples), 3)
+    }
+
+
+def print_import_report(module: str, top: int = 15):
+    """Show the heaviest imports pulled in by a module"""
+    entries = import_times(module)
+    # Keep only the subtree of the target module (children are logged before their parent)
+    end = max(i for i, e in enumerate(entries) if e["module"] == module and e["depth"] == 0)
+    start = max([i for i, e in enumerate(entries[:end]) if e["depth"] == 0], default=-1) + 1
+    entries = entries[start:end + 1]
+    table = Table(title=f"📦 Import time for {module}", show_header=True, header_style="bold magenta")
+    table.add_column("Module", style="cyan")
+    table.add_column("self ms", justify="right")
+    table.add_column("cumulative ms", justify="right")
+    for entry in sorted(entries, key=lambda e: e["cumulative_ms"], reverse=True)[:top]:
+        table.add_row("  " * entry["depth"] + entry["module"], f"{entry['self_ms']:.1f}", f"{entry['cumulative_ms']:.1f}")
+    console.print(table)
+
+
+def run_suite(iterations: int, feed_latency_ms: float, llm_latency_ms: float, import_runs: int = 5) -> Dict:
+    # Keep fixture topics and drafts out of the real hashtag corpus and post history
+    config.HASHTAG_INDEX_FILE = ""
+    config.SIMILARITY_INDEX_PATH = ""
+    hashtag_index.reset_hashtag_index()
+    server = FixtureServer({"feed": feed_latency_ms, "llm": llm_latency_ms})
+    base_url = server.start()
+    try:
+        benchmarks = {"trending.get_trending_topics": bench_trending(base_url, iterations)}
+        for provider in ("template", "groq", "together", "huggingface"):
+            benchmarks[f"generator.generate_multiple_drafts.{provider}"] = bench_drafts(base_url, provider, iterations)
+        benchmarks["scheduler.check_and_execute_posts"] = bench_scheduler(base_url, iterations)
+        benchmarks["schedule_store.read_and_scan"] = bench_schedule_records(iterations)
+        benchmarks["generator.format_generated_post"] = bench_formatter(iterations)
+    finally:
+        server.stop()
+
+    if import_runs:
+        for module in IMPORT_MODULES:
+            try:
+                benchmarks[f"import.{module}"] = bench_import(module, import_runs)
+            except Exception as e:
+                console.print(f"[yellow]⚠️ Skipping import benchmark for {module}: {e}[/yellow]")
+
+    return {
+        "created_at": datetime.now().isoformat(),
+        "settings": {
+            "iterations": iterations,
+            "feed_latency_ms": feed_latency_ms,
+            "llm_latency_ms": llm_latency_ms,
+            "import_runs": import_runs
+        },
+        "stub_requests": server.request_count,
+        "benchmarks": benchmarks
+    }
+
+
+def compare_results(current: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Print a comparison table and return the names of regressed benchmarks"""
+    table = Table(title="📉 Comparison vs baseline (mean latency)", show_header=True, header_style="bold magenta")
+    table.add_column("Benchmark", style="cyan")
+    table.add_column("Baseline ms", justify="right")
+    table.add_column("Current ms", justify="right")
+    table.add_column("Change", justify="right")
+
+    regressions = []
+    for name, result in current["benchmarks"].items():
+        base = baseline.get("benchmarks", {}).get(name)
+        if not base:
+            table.add_row(name, "-", f"{result['mean_ms']:.2f}", "new")
+            continue
+        change = (result["mean_ms"] - base["mean_ms"]) / base["mean_ms"] * 100 if base["mean_ms"] else 0.0
+        style = "red" if change > threshold else ("green" if change < -threshold else "")
+        if change > threshold:
+            regressions.append(name)
+        table.add_row(name, f"{base['mean_ms']:.2f}", f"{result['mean_ms']:.2f}", f"[{style}]{change:+.1f}%[/{style}]" if style else f"{change:+.1f}%")
+
+    console.print(table)
+    return regressions
+
+
+def print_results(results: Dict):
+    table = Table(title="⏱️ Offline Benchmarks", show_header=True, header_style="bold magenta")
+    table.add_column("Benchmark", style="cyan")
+    for column in ("mean ms", "p50 ms", "p95 ms", "items/s"):
+        table.add_column(column, justify="right")
+    for name, result in results["benchmarks"].items():
+        table.add_row(name, f"{result['mean_ms']:.2f}", f"{result['p50_ms']:.2f}", f"{result['p95_ms']:.2f}",
+                      f"{result['throughput_per_s']:.1f}")
+    console.print(table)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the offline benchmark suite")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--feed-latency-ms", type=float, default=0.0, help="Injected latency for Reddit/RSS fixtures")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="Injected latency for LLM fixtures")
+    parser.add_argument("--output", help="Where to save results (default: benchmark_results/<timestamp>.json)")
+    parser.add_argument("--baseline", help="Previous results file to compare against")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Regression threshold in percent")
+    parser.add_argument("--import-runs", type=int, default=5, help="Fresh interpreters per import benchmark (0 to skip)")
+    parser.add_argument("--import-report", metavar="MODULE", help="Only print the heaviest imports of MODULE")
+    args = parser.parse_args()
+
+    if args.import_report:
+        print_import_report(args.import_report)
+        return
+
+    console.print("\n[bold cyan]🏁 Running offline benchmarks...[/bold cyan]\n")
+    results = run_suite(args.iterations, args.feed_latency_ms, args.llm_latency_ms, args.import_runs)
+    print_results(results)
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    console.print(f"[green]✅ Results saved to {output}[/green]")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_results(results, baseline, args.threshold)
+        if regressions:
+            console.print(f"[red]❌ {len(regressions)} benchmark(s) regressed by more than {args.threshold}%[/red]")
+            raise SystemExit(1)
+        console.print("[green]✅ No regressions[/green]")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,9 +6,6 @@ from rich.panel import Panel
 from rich.prompt import Prompt, Confirm
 from rich.table import Table
 from typing import List, Dict
-from trending_finder import TrendingFinder
-from post_generator import PostGenerator
-from linkedin_poster import LinkedInPoster
 
 console = Console()
 
@@ -17,11 +14,27 @@ class LinkedInAutoPosterCLI:
     """Interactive CLI for LinkedIn Auto-Posting Agent"""
     
     def __init__(self):
-        self.trending_finder = TrendingFinder()
-        self.post_generator = PostGenerator()
+        # Components are created on first use so that startup doesn't pay for
+        # requests/feedparser, and Selenium is only imported when posting
+        self._trending_finder = None
+        self._post_generator = None
         self.linkedin_poster = None
         self.drafts = []
     
+    @property
+    def trending_finder(self):
+        if self._trending_finder is None:
+            from trending_finder import TrendingFinder
+            self._trending_finder = TrendingFinder()
+        return self._trending_finder
+    
+    @property
+    def post_generator(self):
+        if self._post_generator is None:
+            from post_generator import PostGenerator
+            self._post_generator = PostGenerator()
+        return self._post_generator
+    
     def display_welcome(self):
         """Display welcome message"""
         welcome_text = """
@@ -85,6 +98,8 @@ All without paid APIs! 🎉
             
             # Create a panel for each draft
             panel_content = f"[bold]{draft['topic']}[/bold]\n\n{content}\n\n[dim]Length: {length} characters[/dim]"
+            for similar in draft.get("similar_posts", []):
+                panel_content += f"\n[dim]♻️ Similar past {similar['kind']} ({similar['score']:.2f}): {similar['title'][:60]}[/dim]"
             console.print(Panel(panel_content, title=f"Draft #{draft['id']}", border_style="blue"))
             console.print()
     
@@ -152,6 +167,7 @@ All without paid APIs! 🎉
         
         try:
             # Initialize LinkedIn poster
+            from linkedin_poster import LinkedInPoster
             self.linkedin_poster = LinkedInPoster()
             self.linkedin_poster.setup_driver()
             
@@ -163,6 +179,8 @@ All without paid APIs! 🎉
             # Post content
             if self.linkedin_poster.post_content(draft["content"]):
                 console.print("[green]✅ Successfully posted to LinkedIn![/green]")
+                from similarity_index import record_post
+                record_post(draft["content"], draft.get("topic", ""), "posted")
             else:
                 console.print("[red]❌ Failed to post. Please try again or post manually.[/red]")
             
@@ -20,6 +20,24 @@ GROQ_API_KEY = os.getenv("GROQ_API_KEY", "")  # Get free key from console.groq.c
 TOGETHER_API_KEY = os.getenv("TOGETHER_API_KEY", "")  # Get free key from together.ai
 HF_API_KEY = os.getenv("HF_API_KEY", "")  # Hugging Face (fallback)
 
+# Free-tier quotas per LLM provider (requests/tokens per minute); response headers refine these at runtime
+LLM_RATE_LIMITS = {
+    "groq": {"rpm": 30, "tpm": 6000},
+    "together": {"rpm": 60, "tpm": 60000},
+    "huggingface": {"rpm": 30},
+}
+LLM_RATE_LIMIT_MAX_WAIT = float(os.getenv("LLM_RATE_LIMIT_MAX_WAIT", "10"))  # Longest wait for quota before falling back to the next provider
+LLM_BATCH_SIZE = int(os.getenv("LLM_BATCH_SIZE", "5"))  # Topics per Groq/Together request when generating several drafts (1 disables batching)
+
+# Local CPU model (optional): "llama_cpp" with a GGUF file, or "transformers" with a small chat model id
+LOCAL_LLM_BACKEND = os.getenv("LOCAL_LLM_BACKEND", "").lower()  # Empty = disabled
+LOCAL_LLM_MODEL = os.getenv("LOCAL_LLM_MODEL", "")  # e.g. models/qwen2.5-1.5b-instruct-q4_k_m.gguf or Qwen/Qwen2.5-0.5B-Instruct
+LOCAL_LLM_FIRST = os.getenv("LOCAL_LLM_FIRST", "false").lower() == "true"  # Try the local model before the APIs instead of after
+LOCAL_LLM_THREADS = int(os.getenv("LOCAL_LLM_THREADS", "0"))  # CPU threads (0 = all cores)
+LOCAL_LLM_CONTEXT = 2048  # Context window (llama.cpp)
+LOCAL_LLM_MAX_TOKENS = 200  # Completion budget per post, same as the API providers
+LOCAL_LLM_BATCH_SIZE = 4  # Prompts padded into one forward pass (transformers)
+
 # Post generation settings
 MAX_POST_LENGTH = 3000  # LinkedIn character limit
 MIN_POST_LENGTH = 100
@@ -28,8 +46,68 @@ POSTING_DELAY = 5  # Seconds to wait between actions
 # Browser automation settings
 HEADLESS_MODE = os.getenv("HEADLESS_MODE", "False").lower() == "true"
 BROWSER_TIMEOUT = 30  # Seconds
+# Browser profile: "default" (full window) or "lean" (new headless, no images/fonts/media, small viewport)
+BROWSER_PROFILE = os.getenv("BROWSER_PROFILE", "default").lower()
+SCHEDULER_BROWSER_PROFILE = os.getenv("SCHEDULER_BROWSER_PROFILE", "lean").lower()  # Used for unattended runs; "lean" is always headless, whatever HEADLESS_MODE says
+LEAN_WINDOW_SIZE = (1280, 800)  # Fixed viewport for the lean profile (wide enough for LinkedIn's desktop layout)
+LEAN_BLOCKED_URLS = [  # Resource patterns blocked in the lean profile
+    "*.woff", "*.woff2", "*.ttf", "*.otf",
+    "*.mp4", "*.webm", "*.m3u8", "*.mp3", "*.gif",
+]
 
 # Trending topics settings
 TOPICS_TO_FETCH = 5  # Number of trending topics to fetch
 TRENDING_SOURCES = ["reddit", "news", "rss"]  # Available sources
+TRENDING_CACHE_TTL = int(os.getenv("TRENDING_CACHE_TTL", "600"))  # Seconds a shared trending result stays fresh
+TRENDING_REFRESH_AHEAD = 0.8  # Refresh in the background once an entry reaches this fraction of its TTL
+# Per-source scheduling: time budget for the whole source per refresh, timeout per request,
+# endpoints fetched in parallel, and seconds a source's result is reused before it is fetched again
+SOURCE_SETTINGS = {
+    "default": {"timeout": 15, "request_timeout": 10, "max_concurrency": 4, "refresh_interval": 0},
+    "reddit": {"max_concurrency": 2, "refresh_interval": 120},  # Public API throttles bursts
+    "news": {"max_concurrency": 1, "refresh_interval": 900},  # NewsAPI free tier: 100 requests/day
+    "rss": {"max_concurrency": 8, "refresh_interval": 300},
+}
+SOURCE_MAX_WORKERS = 16  # Threads shared by all sources
+EXTRA_RSS_FEEDS = [u.strip() for u in os.getenv("EXTRA_RSS_FEEDS", "").split(",") if u.strip()]  # Comma-separated feed URLs added to the rss source
+
+# Hashtag settings
+HASHTAG_INDEX_FILE = os.getenv("HASHTAG_INDEX_FILE", "hashtag_index.json")  # TF-IDF corpus of fetched topics (empty = in-memory only)
+HASHTAG_INDEX_MAX_DOCS = int(os.getenv("HASHTAG_INDEX_MAX_DOCS", "5000"))  # Oldest topics are dropped past this
+HASHTAG_MIN_DOCS = 20  # Topics needed before TF-IDF hashtags replace the built-in keyword lists
+HASHTAG_COUNT = 4  # Most hashtags added to a post
+
+# Post history settings
+SIMILARITY_INDEX_PATH = os.getenv("SIMILARITY_INDEX_PATH", "")  # Base path of the similarity index files, e.g. "post_history" (empty = disabled)
+SIMILAR_POSTS_TOP_K = 3  # Past posts returned per topic
+SIMILAR_POST_MIN_SCORE = float(os.getenv("SIMILAR_POST_MIN_SCORE", "0.3"))  # Cosine similarity needed to count as similar
+
+# Scheduling settings
+SCHEDULE_TIMEZONE = os.getenv("SCHEDULE_TIMEZONE", "")  # Default timezone for recurring rules, e.g. "Europe/Berlin" (empty = system local)
+RECURRING_CATCH_UP = os.getenv("RECURRING_CATCH_UP", "skip").lower()  # Missed occurrences after downtime: skip, latest or all
+RECURRING_MAX_CATCH_UP = 5  # Upper bound on posts created per rule by the "all" catch-up policy
+
+BATCH_MAX_POSTS = int(os.getenv("BATCH_MAX_POSTS", "5"))  # Due posts published in one browser session per check
+BATCH_POST_SPACING = int(os.getenv("BATCH_POST_SPACING", "30"))  # Seconds between posts within a session
+# Retry policy per failure class for scheduled posts. max_attempts counts the first try;
+# the delay before attempt n+1 is base_delay * factor^(n-1) seconds, capped at max_delay
+RETRY_POLICIES = {
+    "login": {"max_attempts": 3, "base_delay": 300, "factor": 2, "max_delay": 3600},  # Slow down to avoid lockouts
+    "browser": {"max_attempts": 4, "base_delay": 60, "factor": 2, "max_delay": 1800},  # Selenium/Chrome flakiness
+    "publish": {"max_attempts": 3, "base_delay": 120, "factor": 2, "max_delay": 1800},
+    "generation": {"max_attempts": 3, "base_delay": 60, "factor": 2, "max_delay": 900},
+    "interrupted": {"max_attempts": 3, "base_delay": 60, "factor": 2, "max_delay": 900},  # Scheduler died mid-publish
+    "invalid": {"max_attempts": 1},  # Nothing to retry (e.g. no topic or content)
+    "unknown": {"max_attempts": 2, "base_delay": 300, "factor": 2, "max_delay": 1800},
+}
+RETRY_JITTER = 0.1  # Randomize retry delays by +/- this fraction
+LATE_POST_GRACE_MINUTES = int(os.getenv("LATE_POST_GRACE_MINUTES", "30"))  # Still publish posts this late, expire older ones
+PUBLISHING_TIMEOUT_MINUTES = 30  # Posts stuck in "publishing" this long are retried as interrupted
+POST_ARCHIVE_DIR = os.getenv("POST_ARCHIVE_DIR", "post_archive")  # Finished posts move here (empty = keep them in scheduled_posts.json)
+ARCHIVE_AFTER_HOURS = float(os.getenv("ARCHIVE_AFTER_HOURS", "24"))  # Posted/dead-lettered/expired posts stay in the schedule this long
+POST_ARCHIVE_MAX_SEGMENTS = 32  # Merge archive segment files past this count
 
+# Observability settings
+TRACE_FILE = os.getenv("TRACE_FILE", "")  # Append finished spans as JSON lines (empty = in-memory only)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))  # Serve scheduler metrics on this port (0 = disabled)
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
@@ -0,0 +1,307 @@
+"""
+Local stand-in for the LinkedIn pages used by LinkedInPoster
+
+Mimics the login form (#username, #password), the "Start a post" button,
+the contenteditable post textbox and the Post button state transitions
+(disabled -> enabled on input -> disabled while publishing -> modal closes
+and the post appears in the feed), with configurable latencies. Running
+this module times each poster step against it.
+
+Usage:
+    python fake_linkedin.py                      # run the step-timing harness
+    python fake_linkedin.py --serve --port 8765  # only serve the fake site
+"""
+import argparse
+import html
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+from urllib.parse import parse_qs
+
+DEFAULT_LATENCIES = {
+    "page_ms": 50,      # Server delay before serving /login and /feed/
+    "login_ms": 200,    # Server delay while checking credentials
+    "enable_ms": 300,   # Client delay before the Post button enables after input
+    "publish_ms": 500,  # Client delay between clicking Post and the modal closing
+}
+
+LOGIN_PAGE = """<!DOCTYPE html>
+<html><head><title>LinkedIn Login (local)</title></head>
+<body>
+  <form method="post" action="/login">
+    <input id="username" name="session_key" type="text">
+    <input id="password" name="session_password" type="password">
+    <button type="submit">Sign in</button>
+  </form>
+  {error}
+</body></html>
+"""
+
+FEED_PAGE = """<!DOCTYPE html>
+<html><head><title>Feed | LinkedIn (local)</title>
+<style>
+  .share-modal {{ position: fixed; top: 10%; left: 10%; width: 80%; background: #fff; border: 1px solid #ccc; }}
+  [contenteditable] {{ min-height: 120px; border: 1px solid #999; }}
+</style></head>
+<body>
+  <button id="start-post" class="share-box-feed-entry__trigger">Start a post</button>
+  <main id="feed">{posts}</main>
+  <script>
+    var ENABLE_MS = {enable_ms};
+    var PUBLISH_MS = {publish_ms};
+
+    function openModal() {{
+      if (document.querySelector('.share-modal')) return;
+      var modal = document.createElement('div');
+      modal.className = 'share-box share-modal';
+      modal.setAttribute('role', 'dialog');
+      modal.innerHTML =
+        '<div contenteditable="true" role="textbox" aria-label="Text editor for creating content"></div>' +
+        '<button class="share-actions__primary-action artdeco-button--disabled" disabled aria-disabled="true">Post</button>';
+      document.body.appendChild(modal);
+      var box = modal.querySelector('[role=textbox]');
+      var button = modal.querySelector('button');
+      var timer = null;
+      box.addEventListener('input', function () {{
+        clearTimeout(timer);
+        timer = setTimeout(function () {{
+          var hasText = (box.innerText || '').trim().length > 0;
+          button.disabled = !hasText;
+          button.setAttribute('aria-disabled', hasText ? 'false' : 'true');
+          button.className = hasText ? 'share-actions__primary-action' : 'share-actions__primary-action artdeco-button--disabled';
+        }}, ENABLE_MS);
+      }});
+      button.addEventListener('click', function () {{
+        if (button.disabled) return;
+        var text = box.innerText;
+        button.disabled = true;
+        button.className = 'share-actions__primary-action artdeco-button--disabled';
+        var xhr = new XMLHttpRequest();
+        xhr.open('POST', '/api/posts');
+        xhr.setRequestHeader('Content-Type', 'application/json');
+        xhr.send(JSON.stringify({{content: text}}));
+        setTimeout(function () {{
+          modal.parentNode.removeChild(modal);
+          var post = document.createElement('div');
+          post.className = 'feed-shared-update-v2';
+          post.innerText = text;
+          var feed = document.getElementById('feed');
+          feed.insertBefore(post, feed.firstChild);
+        }}, PUBLISH_MS);
+      }});
+    }}
+    document.getElementById('start-post').addEventListener('click', openModal);
+  </script>
+</body></html>
+"""
+
+
+class FakeLinkedInServer:
+    """Serves the fake login/feed pages and records published posts"""
+
+    def __init__(self, latencies: Dict = None, email: str = "bench@example.com", password: str = "bench-password"):
+        self.latencies = dict(DEFAULT_LATENCIES)
+        self.latencies.update(latencies or {})
+        self.email = email
+        self.password = password
+        self.posts: List[Dict] = []
+        self._server = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Start serving in a background thread and return the base URL"""
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _send(self, status: int, body: str = "", content_type: str = "text/html; charset=utf-8", headers: Dict = None):
+                data = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _logged_in(self) -> bool:
+                return "li_at=local" in (self.headers.get("Cookie") or "")
+
+            def do_GET(self):
+                path = self.path.split("?")[0]
+                if path == "/login":
+                    fake._sleep("page_ms")
+                    self._send(200, LOGIN_PAGE.format(error=""))
+                elif path in ("/feed", "/feed/"):
+                    if not self._logged_in():
+                        self._send(302, headers={"Location": "/login"})
+                        return
+                    fake._sleep("page_ms")
+                    self._send(200, fake._render_feed())
+                elif path == "/api/posts":
+                    self._send(200, json.dumps(fake.posts), "application/json")
+                else:
+                    self._send(404, "Not found")
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length).decode("utf-8") if length else ""
+                path = self.path.split("?")[0]
+                if path == "/login":
+                    fake._sleep("login_ms")
+                    form = parse_qs(body)
+                    email = form.get("session_key", [""])[0]
+                    password = form.get("session_password", [""])[0]
+                    if email == fake.email and password == fake.password:
+                        self._send(302, headers={"Location": "/feed/", "Set-Cookie": "li_at=local; Path=/"})
+                    else:
+                        self._send(200, LOGIN_PAGE.format(error='<div class="error">Wrong email or password.</div>'))
+                elif path == "/api/posts":
+                    try:
+                        content = json.loads(body).get("content", "")
+                    except ValueError:
+                        content = ""
+                    fake.posts.append({"content": content, "posted_at": datetime.now().isoformat()})
+                    self._send(201, "{}", "application/json")
+                else:
+                    self._send(404, "Not found")
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self.base_url
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def _sleep(self, key: str):
+        delay = self.latencies.get(key, 0)
+        if delay:
+            time.sleep(delay / 1000.0)
+
+    def _render_feed(self) -> str:
+        posts = "".join(
+            f'<div class="feed-shared-update-v2">{html.escape(p["content"])}</div>'
+            for p in reversed(self.posts)
+        )
+        return FEED_PAGE.format(
+            posts=posts,
+            enable_ms=int(self.latencies["enable_ms"]),
+            publish_ms=int(self.latencies["publish_ms"])
+        )
+
+
+BROWSER_STEPS = ["browser.launch", "browser.login", "browser.navigate", "browser.inject",
+                 "browser.click", "browser.confirm", "browser.post", "browser.prepare_post"]
+
+
+def run_harness(latencies: Dict = None, profile: str = "lean", runs: int = 1) -> Dict:
+    """Run LinkedInPoster against the fake site and collect per-step timings"""
+    from linkedin_poster import LinkedInPoster
+    from tracing import tracer
+
+    server = FakeLinkedInServer(latencies)
+    base_url = server.start()
+    content = "Benchmarking the browser path against a local stand-in. " * 3 + "#Testing"
+    results = {"runs": [], "settings": {"profile": profile, "latencies": server.latencies}}
+    try:
+        for run in range(runs):
+            tracer.clear()
+            poster = LinkedInPoster(profile=profile)
+            poster.base_url = base_url
+            poster.email, poster.password = server.email, server.password
+            started = time.perf_counter()
+            try:
+                poster.setup_driver()
+                logged_in = poster.login()
+                posted = logged_in and poster.post_content_automated(content)
+                prepared = logged_in and poster.prepare_post_for_manual_confirmation(content)
+            finally:
+                poster.close()
+            steps = {}
+            for span in tracer.get_finished_spans():
+                if span["name"] in BROWSER_STEPS:
+                    steps.setdefault(span["name"], []).append(span["duration_ms"])
+            results["runs"].append({
+                "run": run + 1,
+                "total_ms": round((time.perf_counter() - started) * 1000, 3),
+                "logged_in": logged_in,
+                "posted": bool(posted),
+                "prepared": bool(prepared),
+                "published_posts": len(server.posts),
+                "peak_rss_mb": poster.peak_rss_mb,
+                "steps_ms": steps
+            })
+    finally:
+        server.stop()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake LinkedIn site and browser step-timing harness")
+    parser.add_argument("--serve", action="store_true", help="Only serve the fake site until interrupted")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--profile", default="lean", help="Browser profile for the harness (default/lean)")
+    parser.add_argument("--runs", type=int, default=1)
+    parser.add_argument("--output", help="Save harness results as JSON")
+    for key, value in DEFAULT_LATENCIES.items():
+        parser.add_argument(f"--{key.replace('_', '-')}", type=float, default=value, dest=key)
+    args = parser.parse_args()
+    latencies = {key: getattr(args, key) for key in DEFAULT_LATENCIES}
+
+    if args.serve:
+        server = FakeLinkedInServer(latencies)
+        print(f"🧪 Fake LinkedIn running at {server.start(port=args.port)} "
+              f"(login: {server.email} / {server.password}). Press Ctrl+C to stop.")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            server.stop()
+        return
+
+    from rich.console import Console
+    from rich.table import Table
+
+    console = Console()
+    results = run_harness(latencies, profile=args.profile, runs=args.runs)
+
+    table = Table(title="🧪 Browser steps against fake LinkedIn", show_header=True, header_style="bold magenta")
+    table.add_column("Step", style="cyan")
+    for run in results["runs"]:
+        table.add_column(f"Run {run['run']} ms", justify="right")
+    for step in BROWSER_STEPS:
+        row = [step]
+        for run in results["runs"]:
+            durations = run["steps_ms"].get(step, [])
+            row.append(" / ".join(f"{d:.0f}" for d in durations) if durations else "-")
+        table.add_row(*row)
+    table.add_row("total", *[f"{run['total_ms']:.0f}" for run in results["runs"]])
+    console.print(table)
+
+    for run in results["runs"]:
+        console.print(f"Run {run['run']}: logged_in={run['logged_in']} posted={run['posted']} "
+                      f"prepared={run['prepared']} published={run['published_posts']}")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        console.print(f"[green]✅ Results saved to {args.output}[/green]")
+
+
+if __name__ == "__main__":
+    main()
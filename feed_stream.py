@@ -0,0 +1,155 @@
+"""
+Streaming feed parsing that stops once enough entries are read
+
+We only use the first couple of items from each RSS feed and Reddit
+listing, so the response body is read in chunks and parsed incrementally
+(XMLPullParser for RSS 2.0/1.0 and Atom, raw_decode over the "children" array for
+Reddit JSON). Reading stops and the connection is closed as soon as
+max_entries have been extracted. Each call returns stats with the bytes
+read, the body size if the server sent one, and (when tracemalloc is
+tracing) the peak memory used while parsing.
+"""
+import codecs
+import json
+import tracemalloc
+import xml.etree.ElementTree as ET
+from typing import Dict, Iterable, List, Tuple
+
+CHUNK_SIZE = 8192
+ATOM = "{http://www.w3.org/2005/Atom}"
+RSS1 = "{http://purl.org/rss/1.0/}"  # RSS 1.0 / RDF
+ENTRY_TAGS = ("item", f"{ATOM}entry", f"{RSS1}item")
+
+
+class _Reader:
+    """Counts bytes pulled from a streamed response"""
+
+    def __init__(self, response, chunk_size: int = CHUNK_SIZE):
+        self.response = response
+        self.chunks = response.iter_content(chunk_size=chunk_size)
+        self.bytes_read = 0
+        self.exhausted = False
+        self._memory_start = None
+        if tracemalloc.is_tracing():
+            self._memory_start = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+
+    def __iter__(self) -> Iterable[bytes]:
+        for chunk in self.chunks:
+            if chunk:
+                self.bytes_read += len(chunk)
+                yield chunk
+        self.exhausted = True
+
+    def stats(self, entries: int) -> Dict:
+        length = self.response.headers.get("Content-Length")
+        total = int(length) if length and length.isdigit() else None
+        stats = {
+            "entries": entries,
+            "bytes_read": self.bytes_read,
+            "bytes_total": total,
+            "stopped_early": self.bytes_read < total if total else not self.exhausted,
+        }
+        if self._memory_start is not None:
+            stats["peak_memory_kb"] = round((tracemalloc.get_traced_memory()[1] - self._memory_start) / 1024, 1)
+        return stats
+
+
+def _text(element, *tags) -> str:
+    for tag in tags:
+        child = element.find(tag)
+        if child is not None and (child.text or "").strip():
+            return child.text.strip()
+    return ""
+
+
+def _rss_entry(element) -> Dict:
+    if element.tag == f"{ATOM}entry":
+        link = ""
+        for candidate in element.findall(f"{ATOM}link"):
+            if candidate.get("rel", "alternate") == "alternate":
+                link = candidate.get("href", "")
+                break
+        return {"title": _text(element, f"{ATOM}title"), "link": link,
+                "description": _text(element, f"{ATOM}summary", f"{ATOM}content")}
+    ns = RSS1 if element.tag == f"{RSS1}item" else ""
+    return {"title": _text(element, f"{ns}title"), "link": _text(element, f"{ns}link"),
+            "description": _text(element, f"{ns}description")}
+
+
+def stream_rss_entries(response, max_entries: int) -> Tuple[List[Dict], Dict]:
+    """First max_entries items of an RSS 2.0, RSS 1.0 or Atom feed as {title, link, description}"""
+    reader = _Reader(response)
+    parser = ET.XMLPullParser(events=("end",))
+    entries = []
+    received = []
+    try:
+        for chunk in reader:
+            received.append(chunk)
+            parser.feed(chunk)
+            for _, element in parser.read_events():
+                if element.tag in ENTRY_TAGS:
+                    entries.append(_rss_entry(element))
+                    element.clear()
+                    if len(entries) >= max_entries:
+                        return entries, reader.stats(len(entries))
+        if not entries:
+            # Well-formed but no entry tags we know: let feedparser try the (fully read) body
+            entries = _feedparser_entries(b"".join(received), max_entries)
+    except ET.ParseError:
+        # Not well-formed XML (common with real feeds): let feedparser deal with the whole body
+        entries = _feedparser_entries(b"".join(received) + b"".join(reader), max_entries)
+    finally:
+        response.close()
+    return entries, reader.stats(len(entries))
+
+
+def _feedparser_entries(body: bytes, max_entries: int) -> List[Dict]:
+    import feedparser
+    feed = feedparser.parse(body)
+    return [{"title": e.get("title", ""), "link": e.get("link", ""), "description": e.get("description", "")}
+            for e in feed.entries[:max_entries]]
+
+
+def stream_json_children(response, max_entries: int, key: str = "children") -> Tuple[List[Dict], Dict]:
+    """First max_entries objects of the first "<key>": [...] array in a JSON body (e.g. a Reddit listing)"""
+    reader = _Reader(response)
+    # Incremental decoding so a multi-byte character split across chunks stays intact
+    text_decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    decoder = json.JSONDecoder()
+    marker = f'"{key}"'
+    buffer = ""
+    position = None  # index in buffer where the next array element (or "]") starts
+    entries = []
+    done = False
+    try:
+        for chunk in reader:
+            buffer += text_decoder.decode(chunk)
+            if position is None:
+                start = buffer.find(marker)
+                bracket = buffer.find("[", start) if start != -1 else -1
+                if bracket == -1:
+                    continue
+                position = bracket + 1
+            while len(entries) < max_entries:
+                # Skip whitespace and separators before the next element
+                while position < len(buffer) and buffer[position] in " \t\r\n,":
+                    position += 1
+                if position >= len(buffer):
+                    break
+                if buffer[position] == "]":
+                    done = True
+                    break
+                try:
+                    entry, end = decoder.raw_decode(buffer, position)
+                except ValueError:
+                    break  # element not complete yet
+                entries.append(entry)
+                position = end
+            if done or len(entries) >= max_entries:
+                break
+            # Drop consumed text so the buffer stays about one element long
+            buffer, position = buffer[position:], 0
+    finally:
+        response.close()
+    return entries[:max_entries], reader.stats(len(entries[:max_entries]))
@@ -0,0 +1,200 @@
+"""
+TF-IDF hashtag index over fetched topics
+
+Every topic the trending finder returns is added as a document (title words
+count double; title bigrams that other topics share become compound
+hashtags such as #OpenSource). Document
+frequencies are updated incrementally, each document's term weights are kept
+so a query only scores that document's terms, and results are cached until
+the corpus changes. The index is saved to HASHTAG_INDEX_FILE so it keeps
+growing across runs; the oldest documents are dropped past
+HASHTAG_INDEX_MAX_DOCS.
+"""
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional
+import config
+
+TOKEN_PATTERN = re.compile(r"[a-z][a-z0-9]+")
+# Short words that are still worth a hashtag (rendered upper-case)
+ACRONYMS = {"ai", "ml", "gpt", "ui", "ux", "vr", "ar", "iot", "api", "llm", "gpu", "cpu", "aws", "gcp",
+            "saas", "seo", "ceo", "cto", "css", "sql", "nlp", "ios", "b2b", "esg", "vc", "5g"}
+STOPWORDS = set("""
+a about above after again against all also am an and any are as at be because been before being
+below between both but by can could did do does doing down during each few for from further had
+has have having he her here hers herself him himself his how i if in into is it its itself just
+me more most my myself no nor not now of off on once only or other our ours ourselves out over
+own same she should so some such than that the their theirs them themselves then there these they
+this those through to too under until up very was we were what when where which while who whom
+why will with would you your yours yourself yourselves
+new says said get gets got make makes made one two three first last next year years today
+week weeks month day days time way via vs using use used like just still really much many
+amp http https www com reddit comments thread discussion anyone help need want know think
+big small best top better worse good bad great huge major latest announces announced launches
+launched releases released reveals revealed raises raised shows showed beats hits adds plans
+changes grows slows matters exposes takes gives goes comes says
+""".split())
+TITLE_WEIGHT = 2
+
+
+def _is_content_word(token: str) -> bool:
+    return token not in STOPWORDS and (len(token) > 2 or token in ACRONYMS) and not token.isdigit()
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-case content words (stopwords and 1-2 letter words removed, acronyms kept)"""
+    return [t for t in TOKEN_PATTERN.findall((text or "").lower()) if _is_content_word(t)]
+
+
+def to_hashtag(term: str) -> str:
+    """"open source" -> #OpenSource, "ai" -> #AI"""
+    return "#" + "".join(w.upper() if w in ACRONYMS else w.capitalize() for w in term.split())
+
+
+def topic_terms(title: str, description: str = "") -> Dict[str, int]:
+    """Term counts for one topic: title unigrams and adjacent-word bigrams weighted, description unigrams"""
+    terms = Counter()
+    words = TOKEN_PATTERN.findall((title or "").lower())
+    for i, word in enumerate(words):
+        if not _is_content_word(word):
+            continue
+        terms[word] += TITLE_WEIGHT
+        if i + 1 < len(words) and _is_content_word(words[i + 1]):
+            terms[f"{word} {words[i + 1]}"] += TITLE_WEIGHT
+    for token in tokenize(description):
+        terms[token] += 1
+    return dict(terms)
+
+
+class HashtagIndex:
+    """Incremental document-frequency index with cached per-topic hashtags"""
+
+    def __init__(self, path: str = None, max_docs: int = None):
+        self.path = path
+        self.max_docs = max_docs or config.HASHTAG_INDEX_MAX_DOCS
+        self._docs: "OrderedDict[str, Dict[str, int]]" = OrderedDict()
+        self._df: Counter = Counter()
+        self._cache: Dict = {}
+        self._lock = threading.Lock()
+        if path:
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def add_topics(self, topics: List[Dict]) -> int:
+        """Index topics not seen before (keyed by title); returns how many were added"""
+        added = 0
+        with self._lock:
+            for topic in topics:
+                key = self._key(topic.get("title", ""))
+                if not key or key in self._docs:
+                    continue
+                self._add(key, topic_terms(topic.get("title", ""), topic.get("description", "")))
+                added += 1
+            if added:
+                while len(self._docs) > self.max_docs:
+                    _, terms = self._docs.popitem(last=False)
+                    self._df.subtract(terms.keys())
+                self._df += Counter()  # drop terms whose count reached zero
+                self._cache.clear()
+        if added and self.path:
+            self.save()
+        return added
+
+    def hashtags(self, title: str, description: str = "", limit: int = 3) -> List[str]:
+        """Top TF-IDF hashtags for a topic (indexed topics reuse their stored terms)"""
+        key = self._key(title)
+        with self._lock:
+            indexed = key in self._docs
+            # Topics not in the corpus are scored from the text passed in, description included
+            cache_key = key if indexed else (key, description)
+            cached = self._cache.get(cache_key)
+            if cached is not None:
+                return cached[:limit]
+            terms = self._docs[key] if indexed else topic_terms(title, description)
+            total_docs = len(self._docs)
+            scored = []
+            for term, count in terms.items():
+                df = self._df.get(term, 0)
+                shared = df - indexed > 0
+                # A word pair only makes a hashtag if other topics use the same phrase
+                if not shared and " " in term:
+                    continue
+                # Smoothed IDF so a term in every document still scores above zero
+                idf = math.log((1 + total_docs) / (1 + df)) + 1
+                # Terms other topics also use make hashtags people follow; one-off words rank after them
+                scored.append((shared, count * idf, term))
+        # On a tie a phrase beats its own words ("open source" always co-occurring); otherwise title order
+        scored.sort(key=lambda item: (not item[0], -item[1], -item[2].count(" ")))
+
+        tags, used_words = [], set()
+        for _, _, term in scored:
+            words = set(term.split())
+            # Skip terms that repeat a word already covered (e.g. "open" after "open source")
+            if words & used_words:
+                continue
+            tags.append(to_hashtag(term))
+            used_words |= words
+            if len(tags) == config.HASHTAG_COUNT:
+                break
+        with self._lock:
+            if len(self._cache) >= 10000:
+                self._cache.clear()
+            self._cache[cache_key] = tags
+        return tags[:limit]
+
+    def save(self):
+        with self._lock:
+            data = {"version": 1, "docs": [[key, terms] for key, terms in self._docs.items()]}
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"⚠️ Could not save hashtag index: {e}")
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"⚠️ Error reading {self.path}: {e}")
+            return
+        for key, terms in data.get("docs", [])[-self.max_docs:]:
+            self._add(key, terms)
+
+    def _add(self, key: str, terms: Dict[str, int]):
+        self._docs[key] = terms
+        self._df.update(terms.keys())
+
+    @staticmethod
+    def _key(title: str) -> str:
+        return " ".join((title or "").lower().split())
+
+
+_index: Optional[HashtagIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_hashtag_index() -> HashtagIndex:
+    """Process-wide index backed by config.HASHTAG_INDEX_FILE"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = HashtagIndex(config.HASHTAG_INDEX_FILE or None)
+        return _index
+
+
+def reset_hashtag_index():
+    """Drop the process-wide index so the next call picks up changed config"""
+    global _index
+    with _index_lock:
+        _index = None
@@ -0,0 +1,125 @@
+"""
+Background job executor for long-running UI actions
+
+Generation and posting run on a worker pool instead of the Streamlit script
+thread. Jobs are tracked by id in a process-wide store (not in
+st.session_state), so a rerun or a closed tab doesn't lose the work, and
+the UI only needs to poll the job's status.
+"""
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class Job:
+    """A unit of background work and its progress"""
+
+    def __init__(self, kind: str, description: str = "", owner: str = ""):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.description = description
+        self.owner = owner
+        self.status = QUEUED
+        self.progress = ""
+        self.result = None
+        self.error = None
+        self.created_at = datetime.now()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in (SUCCEEDED, FAILED)
+
+    def update(self, progress: str):
+        """Report a progress message (called from inside the job)"""
+        self.progress = progress
+
+    def elapsed(self) -> float:
+        """Seconds spent running so far (or in total once finished)"""
+        if not self.started_at:
+            return 0.0
+        end = self.finished_at or datetime.now()
+        return (end - self.started_at).total_seconds()
+
+    def to_dict(self) -> Dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "description": self.description,
+            "owner": self.owner,
+            "status": self.status,
+            "progress": self.progress,
+            "error": self.error,
+            "created_at": self.created_at.strftime("%Y-%m-%d %H:%M:%S"),
+            "elapsed": round(self.elapsed(), 1)
+        }
+
+
+class JobExecutor:
+    """Runs jobs on a thread pool and keeps their state by id"""
+
+    def __init__(self, max_workers: int = 4, retention_seconds: int = 3600, max_jobs: int = 500):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self.retention_seconds = retention_seconds
+        self.max_jobs = max_jobs
+
+    def submit(self, kind: str, func: Callable, *args, description: str = "", owner: str = "", **kwargs) -> str:
+        """Queue func(job, *args, **kwargs) and return the job id"""
+        job = Job(kind, description, owner)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        self._pool.submit(self._run, job, func, args, kwargs)
+        return job.id
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list_jobs(self, owner: str = None, active_only: bool = False) -> List[Job]:
+        """Jobs newest first, optionally filtered by owner/activity"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        if owner is not None:
+            jobs = [j for j in jobs if j.owner == owner]
+        if active_only:
+            jobs = [j for j in jobs if not j.done]
+        return sorted(jobs, key=lambda j: j.created_at, reverse=True)
+
+    def shutdown(self, wait: bool = False):
+        self._pool.shutdown(wait=wait)
+
+    def _run(self, job: Job, func: Callable, args, kwargs):
+        job.status = RUNNING
+        job.started_at = datetime.now()
+        try:
+            job.result = func(job, *args, **kwargs)
+            job.status = SUCCEEDED
+        except Exception as e:
+            job.error = str(e)
+            job.status = FAILED
+            traceback.print_exc()
+        finally:
+            job.finished_at = datetime.now()
+
+    def _prune(self):
+        now = time.time()
+        for job_id, job in list(self._jobs.items()):
+            if job.done and now - job.finished_at.timestamp() > self.retention_seconds:
+                del self._jobs[job_id]
+        if len(self._jobs) > self.max_jobs:
+            finished = sorted((j for j in self._jobs.values() if j.done), key=lambda j: j.finished_at)
+            for job in finished[:len(self._jobs) - self.max_jobs]:
+                del self._jobs[job.id]
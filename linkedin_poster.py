@@ -2,6 +2,7 @@
 Module to automate LinkedIn posting using Selenium
 """
 import time
+from typing import Optional
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
@@ -11,22 +12,34 @@ from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from webdriver_manager.chrome import ChromeDriverManager
 import config
+from tracing import tracer
 
 
 class LinkedInPoster:
     """Handles automated posting to LinkedIn"""
     
-    def __init__(self):
+    def __init__(self, profile: str = None):
         self.email = config.LINKEDIN_EMAIL
         self.password = config.LINKEDIN_PASSWORD
         self.driver = None
         self.timeout = config.BROWSER_TIMEOUT
+        self.base_url = "https://www.linkedin.com"  # Overridable, e.g. to point at a local stand-in site
+        # "default" = full maximized window, "lean" = low-memory headless profile for unattended runs
+        self.profile = (profile or config.BROWSER_PROFILE).lower()
+        self.peak_rss_mb: Optional[float] = None  # Set by the memory monitor when psutil is installed
+        self._memory_monitor = None
+        self._monitoring = False
     
+    @tracer.traced("browser.launch")
     def setup_driver(self):
         """Setup Chrome WebDriver"""
         chrome_options = Options()
+        lean = self.profile == "lean"
+        tracer.annotate(profile=self.profile)
         
-        if config.HEADLESS_MODE:
+        if lean:
+            self._apply_lean_options(chrome_options)
+        elif config.HEADLESS_MODE:
             chrome_options.add_argument("--headless")
         
         chrome_options.add_argument("--no-sandbox")
@@ -37,8 +50,82 @@ class LinkedInPoster:
         
         service = Service(ChromeDriverManager().install())
         self.driver = webdriver.Chrome(service=service, options=chrome_options)
-        self.driver.maximize_window()
+        
+        if lean:
+            # Block fonts/media at the network layer (images are already disabled via prefs)
+            try:
+                self.driver.execute_cdp_cmd("Network.enable", {})
+                self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": config.LEAN_BLOCKED_URLS})
+            except Exception as e:
+                print(f"⚠️ Could not block fonts/media: {e}")
+            self._start_memory_monitor()
+            print(f"🪶 Lean browser profile active ({config.LEAN_WINDOW_SIZE[0]}x{config.LEAN_WINDOW_SIZE[1]}, headless)")
+        else:
+            self.driver.maximize_window()
+    
+    def _apply_lean_options(self, chrome_options: Options):
+        """Add the low-memory headless flags used by the lean profile"""
+        width, height = config.LEAN_WINDOW_SIZE
+        chrome_options.add_argument("--headless=new")
+        chrome_options.add_argument(f"--window-size={width},{height}")
+        chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+        chrome_options.add_argument("--disable-gpu")
+        chrome_options.add_argument("--disable-extensions")
+        chrome_options.add_argument("--disable-background-networking")
+        chrome_options.add_argument("--disable-background-timer-throttling")
+        chrome_options.add_argument("--disable-component-update")
+        chrome_options.add_argument("--disable-default-apps")
+        chrome_options.add_argument("--disable-sync")
+        chrome_options.add_argument("--disable-features=Translate,MediaRouter,OptimizationHints")
+        chrome_options.add_argument("--mute-audio")
+        chrome_options.add_argument("--no-first-run")
+        chrome_options.add_experimental_option("prefs", {
+            "profile.managed_default_content_settings.images": 2,
+            "profile.managed_default_content_settings.media_stream": 2,
+            "profile.default_content_setting_values.notifications": 2,
+        })
+    
+    def get_browser_rss_mb(self) -> Optional[float]:
+        """Current resident memory (MB) of chromedriver plus all Chrome child processes
+        
+        None if psutil isn't installed or the driver process can't be inspected.
+        """
+        try:
+            import psutil
+        except ImportError:
+            return None
+        
+        try:
+            process = self.driver.service.process
+            root = psutil.Process(process.pid)
+            total = root.memory_info().rss
+            for child in root.children(recursive=True):
+                try:
+                    total += child.memory_info().rss
+                except psutil.Error:
+                    continue
+            return total / (1024 * 1024)
+        except Exception:
+            return None
+    
+    def _start_memory_monitor(self, interval: float = 0.5):
+        """Sample browser RSS in the background to track the peak"""
+        import threading
+        
+        def monitor():
+            while self._monitoring:
+                rss = self.get_browser_rss_mb()
+                if rss is None:
+                    break
+                if self.peak_rss_mb is None or rss > self.peak_rss_mb:
+                    self.peak_rss_mb = rss
+                time.sleep(interval)
+        
+        self._monitoring = True
+        self._memory_monitor = threading.Thread(target=monitor, daemon=True)
+        self._memory_monitor.start()
     
+    @tracer.traced("browser.login")
     def login(self) -> bool:
         """Login to LinkedIn"""
         try:
@@ -46,7 +133,7 @@ class LinkedInPoster:
                 print("❌ LinkedIn credentials not configured. Please set LINKEDIN_EMAIL and LINKEDIN_PASSWORD in .env file")
                 return False
             
-            self.driver.get("https://www.linkedin.com/login")
+            self.driver.get(f"{self.base_url}/login")
             time.sleep(2)
             
             # Enter email
@@ -78,11 +165,13 @@ class LinkedInPoster:
             print(f"❌ Error during login: {e}")
             return False
     
+    @tracer.traced("browser.prepare_post")
     def prepare_post_for_manual_confirmation(self, content: str) -> bool:
         """Prepare LinkedIn post with content pre-filled, wait for manual confirmation"""
         try:
             # Navigate to LinkedIn feed
-            self.driver.get("https://www.linkedin.com/feed/")
+            tracer.step("browser.navigate")
+            self.driver.get(f"{self.base_url}/feed/")
             time.sleep(3)
             
             # Find the post input box (LinkedIn uses "Start a post" button)
@@ -106,6 +195,7 @@ class LinkedInPoster:
                     return False
             
             # Find the text area/div
+            tracer.step("browser.inject", chars=len(content))
             post_textarea = WebDriverWait(self.driver, self.timeout).until(
                 EC.presence_of_element_located((By.XPATH, "//div[@contenteditable='true'][@role='textbox'] | //div[@aria-label='Write a post']"))
             )
@@ -182,11 +272,13 @@ class LinkedInPoster:
             print(f"❌ Error preparing post: {e}")
             return False
     
+    @tracer.traced("browser.post")
     def post_content_automated(self, content: str) -> bool:
         """Fully automated posting to LinkedIn - clicks Post button automatically"""
         try:
             # Navigate to LinkedIn feed
-            self.driver.get("https://www.linkedin.com/feed/")
+            tracer.step("browser.navigate")
+            self.driver.get(f"{self.base_url}/feed/")
             time.sleep(3)
             
             # Find the post input box (LinkedIn uses "Start a post" button)
@@ -210,6 +302,7 @@ class LinkedInPoster:
                     return False
             
             # Find the text area/div
+            tracer.step("browser.inject", chars=len(content))
             post_textarea = WebDriverWait(self.driver, self.timeout).until(
                 EC.presence_of_element_located((By.XPATH, "//div[@contenteditable='true'][@role='textbox'] | //div[@aria-label='Write a post']"))
             )
@@ -389,6 +482,7 @@ class LinkedInPoster:
             
             # Wait for Post button to be enabled - LinkedIn needs time to validate
             # Wait up to 10 seconds for the button to become enabled
+            tracer.step("browser.click")
             print("⏳ Waiting for Post button to be enabled...")
             post_button = None
             selectors = [
@@ -518,6 +612,8 @@ class LinkedInPoster:
             if not clicked:
                 return False
             
+            tracer.step_annotate(click_method=click_method)
+            tracer.step("browser.confirm")
             # Wait a moment to see if click registered
             time.sleep(1)
             
@@ -688,6 +784,14 @@ class LinkedInPoster:
     
     def close(self):
         """Close the browser"""
+        if self._monitoring:
+            self._monitoring = False
+            if self._memory_monitor:
+                self._memory_monitor.join(timeout=2)
+            if self.peak_rss_mb is not None:
+                print(f"📊 Peak browser memory: {self.peak_rss_mb:.0f} MB")
+            else:
+                print("📊 Peak browser memory: unavailable (install psutil to enable)")
         if self.driver:
             self.driver.quit()
 
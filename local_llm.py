@@ -0,0 +1,130 @@
+"""
+Local CPU inference for offline post generation
+
+Two optional backends, selected with LOCAL_LLM_BACKEND:
+- "llama_cpp": a quantized GGUF model through llama-cpp-python
+- "transformers": a small Hugging Face chat model on CPU (transformers + torch)
+
+The model is loaded once per process and reused; calls are serialized
+because neither backend is safe to drive from several threads at once.
+generate() takes several conversations so drafting a batch of topics pays
+the model setup once (transformers pads them into real batches, llama.cpp
+runs them back to back on the warm model). Throughput is reported in
+tokens/sec after every call.
+"""
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+import config
+import metrics
+
+BACKENDS = ("llama_cpp", "transformers")
+
+
+class LocalLLM:
+    """A loaded local chat model"""
+
+    def __init__(self, backend: str, model: str, threads: int = None, context: int = 2048):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown local LLM backend '{backend}' (use one of: {', '.join(BACKENDS)})")
+        if not model:
+            raise ValueError("LOCAL_LLM_MODEL is not set")
+        self.backend = backend
+        self.model_name = model
+        self.threads = threads or os.cpu_count() or 4
+        self.context = context
+        self.last_tokens_per_second = 0.0
+        self._lock = threading.Lock()
+        started = time.perf_counter()
+        if backend == "llama_cpp":
+            self._load_llama_cpp()
+        else:
+            self._load_transformers()
+        print(f"🧠 Loaded local model {os.path.basename(model)} ({backend}) in {time.perf_counter() - started:.1f}s")
+
+    def _load_llama_cpp(self):
+        from llama_cpp import Llama
+        self._llama = Llama(model_path=self.model_name, n_ctx=self.context, n_threads=self.threads, verbose=False)
+
+    def _load_transformers(self):
+        import torch
+        from transformers import AutoModelForCausalLM, AutoTokenizer
+        torch.set_num_threads(self.threads)
+        self._tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+        # Left padding so every prompt in a batch ends right where generation starts
+        self._tokenizer.padding_side = "left"
+        if self._tokenizer.pad_token is None:
+            self._tokenizer.pad_token = self._tokenizer.eos_token
+        self._model = AutoModelForCausalLM.from_pretrained(self.model_name, torch_dtype=torch.float32)
+        self._model.eval()
+
+    def generate(self, conversations: List[List[Dict]], max_tokens: int = 200, temperature: float = 0.7) -> List[str]:
+        """Complete each chat conversation; returns one reply per conversation ("" on failure)"""
+        if not conversations:
+            return []
+        with self._lock:
+            started = time.perf_counter()
+            if self.backend == "llama_cpp":
+                replies, tokens = self._generate_llama_cpp(conversations, max_tokens, temperature)
+            else:
+                replies, tokens = self._generate_transformers(conversations, max_tokens, temperature)
+            elapsed = time.perf_counter() - started
+        self.last_tokens_per_second = tokens / elapsed if elapsed else 0.0
+        metrics.LOCAL_LLM_TOKENS_PER_SECOND.set(round(self.last_tokens_per_second, 2))
+        print(f"⚡ Local model: {tokens} tokens for {len(conversations)} prompt(s) in {elapsed:.1f}s "
+              f"({self.last_tokens_per_second:.1f} tokens/sec)")
+        return replies
+
+    def _generate_llama_cpp(self, conversations, max_tokens, temperature):
+        replies, tokens = [], 0
+        for messages in conversations:
+            result = self._llama.create_chat_completion(messages=messages, max_tokens=max_tokens, temperature=temperature)
+            replies.append(result["choices"][0]["message"].get("content") or "")
+            tokens += result.get("usage", {}).get("completion_tokens", 0)
+        return replies, tokens
+
+    def _generate_transformers(self, conversations, max_tokens, temperature):
+        import torch
+        replies, tokens = [], 0
+        prompts = [self._tokenizer.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
+                   for messages in conversations]
+        batch_size = max(1, config.LOCAL_LLM_BATCH_SIZE)
+        for start in range(0, len(prompts), batch_size):
+            inputs = self._tokenizer(prompts[start:start + batch_size], return_tensors="pt", padding=True)
+            with torch.no_grad():
+                output = self._model.generate(**inputs, max_new_tokens=max_tokens, do_sample=temperature > 0,
+                                              temperature=temperature, pad_token_id=self._tokenizer.pad_token_id)
+            generated = output[:, inputs["input_ids"].shape[1]:]
+            for row in generated:
+                tokens += int((row != self._tokenizer.pad_token_id).sum())
+                replies.append(self._tokenizer.decode(row, skip_special_tokens=True))
+        return replies, tokens
+
+
+_model: Optional[LocalLLM] = None
+_model_lock = threading.Lock()
+_load_failed = False
+
+
+def local_llm_enabled() -> bool:
+    return bool(config.LOCAL_LLM_BACKEND and config.LOCAL_LLM_MODEL) and not _load_failed
+
+
+def get_local_llm() -> Optional[LocalLLM]:
+    """Process-wide model, loaded on first use (None if disabled or it failed to load)"""
+    global _model, _load_failed
+    if not local_llm_enabled():
+        return None
+    with _model_lock:
+        if _model is None and not _load_failed:
+            try:
+                _model = LocalLLM(config.LOCAL_LLM_BACKEND, config.LOCAL_LLM_MODEL,
+                                  config.LOCAL_LLM_THREADS, config.LOCAL_LLM_CONTEXT)
+            except ImportError as e:
+                print(f"⚠️ Local LLM backend '{config.LOCAL_LLM_BACKEND}' is not installed: {e}")
+                _load_failed = True
+            except Exception as e:
+                print(f"⚠️ Could not load local model {config.LOCAL_LLM_MODEL}: {e}")
+                _load_failed = True
+        return _model
@@ -0,0 +1,304 @@
+"""
+Prometheus-style metrics for the scheduler daemon
+
+Counters, gauges and histograms are kept in a process-wide registry and
+served in the Prometheus text exposition format over a local HTTP endpoint.
+"""
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Tuple
+import config
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(label_names: Tuple, label_values: Tuple, extra: Dict = None) -> str:
+    pairs = list(zip(label_names, label_values))
+    if extra:
+        pairs.extend(extra.items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric(ABC):
+    """Base class for labelled metrics"""
+
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: List[str] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames or ())
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self.labels()
+
+    def labels(self, **labels):
+        """Return the child metric for the given label values"""
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            child = self._children.get(key)
+            if child is None:
+                child = self._new_child()
+                self._children[key] = child
+        return child
+
+    def _default(self):
+        if self.labelnames:
+            raise ValueError(f"Metric {self.name} requires labels {self.labelnames}")
+        return self.labels()
+
+    @abstractmethod
+    def _new_child(self):
+        """A fresh value holder for one label combination"""
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        with self._lock:
+            children = list(self._children.items())
+        for key, child in children:
+            lines.extend(self._render(key, child))
+        return lines
+
+    def _render(self, key: Tuple, child) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.get())}"]
+
+
+class _Value:
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+        self._function = None
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1):
+        with self._lock:
+            self._value -= amount
+
+    def set(self, value: float):
+        with self._lock:
+            self._value = float(value)
+
+    def set_function(self, function: Callable[[], float]):
+        self._function = function
+
+    def get(self) -> float:
+        if self._function is not None:
+            try:
+                return float(self._function())
+            except Exception:
+                return float("nan")
+        with self._lock:
+            return self._value
+
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+
+    metric_type = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1):
+        self._default().inc(amount)
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, or be computed at scrape time"""
+
+    metric_type = "gauge"
+
+    def _new_child(self):
+        return _Value()
+
+    def set(self, value: float):
+        self._default().set(value)
+
+    def set_function(self, function: Callable[[], float]):
+        """Compute the gauge value from a callback on every scrape"""
+        self._default().set_function(function)
+
+
+class _HistogramValue:
+    def __init__(self, buckets: Tuple):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            self.sum += value
+            self.count += 1
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[i] += 1
+
+    def time(self):
+        return _Timer(self)
+
+
+class _Timer:
+    def __init__(self, target):
+        self.target = target
+        self._start = None
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.target.observe(time.perf_counter() - self._start)
+        return False
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets"""
+
+    metric_type = "histogram"
+    DEFAULT_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 90, 120, 300)
+
+    def __init__(self, name: str, documentation: str, labelnames: List[str] = None, buckets: Tuple = None):
+        self.buckets = tuple(sorted(buckets or self.DEFAULT_BUCKETS)) + (float("inf"),)
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float):
+        self._default().observe(value)
+
+    def time(self):
+        """Context manager that observes the elapsed seconds of a block"""
+        return self._default().time()
+
+    def _render(self, key: Tuple, child) -> List[str]:
+        with child._lock:
+            counts = list(child.counts)
+            total, count = child.sum, child.count
+        lines = []
+        for bound, bucket_count in zip(self.buckets, counts):
+            labels = _format_labels(self.labelnames, key, {"le": _format_value(bound)})
+            lines.append(f"{self.name}_bucket{labels} {bucket_count}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    """Holds metrics and renders them in the text exposition format"""
+
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+POSTS_TOTAL = REGISTRY.register(Counter(
+    "linkedin_posts_total", "Scheduled post outcomes (failed counts every failed attempt)", ["status"]))
+GENERATION_SECONDS = REGISTRY.register(Histogram(
+    "linkedin_generation_seconds", "Time spent generating post content"))
+PUBLISH_SECONDS = REGISTRY.register(Histogram(
+    "linkedin_publish_seconds", "Time spent launching the browser, logging in and publishing, per post (shared across a batch)"))
+QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "linkedin_scheduler_queue_depth", "Posts waiting in the scheduled state"))
+NEXT_DUE_LAG_SECONDS = REGISTRY.register(Gauge(
+    "linkedin_scheduler_next_due_lag_seconds", "Seconds the oldest due post is overdue (0 if none)"))
+LAST_CHECK_TIMESTAMP = REGISTRY.register(Gauge(
+    "linkedin_scheduler_last_check_timestamp_seconds", "Unix time of the last schedule check"))
+PROVIDER_ERRORS = REGISTRY.register(Counter(
+    "linkedin_llm_provider_errors_total", "Failed LLM provider calls", ["provider"]))
+
+LLM_RATE_LIMITED = REGISTRY.register(Counter(
+    "linkedin_llm_rate_limited_total", "LLM calls skipped because the provider quota was exhausted", ["provider"]))
+LOCAL_LLM_TOKENS_PER_SECOND = REGISTRY.register(Gauge(
+    "linkedin_local_llm_tokens_per_second", "Completion throughput of the last local model call"))
+LLM_BATCH_TOPICS = REGISTRY.register(Counter(
+    "linkedin_llm_batch_topics_total", "Topics sent in batched LLM requests, by whether the batch produced their post", ["provider", "result"]))
+
+for _status in ("posted", "failed", "expired", "retried", "dead_letter"):
+    POSTS_TOTAL.labels(status=_status)
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: int = None, host: str = None):
+    """Serve /metrics in a background thread (idempotent, returns the server)"""
+    global _server
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/metrics", "/"):
+                self.send_response(404)
+                self.end_headers()
+                return
+            body = REGISTRY.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    port = config.METRICS_PORT if port is None else port
+    host = host or config.METRICS_HOST
+    with _server_lock:
+        if _server is not None:
+            return _server
+        try:
+            _server = ThreadingHTTPServer((host, port), MetricsHandler)
+        except OSError as e:
+            print(f"⚠️ Could not start metrics server on {host}:{port}: {e}")
+            return None
+        _server.daemon_threads = True
+        threading.Thread(target=_server.serve_forever, daemon=True).start()
+        print(f"📈 Metrics available at http://{host}:{_server.server_address[1]}/metrics")
+        return _server
+
+
+def stop_metrics_server():
+    """Shut down the metrics server if running"""
+    global _server
+    with _server_lock:
+        if _server is not None:
+            _server.shutdown()
+            _server.server_close()
+            _server = None
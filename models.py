@@ -0,0 +1,187 @@
+"""
+Typed records for topics, drafts and scheduled posts
+
+Topics, drafts and scheduled posts used to be free-form dicts. These classes
+keep each known field in a __slots__ attribute (no per-instance __dict__), so
+large topic pools and schedules take less memory and attribute access is a
+plain slot lookup, so hot loops should read fields as attributes
+(post.status). They still support the dict operations the rest of the code
+and the UIs use (record["title"], .get(), .update(), "key" in record,
+dict(record)), and keys outside the known fields are kept in a small side
+dict. to_dict()/from_dict() convert to and from the JSON shape.
+
+A field that was never set holds MISSING and is left out exactly like a
+missing dict key; None is a value like any other and is kept. MISSING is
+falsy, so attribute reads such as `post.posted_at or post.scheduled_time`
+work on unset fields too.
+"""
+from operator import attrgetter
+from typing import Any, Dict, Iterator, List, Tuple
+
+
+class _Missing:
+    """Marker for a field that was never set"""
+
+    __slots__ = ()
+
+    def __bool__(self) -> bool:
+        return False
+
+    def __repr__(self) -> str:
+        return "MISSING"
+
+
+MISSING = _Missing()
+
+
+class Record:
+    """Slotted record that behaves like the dict it replaces"""
+
+    __slots__ = ("_extra",)
+    FIELDS: Tuple[str, ...] = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._FIELD_SET = frozenset(cls.FIELDS)
+        # One C call returns every field value as a tuple
+        cls._values = attrgetter(*cls.FIELDS)
+
+    def __init__(self, data=None, **values):
+        if isinstance(data, Record):
+            data = data.to_dict()
+        elif data is not None and not isinstance(data, dict):
+            data = dict(data)
+        self._fill(data or {})
+        if values:
+            self.update(values)
+
+    def _fill(self, data: Dict):
+        """Set every field from data (MISSING where absent); other keys go to the side dict"""
+        get = data.get
+        for name in self.FIELDS:
+            setattr(self, name, get(name, MISSING))
+        fields = self._FIELD_SET
+        self._extra = {key: value for key, value in data.items() if key not in fields} or None
+
+    @classmethod
+    def from_dict(cls, data) -> "Record":
+        """Build a record from its dict shape (records are returned as they are)"""
+        return data if isinstance(data, cls) else cls(data)
+
+    def to_dict(self) -> Dict:
+        data = {name: value for name, value in zip(self.FIELDS, self._values(self)) if value is not MISSING}
+        if self._extra:
+            data.update(self._extra)
+        return data
+
+    def copy(self) -> "Record":
+        new = object.__new__(type(self))
+        for name, value in zip(self.FIELDS, self._values(self)):
+            setattr(new, name, value)
+        new._extra = dict(self._extra) if self._extra else None
+        return new
+
+    # Mapping interface
+
+    def items(self) -> List[Tuple[str, Any]]:
+        return list(self.to_dict().items())
+
+    def keys(self) -> List[str]:
+        return list(self.to_dict())
+
+    def values(self) -> List[Any]:
+        return list(self.to_dict().values())
+
+    def get(self, key: str, default=None):
+        if key in self._FIELD_SET:
+            value = getattr(self, key)
+            return default if value is MISSING else value
+        return self._extra.get(key, default) if self._extra else default
+
+    def update(self, other=(), **values):
+        for key, value in (other.items() if hasattr(other, "items") else other):
+            self[key] = value
+        for key, value in values.items():
+            self[key] = value
+
+    def pop(self, key: str, *default):
+        try:
+            value = self[key]
+        except KeyError:
+            if default:
+                return default[0]
+            raise
+        del self[key]
+        return value
+
+    def __getitem__(self, key: str):
+        if key in self._FIELD_SET:
+            value = getattr(self, key)
+            if value is MISSING:
+                raise KeyError(key)
+            return value
+        if self._extra and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value):
+        if key in self._FIELD_SET:
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key: str):
+        if key in self._FIELD_SET:
+            if getattr(self, key) is MISSING:
+                raise KeyError(key)
+            setattr(self, key, MISSING)
+        elif self._extra and key in self._extra:
+            del self._extra[key]
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key: str) -> bool:
+        if key in self._FIELD_SET:
+            return getattr(self, key) is not MISSING
+        return bool(self._extra) and key in self._extra
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return len(self.to_dict())
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Record):
+            return (type(self) is type(other) and self._values(self) == other._values(other)
+                    and (self._extra or None) == (other._extra or None))
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class Topic(Record):
+    """A trending (or manually entered) topic"""
+
+    __slots__ = FIELDS = ("title", "url", "description", "source", "score", "subreddit", "timestamp")
+
+
+class Draft(Record):
+    """A generated post draft for one topic"""
+
+    __slots__ = FIELDS = ("id", "topic", "content", "source", "url", "length", "similar_posts")
+
+
+class ScheduledPost(Record):
+    """An entry of scheduled_posts.json, from "scheduled" through "posted" or "dead_letter" """
+
+    __slots__ = FIELDS = ("id", "content", "topic", "scheduled_time", "status", "use_llm", "generate_from_trending",
+                          "created_at", "rule_id", "occurrence", "account", "attempts", "error", "error_class",
+                          "next_attempt_at", "publishing_since", "posted_at", "finished_at", "provider")
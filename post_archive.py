@@ -0,0 +1,317 @@
+"""
+Columnar archive of finished scheduled posts
+
+Posted, dead-lettered and expired posts are moved out of scheduled_posts.json
+(see PostScheduler.archive_finished_posts) so the hot schedule file stays
+small. Each archive run appends one immutable segment file to
+POST_ARCHIVE_DIR; segments are merged once there are more than
+POST_ARCHIVE_MAX_SEGMENTS of them.
+
+A segment is a small JSON header followed by one zlib-compressed block per
+column: 64-bit integers for times and counts, dictionary codes for
+low-cardinality strings (status, provider, error class) and length-prefixed
+UTF-8 for free text. Queries only read and decode the columns they use, and
+decoded columns are cached per segment since segments never change.
+"""
+import json
+import os
+import statistics
+import struct
+import sys
+import threading
+import time
+import zlib
+from array import array
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional
+import config
+from schedule_store import file_lock
+
+MAGIC = b"LPA1"
+SEGMENT_SUFFIX = ".lpa"
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+ARCHIVED_STATUSES = ("posted", "dead_letter", "expired")
+
+# Column name -> type: "int" (epoch seconds or counts, -1 if missing), "cat" (dictionary-encoded), "str"
+COLUMNS = {
+    "id": "str",
+    "status": "cat",
+    "provider": "cat",
+    "error_class": "cat",
+    "account": "cat",
+    "rule_id": "cat",
+    "topic": "str",
+    "content": "str",
+    "error": "str",
+    "scheduled_time": "int",
+    "posted_at": "int",
+    "finished_at": "int",
+    "created_at": "int",
+    "attempts": "int",
+    "archived_at": "int",
+}
+TIME_COLUMNS = ("scheduled_time", "posted_at", "finished_at", "created_at")
+
+
+def _epoch(value) -> int:
+    if not value:
+        return -1
+    try:
+        return int(datetime.strptime(value, TIME_FORMAT).timestamp())
+    except (TypeError, ValueError):
+        return -1
+
+
+def _provider(post) -> str:
+    """Generation provider, or "manual" for posts scheduled with their content"""
+    if post.get("provider"):
+        return post["provider"]
+    return "unknown" if post.get("use_llm") or post.get("generate_from_trending") else "manual"
+
+
+def _ints(values: List[int]) -> bytes:
+    data = array("q", values)
+    if sys.byteorder == "big":
+        data.byteswap()
+    return data.tobytes()
+
+
+def _from_ints(data: bytes) -> List[int]:
+    values = array("q")
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values.tolist()
+
+
+def encode_segment(rows: List[Dict]) -> bytes:
+    """Serialize row dicts (keys from COLUMNS) into one segment"""
+    header = {"rows": len(rows), "columns": {}}
+    blocks = []
+    offset = 0
+    for name, kind in COLUMNS.items():
+        values = [row.get(name) for row in rows]
+        meta = {"type": kind}
+        if kind == "int":
+            raw = _ints([-1 if v is None else int(v) for v in values])
+        elif kind == "cat":
+            dictionary = list(dict.fromkeys(v or "" for v in values))
+            codes = {value: i for i, value in enumerate(dictionary)}
+            raw = _ints([codes[v or ""] for v in values])
+            meta["values"] = dictionary
+        else:
+            encoded = [(v or "").encode("utf-8") for v in values]
+            raw = _ints([len(e) for e in encoded]) + b"".join(encoded)
+        block = zlib.compress(raw, 6)
+        meta.update(offset=offset, length=len(block))
+        header["columns"][name] = meta
+        blocks.append(block)
+        offset += len(block)
+    header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    return MAGIC + struct.pack("<I", len(header_bytes)) + header_bytes + b"".join(blocks)
+
+
+class _Segment:
+    """Lazily decoded columns of one segment file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(4) != MAGIC:
+                raise ValueError(f"{path} is not a post archive segment")
+            (length,) = struct.unpack("<I", f.read(4))
+            self.header = json.loads(f.read(length).decode("utf-8"))
+            self.data_start = 8 + length
+        self.rows = self.header["rows"]
+        self._columns: Dict[str, List] = {}
+
+    def column(self, name: str) -> List:
+        if name in self._columns:
+            return self._columns[name]
+        meta = self.header["columns"].get(name)
+        if meta is None:
+            values = [-1 if COLUMNS.get(name) == "int" else ""] * self.rows
+        else:
+            with open(self.path, "rb") as f:
+                f.seek(self.data_start + meta["offset"])
+                raw = zlib.decompress(f.read(meta["length"]))
+            if meta["type"] == "int":
+                values = _from_ints(raw)
+            elif meta["type"] == "cat":
+                dictionary = meta["values"]
+                values = [dictionary[code] for code in _from_ints(raw)]
+            else:
+                lengths = _from_ints(raw[:8 * self.rows])
+                values, position = [], 8 * self.rows
+                for n in lengths:
+                    values.append(raw[position:position + n].decode("utf-8"))
+                    position += n
+        # Free text is only decoded on demand and not kept
+        if COLUMNS.get(name) != "str" or name == "id":
+            self._columns[name] = values
+        return values
+
+
+class PostArchive:
+    """Append-only segment store with aggregation queries"""
+
+    def __init__(self, directory: str, max_segments: int = None):
+        self.directory = directory
+        self.max_segments = max_segments or config.POST_ARCHIVE_MAX_SEGMENTS
+        self.lock_path = os.path.join(directory, ".lock")
+        self._segments: Dict[str, _Segment] = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def append(self, posts: List[Dict]) -> int:
+        """Write posts (scheduled post dicts/records) as a new segment; returns how many"""
+        if not posts:
+            return 0
+        archived_at = int(time.time())
+        rows = []
+        for post in posts:
+            row = {name: post.get(name) for name, kind in COLUMNS.items() if kind != "int"}
+            row.update({name: _epoch(post.get(name)) for name in TIME_COLUMNS})
+            row.update(provider=_provider(post), attempts=post.get("attempts", 0), archived_at=archived_at)
+            rows.append(row)
+        with file_lock(self.lock_path):
+            self._write_segment(encode_segment(rows))
+            if len(self._segment_names()) > self.max_segments:
+                self._compact()
+        return len(rows)
+
+    def columns(self, *names: str) -> Dict[str, List]:
+        """Values of the given columns across all segments (each post id counted once)"""
+        for _ in range(3):
+            try:
+                return self._read_columns(names)
+            except FileNotFoundError:
+                continue  # a compaction replaced segments while we were listing them
+        return self._read_columns(names)
+
+    def __len__(self) -> int:
+        return len(self.columns("id")["id"])
+
+    # Queries
+
+    def posts_per_day(self, days: int = None) -> Dict[str, int]:
+        """Published posts per local calendar day, oldest first (last `days` days if given)"""
+        posted_at = [ts for status, ts in zip(*self.columns("status", "posted_at").values())
+                     if status == "posted" and ts >= 0]
+        if days:
+            cutoff = time.time() - days * 86400
+            posted_at = [ts for ts in posted_at if ts >= cutoff]
+        counts = Counter(datetime.fromtimestamp(ts).strftime("%Y-%m-%d") for ts in posted_at)
+        return dict(sorted(counts.items()))
+
+    def failure_rate_by_provider(self) -> Dict[str, Dict]:
+        """Per provider: finished posts, dead letters and the share that ended dead-lettered"""
+        totals, failed = Counter(), Counter()
+        for status, provider in zip(*self.columns("status", "provider").values()):
+            if status in ("posted", "dead_letter"):
+                totals[provider] += 1
+                failed[provider] += status == "dead_letter"
+        return {provider: {"total": totals[provider], "failed": failed[provider],
+                           "failure_rate": round(failed[provider] / totals[provider], 3)}
+                for provider in sorted(totals)}
+
+    def median_publish_latency(self) -> Optional[float]:
+        """Median seconds from the scheduled time to publication (None if nothing was published)"""
+        data = self.columns("status", "scheduled_time", "posted_at")
+        latencies = [posted - scheduled for status, scheduled, posted in zip(*data.values())
+                     if status == "posted" and scheduled >= 0 and posted >= 0]
+        return float(statistics.median(latencies)) if latencies else None
+
+    def summary(self, days: int = 14) -> Dict:
+        statuses = Counter(self.columns("status")["status"])
+        return {
+            "archived": sum(statuses.values()),
+            "by_status": dict(statuses),
+            "posts_per_day": self.posts_per_day(days),
+            "failure_rate_by_provider": self.failure_rate_by_provider(),
+            "median_publish_latency": self.median_publish_latency(),
+        }
+
+    # Internals
+
+    def _segment_names(self) -> List[str]:
+        return sorted(name for name in os.listdir(self.directory) if name.endswith(SEGMENT_SUFFIX))
+
+    def _write_segment(self, data: bytes, name: str = None):
+        name = name or f"segment-{time.time_ns()}-{os.getpid()}{SEGMENT_SUFFIX}"
+        tmp_path = os.path.join(self.directory, f".{name}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, os.path.join(self.directory, name))
+
+    def _read_columns(self, names) -> Dict[str, List]:
+        segment_names = self._segment_names()
+        with self._lock:
+            for stale in set(self._segments) - set(segment_names):
+                del self._segments[stale]
+            segments = []
+            for name in segment_names:
+                if name not in self._segments:
+                    self._segments[name] = _Segment(os.path.join(self.directory, name))
+                segments.append(self._segments[name])
+            result = {name: [] for name in names}
+            seen = set()
+            for segment in segments:
+                ids = segment.column("id")
+                columns = [segment.column(name) for name in names]
+                for i, post_id in enumerate(ids):
+                    # A crash between writing a segment and saving the schedule can archive a post twice
+                    if post_id in seen:
+                        continue
+                    seen.add(post_id)
+                    for name, values in zip(names, columns):
+                        result[name].append(values[i])
+        return result
+
+    def _compact(self):
+        """Merge all segments into one (caller holds the file lock)"""
+        names = self._segment_names()
+        segments = [_Segment(os.path.join(self.directory, name)) for name in names]
+        rows, seen = [], set()
+        for segment in segments:
+            columns = {name: segment.column(name) for name in COLUMNS}
+            for i, post_id in enumerate(columns["id"]):
+                if post_id in seen:
+                    continue
+                seen.add(post_id)
+                rows.append({name: values[i] for name, values in columns.items()})
+        self._write_segment(encode_segment(rows))
+        for name in names:
+            os.remove(os.path.join(self.directory, name))
+        print(f"🗜️ Merged {len(names)} archive segments ({len(rows)} posts)")
+
+
+_archive: Optional[PostArchive] = None
+_archive_lock = threading.Lock()
+
+
+def get_post_archive() -> PostArchive:
+    """Process-wide archive in config.POST_ARCHIVE_DIR"""
+    global _archive
+    with _archive_lock:
+        if _archive is None:
+            _archive = PostArchive(config.POST_ARCHIVE_DIR)
+        return _archive
+
+
+def reset_post_archive():
+    """Drop the process-wide archive so the next call picks up changed config"""
+    global _archive
+    with _archive_lock:
+        _archive = None
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Summarize the archived post history")
+    parser.add_argument("--days", type=int, default=14, help="Days covered by the posts-per-day breakdown")
+    args = parser.parse_args()
+    print(json.dumps(get_post_archive().summary(args.days), indent=2))
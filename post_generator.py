@@ -1,13 +1,117 @@
 """
 Module to generate LinkedIn post drafts from trending topics
 Supports multiple free LLM APIs: Groq, Together AI, Hugging Face
+(requests is only imported when an API is actually called)
 """
 import os
 import random
-import requests
 import json
-from typing import Dict, List, Optional
+import re
+import threading
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
 import config
+from tracing import tracer
+from rate_limiter import estimate_tokens, get_limiter
+from hashtag_index import get_hashtag_index
+from similarity_index import find_similar_posts, record_post
+from local_llm import get_local_llm, local_llm_enabled
+from models import Draft
+import metrics
+
+_http_session = None
+_http_session_lock = threading.Lock()
+
+
+def get_http_session():
+    """Process-wide requests session so every provider call reuses pooled connections"""
+    global _http_session
+    if _http_session is None:
+        with _http_session_lock:
+            if _http_session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=8, pool_maxsize=16)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _http_session = session
+    return _http_session
+
+
+# AI-enhanced template components; a variant is one index into each list
+TEMPLATE_OPENINGS = [
+    "🔥 {title}",
+    "💡 Interesting development: {title}",
+    "📰 Breaking: {title}",
+    "🚀 {title}",
+    "⚡ {title}"
+]
+TEMPLATE_LEAD_INS = [
+    "",
+    "Here's what caught my attention: ",
+    "Key points: ",
+    "What this means: "
+]
+TEMPLATE_HOOKS = [
+    "This got me thinking about the future of our industry...",
+    "Here's my perspective on this development:",
+    "Interesting implications for the tech landscape:",
+    "This is worth discussing because:",
+    "What stands out to me:",
+    "My take on this trend:",
+    "This development raises important questions:",
+    "Food for thought:"
+]
+TEMPLATE_INSIGHTS = [
+    "The implications for businesses are significant.",
+    "This could reshape how we think about technology.",
+    "It's developments like this that drive innovation forward.",
+    "The timing of this is particularly interesting.",
+    "This aligns with broader trends we're seeing."
+]
+TEMPLATE_CTAS = [
+    "💭 What's your perspective on this?",
+    "🤔 What do you think?",
+    "💬 I'd love to hear your thoughts.",
+    "🎯 How does this impact your work?",
+    "💭 Share your thoughts below."
+]
+
+
+# Formatter lookups, built once instead of on every post
+FORMAT_HOOKS = [
+    "This got me thinking...",
+    "Here's my take:",
+    "Interesting development:",
+]
+HOOK_WORDS = ("think", "take", "perspective", "interesting", "discuss")
+CTA_WORDS = ("perspective", "think")
+_KEYWORD_HASHTAGS = {keyword: f"#{keyword.title()}" for keyword in (
+    "ai", "tech", "software", "startup", "digital", "cloud", "data",
+    "business", "leadership", "strategy", "growth", "entrepreneur")}
+COMMON_HASHTAGS = ["#LinkedIn", "#Technology", "#Innovation", "#Business"]
+
+
+def _contains_any(text: str, words) -> bool:
+    """Substring check that stops at the first hit (faster than a regex alternation here)"""
+    for word in words:
+        if word in text:
+            return True
+    return False
+
+
+@lru_cache(maxsize=4096)
+def _title_hashtags(title: str) -> str:
+    """Up to 3 keyword hashtags from the title followed by 2 common ones"""
+    hashtags = []
+    for keyword in title.lower().split():
+        tag = _KEYWORD_HASHTAGS.get(keyword)
+        if tag:
+            hashtags.append(tag)
+            if len(hashtags) == 3:
+                break
+    return " ".join(hashtags + COMMON_HASHTAGS[:2])
 
 
 class PostGenerator:
@@ -29,7 +133,17 @@ class PostGenerator:
         self.groq_api_url = "https://api.groq.com/openai/v1/chat/completions"
         # Together AI API (free tier)
         self.together_api_url = "https://api.together.xyz/v1/chat/completions"
+        # Provider of the most recent generate_post() on any thread; shared generators
+        # should take it from generate_post_with_provider() instead
+        self.last_provider = None
+    
+    def _generated(self, post: str, provider: str) -> Tuple[str, str]:
+        """Remember and trace which provider produced the post"""
+        self.last_provider = provider
+        tracer.annotate(provider=provider)
+        return post, provider
     
+    @tracer.traced("llm.groq")
     def generate_with_groq(self, topic: Dict) -> Optional[str]:
         """Generate post using Groq API (very fast, free tier)"""
         try:
@@ -74,7 +188,13 @@ LinkedIn Post:"""
                 "max_tokens": 200
             }
             
-            response = requests.post(self.groq_api_url, headers=headers, json=payload, timeout=15)
+            limiter = get_limiter("groq")
+            tokens = estimate_tokens(prompt, payload["max_tokens"])
+            if not limiter.acquire(tokens):
+                return None
+            response = get_http_session().post(self.groq_api_url, headers=headers, json=payload, timeout=15)
+            limiter.record_response(response, tokens)
+            tracer.annotate(status_code=response.status_code)
             
             if response.status_code == 200:
                 result = response.json()
@@ -85,12 +205,15 @@ LinkedIn Post:"""
                     return post
             else:
                 print(f"⚠️ Groq API returned status {response.status_code}")
+                metrics.PROVIDER_ERRORS.labels(provider="groq").inc()
                 return None
                 
         except Exception as e:
             print(f"⚠️ Error with Groq API: {e}")
+            metrics.PROVIDER_ERRORS.labels(provider="groq").inc()
             return None
     
+    @tracer.traced("llm.together")
     def generate_with_together(self, topic: Dict) -> Optional[str]:
         """Generate post using Together AI API (free tier)"""
         try:
@@ -135,7 +258,13 @@ LinkedIn Post:"""
                 "max_tokens": 200
             }
             
-            response = requests.post(self.together_api_url, headers=headers, json=payload, timeout=20)
+            limiter = get_limiter("together")
+            tokens = estimate_tokens(prompt, payload["max_tokens"])
+            if not limiter.acquire(tokens):
+                return None
+            response = get_http_session().post(self.together_api_url, headers=headers, json=payload, timeout=20)
+            limiter.record_response(response, tokens)
+            tracer.annotate(status_code=response.status_code)
             
             if response.status_code == 200:
                 result = response.json()
@@ -146,14 +275,198 @@ LinkedIn Post:"""
                     return post
             else:
                 print(f"⚠️ Together AI returned status {response.status_code}")
+                metrics.PROVIDER_ERRORS.labels(provider="together").inc()
                 return None
                 
         except Exception as e:
             print(f"⚠️ Error with Together AI: {e}")
+            metrics.PROVIDER_ERRORS.labels(provider="together").inc()
             return None
     
+    @tracer.traced("llm.batch")
+    def generate_batch_with_chat(self, provider: str, topics: List[Dict]) -> Dict[int, str]:
+        """Generate posts for several topics with one Groq/Together completion
+
+        Returns {index in topics: formatted post} for the entries that parsed
+        and validated; anything missing is left to the per-topic path.
+        """
+        endpoints = {
+            "groq": (self.groq_api_key, self.groq_api_url, "llama-3.1-8b-instant", 30),
+            "together": (self.together_api_key, self.together_api_url, "meta-llama/Llama-3-8b-chat-hf", 40),
+        }
+        api_key, api_url, model, timeout = endpoints[provider]
+        tracer.annotate(provider=provider, batch_size=len(topics))
+        try:
+            if not api_key or not topics:
+                return {}
+            
+            topic_lines = []
+            for i, topic in enumerate(topics, 1):
+                description = topic.get("description", "")
+                topic_lines.append(f"Topic {i}: {topic.get('title', '')}")
+                if description:
+                    topic_lines.append(description[:200])
+                topic_lines.append("")
+            topic_block = "\n".join(topic_lines)
+            
+            prompt = f"""Write {len(topics)} separate professional LinkedIn posts, one for each topic below.
+
+{topic_block}
+Requirements for every post:
+- Professional and engaging tone
+- Include a hook to grab attention
+- Add personal insights or perspective
+- Include relevant hashtags
+- Keep it under {self.max_length} characters
+- End with a call to action
+
+Respond with JSON only, in this format:
+{{"posts": [{{"topic": 1, "post": "..."}}, {{"topic": 2, "post": "..."}}]}}"""
+            
+            headers = {
+                "Authorization": f"Bearer {api_key}",
+                "Content-Type": "application/json"
+            }
+            
+            payload = {
+                "model": model,
+                "messages": [
+                    {
+                        "role": "system",
+                        "content": "You are a professional LinkedIn content creator. Write engaging, professional posts that add value."
+                    },
+                    {
+                        "role": "user",
+                        "content": prompt
+                    }
+                ],
+                "temperature": 0.7,
+                # Same per-post budget as a single call, plus room for the JSON wrapper
+                "max_tokens": 200 * len(topics) + 50
+            }
+            if provider == "groq":
+                payload["response_format"] = {"type": "json_object"}
+            
+            limiter = get_limiter(provider)
+            tokens = estimate_tokens(prompt, payload["max_tokens"])
+            if not limiter.acquire(tokens):
+                return {}
+            response = get_http_session().post(api_url, headers=headers, json=payload, timeout=timeout)
+            limiter.record_response(response, tokens)
+            tracer.annotate(status_code=response.status_code)
+            
+            if response.status_code != 200:
+                print(f"⚠️ {provider} batch request returned status {response.status_code}")
+                metrics.PROVIDER_ERRORS.labels(provider=provider).inc()
+                return {}
+            
+            generated_text = response.json().get('choices', [{}])[0].get('message', {}).get('content', '')
+            posts = {}
+            for index, text in self._parse_batch_response(generated_text, len(topics)).items():
+                posts[index] = self._format_generated_post(text, topics[index])
+            
+            metrics.LLM_BATCH_TOPICS.labels(provider=provider, result="generated").inc(len(posts))
+            metrics.LLM_BATCH_TOPICS.labels(provider=provider, result="fallback").inc(len(topics) - len(posts))
+            tracer.annotate(parsed=len(posts))
+            print(f"✅ Generated {len(posts)}/{len(topics)} posts in one {provider} request")
+            return posts
+        
+        except Exception as e:
+            print(f"⚠️ Error with {provider} batch request: {e}")
+            metrics.PROVIDER_ERRORS.labels(provider=provider).inc()
+            return {}
+    
+    def _parse_batch_response(self, text: str, count: int) -> Dict[int, str]:
+        """Split a batched JSON response into {topic index: post text}, keeping only valid entries"""
+        text = (text or "").strip()
+        # Some models wrap JSON in a markdown code fence
+        if text.startswith("```"):
+            text = text.strip("`").strip()
+            if text.lower().startswith("json"):
+                text = text[4:]
+        
+        entries = []
+        try:
+            data = json.loads(text)
+            entries = data.get("posts", []) if isinstance(data, dict) else data
+        except ValueError:
+            # Truncated or chatty output: salvage every complete entry object
+            decoder = json.JSONDecoder()
+            for match in re.finditer(r'\{\s*"(?:topic|post)"', text):
+                try:
+                    entry, _ = decoder.raw_decode(text, match.start())
+                    entries.append(entry)
+                except ValueError:
+                    continue
+        
+        posts = {}
+        for entry in entries if isinstance(entries, list) else []:
+            if not isinstance(entry, dict):
+                continue
+            try:
+                index = int(entry.get("topic")) - 1
+            except (TypeError, ValueError):
+                continue
+            post = entry.get("post")
+            if not 0 <= index < count or index in posts or not isinstance(post, str):
+                continue
+            # Anything shorter is a truncated or placeholder entry; regenerate it on its own
+            if len(post.strip()) < 50:
+                continue
+            posts[index] = post
+        return posts
+    
+    def _chat_messages(self, topic: Dict) -> List[Dict]:
+        """System + user messages for one topic (same instructions as the Groq prompt)"""
+        title = topic.get("title", "")
+        description = topic.get("description", "")
+        prompt = f"""Write a professional LinkedIn post about: {title}
+
+{description[:200] if description else ''}
+
+Requirements:
+- Professional and engaging tone
+- Include a hook to grab attention
+- Add personal insights or perspective
+- Include relevant hashtags
+- Keep it under {self.max_length} characters
+- End with a call to action
+
+LinkedIn Post:"""
+        return [
+            {"role": "system", "content": "You are a professional LinkedIn content creator. Write engaging, professional posts that add value."},
+            {"role": "user", "content": prompt}
+        ]
+    
+    @tracer.traced("llm.local")
+    def generate_with_local(self, topic: Dict) -> Optional[str]:
+        """Generate post with the local CPU model (no network, no quota)"""
+        return self.generate_batch_with_local([topic]).get(0)
+    
+    def generate_batch_with_local(self, topics: List[Dict]) -> Dict[int, str]:
+        """Generate posts for several topics in one local model call; returns {index: post}"""
+        try:
+            model = get_local_llm()
+            if model is None or not topics:
+                return {}
+            replies = model.generate([self._chat_messages(topic) for topic in topics],
+                                     max_tokens=config.LOCAL_LLM_MAX_TOKENS)
+            tracer.annotate(tokens_per_second=round(model.last_tokens_per_second, 1))
+            posts = {}
+            for i, reply in enumerate(replies):
+                if reply and reply.strip():
+                    posts[i] = self._format_generated_post(reply, topics[i])
+            print(f"✅ Generated {len(posts)}/{len(topics)} post(s) with the local model")
+            return posts
+        except Exception as e:
+            print(f"⚠️ Error with local model: {e}")
+            metrics.PROVIDER_ERRORS.labels(provider="local").inc()
+            return {}
+    
+    @tracer.traced("llm.huggingface")
     def generate_with_huggingface(self, topic: Dict) -> str:
         """Generate post using Hugging Face Inference API (free tier)"""
+        import requests
         try:
             if not self.hf_api_key:
                 print("⚠️ Hugging Face API key not found. Using template generation.")
@@ -192,7 +505,11 @@ LinkedIn Post:"""
             ]
             
             # Try each model until one works
+            limiter = get_limiter("huggingface")
             for model_name in models_to_try:
+                tracer.step("llm.huggingface.model", model=model_name)
+                if not limiter.acquire(estimate_tokens(prompt, 150)):
+                    break
                 try:
                     # Try the new router endpoint format first
                     # Format: https://router.huggingface.co/hf-inference/models/{model_name}
@@ -241,7 +558,8 @@ LinkedIn Post:"""
                     for header_variant in headers_variants:
                         try:
                             print(f"🔄 Trying router endpoint for {model_name} with auth variant...")
-                            response = requests.post(router_url, headers=header_variant, json=payload, timeout=30)
+                            response = get_http_session().post(router_url, headers=header_variant, json=payload, timeout=30)
+                            limiter.record_response(response)
                         
                             # If router endpoint works, use it
                             if response.status_code == 200:
@@ -256,6 +574,8 @@ LinkedIn Post:"""
                             elif response.status_code == 404:
                                 print(f"⚠️ Model {model_name} not found on router endpoint")
                                 break  # Model not found, try next model
+                            elif response.status_code == 429:
+                                break  # Rate limited, the limiter holds back further calls
                             else:
                                 # Other error, try next variant
                                 continue
@@ -267,7 +587,8 @@ LinkedIn Post:"""
                     if not response or response.status_code == 401:
                         print(f"🔄 All router auth variants failed, trying old endpoint as fallback...")
                         try:
-                            response = requests.post(old_api_url, headers=headers_variants[0], json=payload, timeout=30)
+                            response = get_http_session().post(old_api_url, headers=headers_variants[0], json=payload, timeout=30)
+                            limiter.record_response(response)
                         except:
                             response = None
                     
@@ -278,6 +599,7 @@ LinkedIn Post:"""
                     
                     # Debug: Print response details
                     if response:
+                        tracer.step_annotate(status_code=response.status_code)
                         print(f"📡 Model {model_name}: Status {response.status_code}")
                         if response.status_code == 200:
                             # Success! Process the response
@@ -342,42 +664,34 @@ LinkedIn Post:"""
             
             # If all models failed, use AI-enhanced template
             print("⚠️ Hugging Face API endpoints deprecated. Using AI-enhanced template generation.")
+            metrics.PROVIDER_ERRORS.labels(provider="huggingface").inc()
             return self._generate_ai_enhanced_template(topic)
             
         except Exception as e:
             print(f"⚠️ Error with Hugging Face API: {e}. Using template generation.")
+            metrics.PROVIDER_ERRORS.labels(provider="huggingface").inc()
             return self._generate_template_post(topic)
     
     def _format_generated_post(self, generated_text: str, topic: Dict) -> str:
         """Format and clean the generated text into a LinkedIn post"""
-        # Clean the text - remove prompt if it was included
+        # Clean the text - keep what follows the last "Post:" if the model echoed the prompt
         post = generated_text.strip()
+        marker = post.rfind("Post:")
+        if marker != -1:
+            post = post[marker + 5:].strip()
         
-        # Remove the prompt text if model included it
-        if "Post:" in post:
-            post = post.split("Post:")[-1].strip()
+        # Still starts with prompt text: keep the first line that isn't part of it
         if "Write a professional" in post:
-            # Find where the actual post starts
-            lines = post.split('\n')
-            post_lines = []
-            skip_prompt = True
-            for line in lines:
-                if "Post:" in line or (skip_prompt and line.strip() and not line.startswith("Write")):
-                    skip_prompt = False
-                    if "Post:" in line:
-                        post_lines.append(line.split("Post:")[-1].strip())
-                    else:
-                        post_lines.append(line.strip())
-            post = '\n\n'.join([l for l in post_lines if l])
+            post = next((line.strip() for line in post.split('\n')
+                         if line.strip() and not line.startswith("Write")), "")
         
         # Clean up any weird formatting
-        post = post.replace('\n\n\n', '\n\n')
-        post = post.strip()
+        post = post.replace('\n\n\n', '\n\n').strip()
         
-        # Remove incomplete sentences at the end
-        sentences = post.split('.')
-        if len(sentences) > 1 and len(sentences[-1].strip()) < 10:
-            post = '. '.join(sentences[:-1]) + '.'
+        # Remove incomplete sentences at the end (sentence breaks become ". ")
+        last_period = post.rfind('.')
+        if last_period != -1 and len(post[last_period + 1:].strip()) < 10:
+            post = post[:last_period].replace('.', '. ') + '.'
         
         # Ensure minimum length
         if len(post.strip()) < 50:
@@ -385,35 +699,26 @@ LinkedIn Post:"""
             post = f"{post}\n\nThis is an interesting development that's worth discussing."
         
         # Add title as header if not present
-        if topic.get('title') and topic['title'] not in post[:100]:
-            post = f"🔥 {topic['title']}\n\n{post}"
+        title = topic.get('title')
+        if title and title not in post[:100]:
+            post = f"🔥 {title}\n\n{post}"
         
         # Add a hook if the post is too direct
-        if not any(hook in post for hook in ["think", "take", "perspective", "interesting", "discuss"]):
-            hooks = [
-                "This got me thinking...",
-                "Here's my take:",
-                "Interesting development:",
-            ]
-            import random
-            hook = random.choice(hooks)
-            if topic.get('title') in post:
+        if not _contains_any(post, HOOK_WORDS):
+            hook = random.choice(FORMAT_HOOKS)
+            if title in post:
                 # Insert hook after title
-                parts = post.split('\n\n', 1)
-                if len(parts) > 1:
-                    post = f"{parts[0]}\n\n{hook} {parts[1]}"
+                head, sep, rest = post.partition('\n\n')
+                if sep:
+                    post = f"{head}\n\n{hook} {rest}"
         
         # Add call to action if missing
-        if "perspective" not in post.lower() and "think" not in post.lower():
-            post += "\n\n💭 What's your perspective on this?"
+        cta = "" if _contains_any(post.lower(), CTA_WORDS) else "\n\n💭 What's your perspective on this?"
         
-        # Add hashtags
-        hashtags = self._generate_hashtags(topic.get('title', ''), topic.get('source', ''))
-        post += f"\n\n{hashtags}"
-        
-        # Add URL if available
-        if topic.get('url'):
-            post += f"\n\n🔗 Read more: {topic['url']}"
+        # Add hashtags and URL if available
+        hashtags = self._generate_hashtags(topic.get('title', ''), topic.get('source', ''), topic.get('description', ''))
+        link = f"\n\n🔗 Read more: {topic['url']}" if topic.get('url') else ""
+        post = f"{post}{cta}\n\n{hashtags}{link}"
         
         # Ensure length compliance
         if len(post) > self.max_length:
@@ -446,84 +751,80 @@ LinkedIn Post:"""
     
     def _generate_ai_enhanced_template(self, topic: Dict) -> str:
         """Generate a post using AI-enhanced templates (more varied and natural)"""
+        ids = {"opening": random.randrange(len(TEMPLATE_OPENINGS))}
+        if topic.get("description", ""):
+            ids["lead_in"] = random.randrange(len(TEMPLATE_LEAD_INS))
+        ids["hook"] = random.randrange(len(TEMPLATE_HOOKS))
+        ids["insight"] = random.randrange(len(TEMPLATE_INSIGHTS))
+        ids["cta"] = random.randrange(len(TEMPLATE_CTAS))
+        return self._template_renderer(topic)(ids)
+    
+    def generate_template_variants(self, topic: Dict, count: int = 100, seed: Optional[int] = None) -> List[Dict]:
+        """Up to count distinct AI-enhanced template posts for one topic (for A/B testing)
+        
+        Every combination of opening, lead-in, hook, insight and CTA has an
+        index; count distinct indexes are sampled with random.Random(seed) (all
+        of them, in order, if count covers the whole space). Each variant
+        comes back with its component ids so it can be scored and reproduced.
+        """
+        has_description = bool(topic.get("description", ""))
+        # Mixed-radix digits, last component varies fastest
+        radices = [("opening", len(TEMPLATE_OPENINGS))]
+        if has_description:
+            radices.append(("lead_in", len(TEMPLATE_LEAD_INS)))
+        radices += [("hook", len(TEMPLATE_HOOKS)), ("insight", len(TEMPLATE_INSIGHTS)), ("cta", len(TEMPLATE_CTAS))]
+        total = 1
+        for _, radix in radices:
+            total *= radix
+        
+        if count >= total:
+            indexes = range(total)
+        else:
+            indexes = random.Random(seed).sample(range(total), max(count, 0))
+        
+        render = self._template_renderer(topic)
+        variants = []
+        for index in indexes:
+            ids = {}
+            remainder = index
+            for name, radix in reversed(radices):
+                remainder, ids[name] = divmod(remainder, radix)
+            ids = {name: ids[name] for name, _ in radices}
+            variants.append({
+                "variant_id": "-".join(f"{name}{ids[name]}" for name, _ in radices),
+                "index": index,
+                "components": ids,
+                "content": render(ids)
+            })
+        return variants
+    
+    def _template_renderer(self, topic: Dict):
+        """Precompute the topic-specific parts once and return ids -> post"""
         title = topic.get("title", "")
         description = topic.get("description", "")
         url = topic.get("url", "")
         source = topic.get("source", "")
         
-        # More varied opening styles
-        openings = [
-            f"🔥 {title}",
-            f"💡 Interesting development: {title}",
-            f"📰 Breaking: {title}",
-            f"🚀 {title}",
-            f"⚡ {title}"
-        ]
-        
-        post = random.choice(openings) + "\n\n"
-        
-        # Add description with variation
+        openings = [opening.format(title=title) for opening in TEMPLATE_OPENINGS]
+        body = ""
         if description:
-            desc = description[:180]
-            # Sometimes add a lead-in
-            lead_ins = [
-                "",
-                "Here's what caught my attention: ",
-                "Key points: ",
-                "What this means: "
-            ]
-            post += random.choice(lead_ins) + desc
-            if len(description) > 180:
-                post += "..."
-            post += "\n\n"
-        
-        # More varied hooks
-        hooks = [
-            "This got me thinking about the future of our industry...",
-            "Here's my perspective on this development:",
-            "Interesting implications for the tech landscape:",
-            "This is worth discussing because:",
-            "What stands out to me:",
-            "My take on this trend:",
-            "This development raises important questions:",
-            "Food for thought:"
-        ]
-        
-        # Add personal insights
-        insights = [
-            "The implications for businesses are significant.",
-            "This could reshape how we think about technology.",
-            "It's developments like this that drive innovation forward.",
-            "The timing of this is particularly interesting.",
-            "This aligns with broader trends we're seeing."
-        ]
-        
-        post += f"{random.choice(hooks)}\n\n"
-        post += f"{random.choice(insights)}\n\n"
-        
-        # Varied CTAs
-        ctas = [
-            "💭 What's your perspective on this?",
-            "🤔 What do you think?",
-            "💬 I'd love to hear your thoughts.",
-            "🎯 How does this impact your work?",
-            "💭 Share your thoughts below."
-        ]
-        
-        post += random.choice(ctas) + "\n\n"
-        
-        # Add hashtags
-        hashtags = self._generate_hashtags(title, source)
-        post += hashtags
-        
+            body = description[:180] + ("..." if len(description) > 180 else "") + "\n\n"
+        tail = self._generate_hashtags(title, source, description)
         if url:
-            post += f"\n\n🔗 Read more: {url}"
-        
-        # Ensure length compliance
-        if len(post) > self.max_length:
-            post = post[:self.max_length - 20] + "..."
-        
-        return post
+            tail += f"\n\n🔗 Read more: {url}"
+        max_length = self.max_length
+        
+        def render(ids: Dict) -> str:
+            lead_in = TEMPLATE_LEAD_INS[ids["lead_in"]] if body else ""
+            post = (f"{openings[ids['opening']]}\n\n{lead_in}{body}"
+                    f"{TEMPLATE_HOOKS[ids['hook']]}\n\n{TEMPLATE_INSIGHTS[ids['insight']]}\n\n"
+                    f"{TEMPLATE_CTAS[ids['cta']]}\n\n{tail}")
+            # Ensure length compliance
+            if len(post) > max_length:
+                post = post[:max_length - 20] + "..."
+            return post
+        
+        return render
     
     def _generate_template_post(self, topic: Dict) -> str:
         """Generate a post using a template (fallback method)"""
@@ -555,7 +856,7 @@ LinkedIn Post:"""
         post += "💭 What's your perspective on this?\n\n"
         
         # Add relevant hashtags
-        hashtags = self._generate_hashtags(title, source)
+        hashtags = self._generate_hashtags(title, source, description)
         post += hashtags
         
         if url:
@@ -567,79 +868,140 @@ LinkedIn Post:"""
         
         return post
     
-    def _generate_hashtags(self, title: str, source: str) -> str:
-        """Generate relevant hashtags based on title"""
-        common_hashtags = ["#LinkedIn", "#Technology", "#Innovation", "#Business"]
-        
-        # Extract keywords from title
-        keywords = title.lower().split()
-        tech_keywords = ["ai", "tech", "software", "startup", "digital", "cloud", "data"]
-        business_keywords = ["business", "leadership", "strategy", "growth", "entrepreneur"]
-        
-        hashtags = []
-        for keyword in keywords:
-            if keyword in tech_keywords:
-                hashtags.append(f"#{keyword.title()}")
-            elif keyword in business_keywords:
-                hashtags.append(f"#{keyword.title()}")
-        
-        # Limit hashtags
-        hashtags = hashtags[:3] + common_hashtags[:2]
-        return " ".join(hashtags[:5])
+    def _generate_hashtags(self, title: str, source: str, description: str = "") -> str:
+        """Generate relevant hashtags based on title and description
+        
+        Uses TF-IDF over the fetched-topic corpus once it has HASHTAG_MIN_DOCS
+        topics, otherwise the built-in keyword lists.
+        """
+        index = get_hashtag_index()
+        if len(index) < config.HASHTAG_MIN_DOCS:
+            return _title_hashtags(title)
+        hashtags = index.hashtags(title, description, limit=config.HASHTAG_COUNT)
+        for common in COMMON_HASHTAGS:
+            if len(hashtags) >= 3:
+                break
+            if common not in hashtags:
+                hashtags.append(common)
+        return " ".join(hashtags)
     
     def generate_post(self, topic: Dict) -> str:
         """Generate a LinkedIn post from a topic"""
+        return self.generate_post_with_provider(topic)[0]
+    
+    @tracer.traced("generate.post")
+    def generate_post_with_provider(self, topic: Dict) -> Tuple[str, str]:
+        """Generate a LinkedIn post and return it with the provider that wrote it
+        
+        Safe on a generator shared between threads, unlike reading
+        last_provider after the call.
+        """
         try:
             # Use LLM if enabled and available, otherwise use template
             if self.use_llm:
+                # 0. Local model first when configured for high-volume drafting
+                if config.LOCAL_LLM_FIRST and local_llm_enabled():
+                    print(f"🧠 Trying local model...")
+                    result = self.generate_with_local(topic)
+                    if result:
+                        return self._generated(result, "local")
+                
                 # Try multiple free LLM APIs in order of preference
                 # 1. Groq (fastest, free tier)
                 if self.groq_api_key:
                     print(f"🤖 Trying Groq API...")
                     result = self.generate_with_groq(topic)
                     if result:
-                        return result
+                        return self._generated(result, "groq")
                 
                 # 2. Together AI (free tier)
                 if self.together_api_key:
                     print(f"🤖 Trying Together AI...")
                     result = self.generate_with_together(topic)
                     if result:
-                        return result
+                        return self._generated(result, "together")
                 
                 # 3. Hugging Face (if available)
                 if self.hf_api_key:
                     print(f"🤖 Trying Hugging Face API...")
                     result = self.generate_with_huggingface(topic)
                     if result and not result.startswith("🔥"):  # If it's not a template
-                        return result
+                        return self._generated(result, "huggingface")
+                
+                # 4. Local model (works offline and without quota)
+                if not config.LOCAL_LLM_FIRST and local_llm_enabled():
+                    print(f"🧠 Trying local model...")
+                    result = self.generate_with_local(topic)
+                    if result:
+                        return self._generated(result, "local")
                 
                 # If all APIs failed, use AI-enhanced template
                 print("⚠️ All LLM APIs failed. Using AI-enhanced template.")
-                return self._generate_ai_enhanced_template(topic)
+                return self._generated(self._generate_ai_enhanced_template(topic), "ai_template")
             else:
                 print("📝 Using template generation (LLM disabled)")
-                return self._generate_template_post(topic)
+                return self._generated(self._generate_template_post(topic), "template")
         except Exception as e:
             print(f"Error generating post: {e}")
             import traceback
             traceback.print_exc()
-            return self._generate_template_post(topic)
+            return self._generated(self._generate_template_post(topic), "template")
     
-    def generate_multiple_drafts(self, topics: List[Dict], count: int = 3) -> List[Dict]:
+    def generate_multiple_drafts(self, topics: List[Dict], count: int = 3) -> List[Draft]:
         """Generate multiple post drafts from topics"""
+        topics = topics[:count]
+        batched = self._generate_batched(topics)
         drafts = []
         
-        for i, topic in enumerate(topics[:count]):
-            post_content = self.generate_post(topic)
-            drafts.append({
-                "id": i + 1,
-                "topic": topic.get("title", ""),
-                "content": post_content,
-                "source": topic.get("source", ""),
-                "url": topic.get("url", ""),
-                "length": len(post_content)
-            })
+        for i, topic in enumerate(topics):
+            title = topic.get("title", "")
+            # Past drafts/posts on the same subject, to avoid repeating ourselves
+            similar = find_similar_posts(f"{title}\n{topic.get('description', '')}")
+            if similar:
+                print(f"♻️ '{title[:50]}' is similar to {len(similar)} past post(s) "
+                      f"(best {similar[0]['score']:.2f}: {similar[0]['title'][:50]})")
+            
+            # Topics the batched request didn't cover go through the regular provider chain
+            post_content = batched.get(i) or self.generate_post(topic)
+            record_post(post_content, title, "draft", url=topic.get("url", ""))
+            drafts.append(Draft(
+                id=i + 1,
+                topic=title,
+                content=post_content,
+                source=topic.get("source", ""),
+                url=topic.get("url", ""),
+                length=len(post_content),
+                similar_posts=similar
+            ))
         
         return drafts
-
+    
+    def _generate_batched(self, topics: List[Dict]) -> Dict[int, str]:
+        """Generate up to LLM_BATCH_SIZE topics per Groq/Together request (or per local model call)"""
+        results = {}
+        batch_size = config.LLM_BATCH_SIZE
+        if not self.use_llm or batch_size < 2 or len(topics) < 2:
+            return results
+        
+        providers = [("groq", self.groq_api_key), ("together", self.together_api_key)]
+        if local_llm_enabled():
+            providers.insert(0 if config.LOCAL_LLM_FIRST else len(providers), ("local", True))
+        
+        for start in range(0, len(topics), batch_size):
+            chunk = range(start, min(start + batch_size, len(topics)))
+            for provider, api_key in providers:
+                pending = [i for i in chunk if i not in results]
+                # A single leftover topic costs the same either way; let generate_post handle it
+                if len(pending) < 2:
+                    break
+                if not api_key:
+                    continue
+                print(f"🤖 Generating {len(pending)} posts in one {provider} request...")
+                if provider == "local":
+                    posts = self.generate_batch_with_local([topics[i] for i in pending])
+                else:
+                    posts = self.generate_batch_with_chat(provider, [topics[i] for i in pending])
+                for j, post in posts.items():
+                    results[pending[j]] = post
+        
+        return results
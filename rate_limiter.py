@@ -0,0 +1,182 @@
+"""
+Per-provider rate limiting for the free LLM APIs
+
+Each provider gets a request bucket and (optionally) a token bucket sized
+from config.LLM_RATE_LIMITS. Calls reserve capacity before they are sent and
+wait for it if needed; if the wait would exceed LLM_RATE_LIMIT_MAX_WAIT the
+call is skipped so the generator falls through to the next provider instead
+of sending a request that will get a 429. Token rate-limit headers and token
+usage from responses keep the token bucket in line with what the provider
+reports; request-count headers only pause the provider when they hit zero.
+"""
+import re
+import threading
+import time
+from typing import Dict, Optional
+import config
+import metrics
+
+
+class TokenBucket:
+    """Classic token bucket; the level may go negative to carry usage debt"""
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = float(capacity)
+        self.refill_per_second = float(refill_per_second)
+        self.level = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.refill_per_second)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until amount is available (0 if it is now)"""
+        self._refill(now)
+        if self.level >= amount:
+            return 0.0
+        if self.refill_per_second <= 0:
+            return float("inf")
+        return (min(amount, self.capacity) - self.level) / self.refill_per_second
+
+    def consume(self, amount: float):
+        self.level -= amount
+
+    def sync(self, remaining: float, reset_seconds: Optional[float], limit: Optional[float], now: float):
+        """Adopt the provider's view: remaining capacity, refilled to the limit by reset time"""
+        self._refill(now)
+        if limit:
+            self.capacity = float(limit)
+        self.level = min(self.level, float(remaining))
+        if reset_seconds and reset_seconds > 0 and self.capacity > self.level:
+            self.refill_per_second = (self.capacity - self.level) / reset_seconds
+
+
+def parse_duration(value: str) -> Optional[float]:
+    """Parse "7.66s", "1m30s", "250ms", "2h" or plain seconds / epoch timestamps"""
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        seconds = float(value)
+        # Some providers send an absolute reset time
+        return max(0.0, seconds - time.time()) if seconds > 1e9 else seconds
+    except ValueError:
+        pass
+    total = 0.0
+    matched = False
+    for amount, unit in re.findall(r"([\d.]+)(ms|h|m|s)", value):
+        matched = True
+        total += float(amount) * {"ms": 0.001, "s": 1, "m": 60, "h": 3600}[unit]
+    return total if matched else None
+
+
+def _header(headers, *names) -> Optional[str]:
+    for name in names:
+        value = headers.get(name)
+        if value is not None:
+            return value
+    return None
+
+
+def _number(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class ProviderLimiter:
+    """Request and token budgets for one provider, shared across threads"""
+
+    def __init__(self, name: str, requests_per_minute: float, tokens_per_minute: float = None):
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute / 60.0)
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60.0) if tokens_per_minute else None
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, estimated_tokens: int = 0, max_wait: float = None) -> bool:
+        """Reserve one request (and its estimated tokens), waiting up to max_wait seconds"""
+        max_wait = config.LLM_RATE_LIMIT_MAX_WAIT if max_wait is None else max_wait
+        deadline = time.monotonic() + max_wait
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = max(self.blocked_until - now, self.requests.wait_time(1, now))
+                if self.tokens is not None and estimated_tokens:
+                    wait = max(wait, self.tokens.wait_time(estimated_tokens, now))
+                if wait <= 0:
+                    self.requests.consume(1)
+                    if self.tokens is not None:
+                        self.tokens.consume(estimated_tokens)
+                    return True
+                if now + wait > deadline:
+                    print(f"⏳ {self.name} rate limit: next slot in {wait:.0f}s, skipping this call")
+                    metrics.LLM_RATE_LIMITED.labels(provider=self.name).inc()
+                    return False
+            time.sleep(min(wait, max(0.0, deadline - time.monotonic())))
+
+    def record_response(self, response, estimated_tokens: int = 0):
+        """Update budgets from rate-limit headers, token usage and 429s"""
+        headers = getattr(response, "headers", None) or {}
+        now = time.monotonic()
+        with self._lock:
+            # Request headers count a different window than our per-minute bucket (Groq's are
+            # requests per day), so they only pause calls once that budget is used up
+            remaining = _number(_header(headers, "x-ratelimit-remaining-requests", "x-ratelimit-remaining", "ratelimit-remaining"))
+            if remaining is not None and remaining <= 0:
+                reset = parse_duration(_header(headers, "x-ratelimit-reset-requests", "x-ratelimit-reset", "ratelimit-reset"))
+                if reset:
+                    self.blocked_until = max(self.blocked_until, now + reset)
+                    print(f"⏳ {self.name} request quota used up, pausing calls for {reset:.0f}s")
+            # Groq reports tokens per minute, Together uses x-tokenlimit-*
+            remaining_tokens = _number(_header(headers, "x-ratelimit-remaining-tokens", "x-tokenlimit-remaining"))
+            if remaining_tokens is not None:
+                limit_tokens = _number(_header(headers, "x-ratelimit-limit-tokens", "x-tokenlimit-limit"))
+                if self.tokens is None and limit_tokens:
+                    self.tokens = TokenBucket(limit_tokens, limit_tokens / 60.0)
+                if self.tokens is not None:
+                    self.tokens.sync(remaining_tokens, parse_duration(_header(headers, "x-ratelimit-reset-tokens")),
+                                     limit_tokens, now)
+            elif self.tokens is not None:
+                # No header: correct the estimate with the usage the response reports
+                used = None
+                try:
+                    used = response.json().get("usage", {}).get("total_tokens")
+                except Exception:
+                    pass
+                if used is not None:
+                    self.tokens.consume(used - estimated_tokens)
+
+            if getattr(response, "status_code", None) == 429:
+                retry_after = parse_duration(_header(headers, "retry-after", "x-ratelimit-reset-requests",
+                                                     "x-ratelimit-reset")) or 60.0
+                self.blocked_until = max(self.blocked_until, now + retry_after)
+                print(f"⏳ {self.name} returned 429, pausing calls for {retry_after:.0f}s")
+
+
+_limiters: Dict[str, ProviderLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(provider: str) -> ProviderLimiter:
+    """Process-wide limiter for a provider, created from config.LLM_RATE_LIMITS"""
+    with _limiters_lock:
+        limiter = _limiters.get(provider)
+        if limiter is None:
+            limits = config.LLM_RATE_LIMITS.get(provider, {})
+            limiter = ProviderLimiter(provider, limits.get("rpm", 30), limits.get("tpm"))
+            _limiters[provider] = limiter
+        return limiter
+
+
+def reset_limiters():
+    """Drop all limiters so the next calls pick up changed config.LLM_RATE_LIMITS"""
+    with _limiters_lock:
+        _limiters.clear()
+
+
+def estimate_tokens(prompt: str, max_tokens: int) -> int:
+    """Rough request size: ~4 characters per prompt token plus the completion budget"""
+    return len(prompt) // 4 + max_tokens
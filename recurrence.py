@@ -0,0 +1,164 @@
+"""
+Cron-style recurrence rules for the scheduler
+
+Supports the standard five fields (minute hour day-of-month month
+day-of-week) with "*", lists, ranges, steps and month/weekday names, plus
+the @hourly/@daily/@weekly/@monthly shortcuts. Occurrences are computed in
+the rule's timezone by skipping whole months/days/hours that can't match,
+so finding the next fire time is cheap even for sparse rules.
+"""
+import random
+from datetime import datetime, timedelta
+from typing import Iterator, Optional, Set
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:  # Python < 3.9
+    ZoneInfo = None
+
+MONTH_NAMES = {name: i + 1 for i, name in enumerate(
+    ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"])}
+WEEKDAY_NAMES = {name: i for i, name in enumerate(["sun", "mon", "tue", "wed", "thu", "fri", "sat"])}
+SHORTCUTS = {
+    "@hourly": "0 * * * *",
+    "@daily": "0 0 * * *",
+    "@weekly": "0 0 * * 0",
+    "@monthly": "0 0 1 * *",
+}
+WEEKDAYS = {"weekdays": "1-5", "weekends": "0,6"}
+
+
+def _parse_field(field: str, low: int, high: int, names: dict = None) -> Set[int]:
+    values = set()
+    for part in field.lower().split(","):
+        step = 1
+        if "/" in part:
+            part, step_str = part.split("/", 1)
+            step = int(step_str)
+            if step <= 0:
+                raise ValueError(f"Invalid step in '{field}'")
+        if part in ("*", ""):
+            start, end = low, high
+        elif "-" in part:
+            start_str, end_str = part.split("-", 1)
+            start, end = _parse_value(start_str, names), _parse_value(end_str, names)
+        else:
+            start = _parse_value(part, names)
+            end = high if step > 1 else start
+        if start < low or end > high or start > end:
+            raise ValueError(f"Value out of range in '{field}' (allowed {low}-{high})")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+def _parse_value(value: str, names: dict = None) -> int:
+    if names and value in names:
+        return names[value]
+    return int(value)
+
+
+class CronExpression:
+    """A parsed five-field cron expression"""
+
+    def __init__(self, expression: str):
+        self.expression = expression.strip()
+        expr = SHORTCUTS.get(self.expression.lower(), self.expression)
+        fields = expr.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields, got {len(fields)}: '{expression}'")
+        minute, hour, day, month, weekday = fields
+        weekday = WEEKDAYS.get(weekday.lower(), weekday)
+        self.minutes = _parse_field(minute, 0, 59)
+        self.hours = _parse_field(hour, 0, 23)
+        self.days = _parse_field(day, 1, 31)
+        self.months = _parse_field(month, 1, 12, MONTH_NAMES)
+        # 7 is an alias for Sunday
+        self.weekdays = {d % 7 for d in _parse_field(weekday, 0, 7, WEEKDAY_NAMES)}
+        # Like cron: if both day fields are restricted, a date matching either one fires
+        self.day_restricted = day != "*"
+        self.weekday_restricted = weekday != "*"
+        self._sorted_minutes = sorted(self.minutes)
+        self._sorted_hours = sorted(self.hours)
+
+    def _day_matches(self, dt: datetime) -> bool:
+        day_ok = dt.day in self.days
+        weekday_ok = (dt.weekday() + 1) % 7 in self.weekdays
+        if self.day_restricted and self.weekday_restricted:
+            return day_ok or weekday_ok
+        return day_ok and weekday_ok
+
+    def next_after(self, dt: datetime) -> Optional[datetime]:
+        """First matching wall-clock time strictly after dt (naive, minute resolution)"""
+        dt = dt.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = dt.year + 5
+        while dt.year <= limit:
+            if dt.month not in self.months:
+                year, month = (dt.year + 1, 1) if dt.month == 12 else (dt.year, dt.month + 1)
+                dt = dt.replace(year=year, month=month, day=1, hour=0, minute=0)
+                continue
+            if not self._day_matches(dt):
+                dt = dt.replace(hour=0, minute=0) + timedelta(days=1)
+                continue
+            if dt.hour not in self.hours:
+                next_hour = next((h for h in self._sorted_hours if h > dt.hour), None)
+                if next_hour is None:
+                    dt = dt.replace(hour=0, minute=0) + timedelta(days=1)
+                else:
+                    dt = dt.replace(hour=next_hour, minute=0)
+                continue
+            if dt.minute not in self.minutes:
+                next_minute = next((m for m in self._sorted_minutes if m > dt.minute), None)
+                if next_minute is None:
+                    dt = dt.replace(minute=0) + timedelta(hours=1)
+                else:
+                    dt = dt.replace(minute=next_minute)
+                continue
+            return dt
+        return None
+
+    def occurrences(self, start: datetime, end: datetime) -> Iterator[datetime]:
+        """Matching times in (start, end]"""
+        current = self.next_after(start)
+        while current is not None and current <= end:
+            yield current
+            current = self.next_after(current)
+
+
+def get_timezone(name: str = None):
+    """ZoneInfo for name, or None for the system local time"""
+    if not name:
+        return None
+    if ZoneInfo is None:
+        raise ValueError("Timezones need Python 3.9+ (zoneinfo)")
+    return ZoneInfo(name)
+
+
+def now_in(timezone: str = None) -> datetime:
+    """Current naive wall-clock time in a timezone"""
+    tz = get_timezone(timezone)
+    return datetime.now(tz).replace(tzinfo=None)
+
+
+def to_local(wall_time: datetime, timezone: str = None) -> datetime:
+    """Convert a naive wall-clock time in timezone to naive system local time"""
+    tz = get_timezone(timezone)
+    if tz is None:
+        return wall_time
+    return wall_time.replace(tzinfo=tz).astimezone().replace(tzinfo=None)
+
+
+def from_local(local_time: datetime, timezone: str = None) -> datetime:
+    """Convert a naive system local time to naive wall-clock time in timezone"""
+    tz = get_timezone(timezone)
+    if tz is None:
+        return local_time
+    return local_time.astimezone(tz).replace(tzinfo=None)
+
+
+def jitter_offset(rule_id: str, occurrence: datetime, jitter_minutes: int) -> timedelta:
+    """Stable random delay for one occurrence (same result after a restart)"""
+    if not jitter_minutes:
+        return timedelta(0)
+    rng = random.Random(f"{rule_id}:{occurrence.isoformat()}")
+    return timedelta(seconds=rng.randint(0, int(jitter_minutes * 60)))
+
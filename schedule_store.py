@@ -0,0 +1,202 @@
+"""
+Locked, versioned store for scheduled posts
+
+The schedule file is shared by the Streamlit app, the CLI and a scheduler
+daemon. Every write takes an exclusive file lock, re-reads the file, applies
+the change and bumps a version number, so writers never overwrite each
+other's updates. Readers detect changes with a stat() call (mtime/size) and
+only re-parse the file when it changed; subscribers receive the posts that
+were added, updated or removed instead of the whole list. Entries are held
+as `record` objects (plain dicts by default, models.ScheduledPost for the
+schedule) and written back in their dict shape.
+"""
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class ScheduleStore:
+    """Posts persisted as {"version": n, "posts": [...]} with compare-and-swap updates"""
+
+    def __init__(self, path: str, record: type = dict):
+        self.path = path
+        self.record = record
+        self.lock_path = f"{path}.lock"
+        self.version = 0
+        self._posts: List[Dict] = []
+        self._signature = None
+        self._subscribers: List[Callable[[Dict], None]] = []
+        self._lock = threading.RLock()
+        self.refresh()
+
+    # Reading
+
+    def read(self) -> List[Dict]:
+        """Return a copy of the current posts (refreshed if the file changed)"""
+        self.refresh()
+        with self._lock:
+            return [p.copy() for p in self._posts]
+
+    def get(self, post_id: str) -> Optional[Dict]:
+        self.refresh()
+        with self._lock:
+            for post in self._posts:
+                if post.get('id') == post_id:
+                    return post.copy()
+        return None
+
+    def refresh(self) -> bool:
+        """Pick up changes made by other processes; True if anything changed"""
+        with self._lock:
+            if self._file_signature() == self._signature:
+                return False
+            version, posts, signature = self._load()
+            return self._apply(version, posts, signature)
+
+    def subscribe(self, callback: Callable[[Dict], None]):
+        """Call callback({"version", "upserted", "removed"}) whenever the posts change"""
+        self._subscribers.append(callback)
+
+    # Writing
+
+    def update(self, mutate: Callable[[List[Dict]], Optional[bool]], expected_version: int = None) -> Optional[int]:
+        """Apply mutate(posts) under the file lock and return the new version
+
+        Returns None without writing if expected_version no longer matches
+        or mutate returns False.
+        """
+        with self._lock, self._file_lock():
+            signature = self._file_signature()
+            if signature is not None and signature == self._signature:
+                # Unchanged since we last read it: skip re-parsing and re-diffing the whole file
+                version, posts = self.version, self._posts
+            else:
+                version, posts, signature = self._load()
+                self._apply(version, posts, signature)
+            if expected_version is not None and expected_version != version:
+                return None
+            posts = [p.copy() for p in posts]
+            if mutate(posts) is False:
+                return None
+            posts[:] = [p if isinstance(p, self.record) else self.record(p) for p in posts]
+            version += 1
+            self._write(version, posts)
+            self._apply(version, posts, self._file_signature())
+            return version
+
+    def add(self, post: Dict) -> bool:
+        return self.update(lambda posts: posts.append(self.record(post))) is not None
+
+    def remove(self, post_id: str) -> bool:
+        def mutate(posts):
+            remaining = [p for p in posts if p.get('id') != post_id]
+            if len(remaining) == len(posts):
+                return False
+            posts[:] = remaining
+        return self.update(mutate) is not None
+
+    def update_post(self, post_id: str, changes: Dict, expect: Dict = None) -> bool:
+        """Set fields on one post, only if its current fields match expect (compare-and-swap)"""
+        def mutate(posts):
+            for post in posts:
+                if post.get('id') == post_id:
+                    if expect and any(post.get(k) != v for k, v in expect.items()):
+                        return False
+                    post.update(changes)
+                    return True
+            return False
+        return self.update(mutate) is not None
+
+    def replace(self, posts: List[Dict]) -> Optional[int]:
+        """Overwrite all posts (last writer wins; prefer update_post for single changes)"""
+        return self.update(lambda current: current.__setitem__(slice(None), [self.record(p) for p in posts]))
+
+    # Internals
+
+    def _file_signature(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def _load(self):
+        """Read (version, posts, signature) from disk; legacy plain-list files are version 0"""
+        signature = self._file_signature()
+        if signature is None:
+            return 0, [], None
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"⚠️ Error reading {self.path}: {e}")
+            return self.version, list(self._posts), signature
+        if isinstance(data, list):
+            return 0, [self.record(p) for p in data], signature
+        return data.get('version', 0), [self.record(p) for p in data.get('posts', [])], signature
+
+    def _write(self, version: int, posts: List[Dict]):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"version": version, "posts": [p if isinstance(p, dict) else p.to_dict() for p in posts]},
+                      f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def _apply(self, version: int, posts: List[Dict], signature) -> bool:
+        """Swap in a new snapshot and notify subscribers of the difference"""
+        self._signature = signature
+        if version == self.version and (posts is self._posts or posts == self._posts):
+            return False
+        old = {p.get('id'): p for p in self._posts}
+        new_ids = set()
+        upserted = []
+        for post in posts:
+            post_id = post.get('id')
+            new_ids.add(post_id)
+            if old.get(post_id) != post:
+                upserted.append(post.copy())
+        removed = [post_id for post_id in old if post_id not in new_ids]
+        self.version = version
+        # posts are freshly loaded or the update's own copies, so the snapshot can take them as they are
+        self._posts = list(posts)
+        if upserted or removed:
+            changes = {"version": version, "upserted": upserted, "removed": removed}
+            for callback in list(self._subscribers):
+                try:
+                    callback(changes)
+                except Exception as e:
+                    print(f"⚠️ Error in schedule change subscriber: {e}")
+        return True
+
+    def _file_lock(self):
+        """Exclusive lock shared by every process using this schedule file"""
+        return file_lock(self.lock_path)
+
+
+@contextmanager
+def file_lock(lock_path: str):
+    """Exclusive cross-process lock held on lock_path for the duration of the block"""
+    with open(lock_path, 'a+') as f:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
@@ -1,47 +1,193 @@
 """
 Scheduler module for automated LinkedIn posting
+
+Finder/generator/poster modules are imported inside the jobs that use them,
+so listing or editing the schedule never loads Selenium.
 """
-import json
+import heapq
 import os
+import random
 import time
+import uuid
+from collections import deque
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
-from threading import Thread
+from threading import Thread, Lock, RLock
 import schedule
-from trending_finder import TrendingFinder
-from post_generator import PostGenerator
-from linkedin_poster import LinkedInPoster
 import config
+from models import ScheduledPost, Topic
+from post_archive import ARCHIVED_STATUSES, get_post_archive
+from recurrence import CronExpression, from_local, get_timezone, jitter_offset, now_in, to_local
+from schedule_store import ScheduleStore
+from similarity_index import record_post
+from tracing import tracer
+import metrics
+
+CATCH_UP_POLICIES = ("skip", "latest", "all")
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
 
 
 class PostScheduler:
-    """Manages scheduled LinkedIn posts"""
+    """Manages scheduled LinkedIn posts
+    
+    Use get_scheduler() to share one instance per process. Across processes
+    the file is coordinated by ScheduleStore: changes go through locked
+    compare-and-swap updates and scheduled_posts is patched from its change
+    feed rather than reloaded.
+    
+    Recurring rules live in their own store and are turned into ordinary
+    scheduled posts shortly before each occurrence. Their next fire times are
+    kept in a heap, so a check only looks at rules that are actually due.
+    
+    Failed attempts are retried with per-error-class exponential backoff
+    (config.RETRY_POLICIES): the post goes to "retrying" with a
+    next_attempt_at time and sits in a delayed queue until due, and ends in
+    "dead_letter" once its attempts are used up.
+    """
     
     def __init__(self):
         self.scheduled_posts_file = "scheduled_posts.json"
+        self.recurring_rules_file = "recurring_rules.json"
+        self._lock = RLock()
+        self.store = ScheduleStore(self.scheduled_posts_file, record=ScheduledPost)
         self.scheduled_posts = self.load_scheduled_posts()
+        self._retry_heap = []
+        self._retry_next = {}
+        for post in self.scheduled_posts:
+            self._queue_retry(post)
+        self.store.subscribe(self._apply_changes)
+        self.rules = ScheduleStore(self.recurring_rules_file)
+        self._rule_heap = []
+        self._rule_next = {}
+        self._crons = {}
+        for rule in self.rules.read():
+            self._schedule_rule(rule)
+        self.rules.subscribe(self._on_rules_changed)
         self.running = False
         self.scheduler_thread = None
+        # Own job registry so stopping this scheduler never clears anyone else's jobs
+        self.jobs = schedule.Scheduler()
         
     def load_scheduled_posts(self) -> List[Dict]:
         """Load scheduled posts from file"""
-        if os.path.exists(self.scheduled_posts_file):
-            try:
-                with open(self.scheduled_posts_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except:
-                return []
-        return []
+        return self.store.read()
     
     def save_scheduled_posts(self):
-        """Save scheduled posts to file"""
+        """Overwrite the stored schedule with scheduled_posts (last writer wins)"""
         try:
-            with open(self.scheduled_posts_file, 'w', encoding='utf-8') as f:
-                json.dump(self.scheduled_posts, f, indent=2, ensure_ascii=False)
+            self.store.replace(list(self.scheduled_posts))
         except Exception as e:
             print(f"❌ Error saving scheduled posts: {e}")
     
-    def add_scheduled_post(self, post_content: str, schedule_time: str, topic: str = "", use_llm: bool = False) -> bool:
+    def sync(self) -> bool:
+        """Pick up changes other processes made to the schedule files (cheap if none)"""
+        posts_changed = self.store.refresh()
+        rules_changed = self.rules.refresh()
+        return posts_changed or rules_changed
+    
+    def _apply_changes(self, changes: Dict):
+        """Patch scheduled_posts in place from a store change notification"""
+        with self._lock:
+            removed = set(changes["removed"])
+            if removed:
+                self.scheduled_posts = [p for p in self.scheduled_posts if p.id not in removed]
+            index = {p.id: p for p in self.scheduled_posts}
+            for post_id in removed:
+                self._retry_next.pop(post_id, None)
+            for post in changes["upserted"]:
+                current = index.get(post.id)
+                if current is None:
+                    # Notifications carry the store's private copies, so no need to copy again
+                    self.scheduled_posts.append(post)
+                else:
+                    # Update in place so callers holding this post see the change
+                    for key in [k for k in current if k not in post]:
+                        del current[key]
+                    current.update(post)
+                self._queue_retry(post)
+    
+    def _queue_retry(self, post: Dict):
+        """Track a post in the delayed retry queue if it is waiting for a retry"""
+        post_id = post.get('id')
+        if post.get('status') != 'retrying':
+            self._retry_next.pop(post_id, None)
+            return
+        try:
+            when = datetime.strptime(post['next_attempt_at'], TIME_FORMAT)
+        except Exception:
+            when = datetime.now()
+        if self._retry_next.get(post_id) != when:
+            self._retry_next[post_id] = when
+            heapq.heappush(self._retry_heap, (when, post_id))
+    
+    def _pop_due_retries(self, now: datetime, limit: int = None) -> List[str]:
+        """Remove and return ids of (at most limit) posts whose retry time has come"""
+        due = []
+        with self._lock:
+            while self._retry_heap and self._retry_heap[0][0] <= now and (limit is None or len(due) < limit):
+                when, post_id = heapq.heappop(self._retry_heap)
+                if self._retry_next.get(post_id) == when:
+                    del self._retry_next[post_id]
+                    due.append(post_id)
+        return due
+    
+    @staticmethod
+    def classify_error(error: Exception) -> str:
+        """Map an exception raised while publishing to a retry policy class"""
+        module = type(error).__module__ or ""
+        if module.startswith("selenium") or module.startswith("urllib3"):
+            return "browser"
+        if module.startswith("requests"):
+            return "generation"
+        return "unknown"
+    
+    def _record_failure(self, post_data: Dict, error_class: str, error: str, **changes):
+        """Schedule a retry for a failed attempt, or dead-letter the post"""
+        policy = config.RETRY_POLICIES.get(error_class, config.RETRY_POLICIES["unknown"])
+        attempts = post_data.get('attempts', 0) + 1
+        metrics.POSTS_TOTAL.labels(status='failed').inc()
+        changes.update(attempts=attempts, error=error, error_class=error_class)
+        if 'content' in changes:
+            # Generated content is kept for the retry, and so is the provider that wrote it
+            changes = {**self._generated_by(post_data), **changes}
+        
+        if attempts >= policy.get("max_attempts", 1):
+            print(f"☠️ Post {post_data.get('id')} failed {attempts} time(s) ({error_class}: {error}), moving to dead letter")
+            metrics.POSTS_TOTAL.labels(status='dead_letter').inc()
+            self._update_post(post_data, status='dead_letter', finished_at=datetime.now().strftime(TIME_FORMAT), **changes)
+            return
+        
+        delay = min(policy.get("base_delay", 60) * policy.get("factor", 2) ** (attempts - 1),
+                    policy.get("max_delay", 3600))
+        delay *= 1 + random.uniform(-config.RETRY_JITTER, config.RETRY_JITTER)
+        next_attempt = datetime.now() + timedelta(seconds=delay)
+        print(f"🔁 Post {post_data.get('id')} failed ({error_class}: {error}); "
+              f"retry {attempts + 1}/{policy['max_attempts']} at {next_attempt.strftime('%H:%M:%S')}")
+        metrics.POSTS_TOTAL.labels(status='retried').inc()
+        self._update_post(post_data, status='retrying', next_attempt_at=next_attempt.strftime(TIME_FORMAT), **changes)
+    
+    def retry_post_now(self, post_id: str) -> bool:
+        """Queue a retrying or dead-lettered post for an immediate attempt with fresh attempts"""
+        changes = {'status': 'retrying', 'attempts': 0, 'next_attempt_at': datetime.now().strftime(TIME_FORMAT)}
+        for status in ('dead_letter', 'retrying', 'failed'):
+            if self.store.update_post(post_id, changes, expect={'status': status}):
+                print(f"🔁 Post {post_id} queued for retry")
+                return True
+        return False
+    
+    def get_failed_posts(self) -> List[Dict]:
+        """Posts waiting for a retry or given up on (dead letter)"""
+        self.sync()
+        with self._lock:
+            return [p for p in self.scheduled_posts if p.status in ('retrying', 'dead_letter', 'failed')]
+    
+    def _update_post(self, post_data: Dict, **changes):
+        """Set fields on a post locally and in the store"""
+        post_data.update(changes)
+        self.store.update_post(post_data.get('id'), changes)
+    
+    def add_scheduled_post(self, post_content: str, schedule_time: str, topic: str = "", use_llm: bool = False,
+                           generate_from_trending: bool = False, provider: str = None) -> bool:
         """Add a post to the schedule
         
         Args:
@@ -49,6 +195,8 @@ class PostScheduler:
             schedule_time: Time in format "HH:MM" (24-hour) or "YYYY-MM-DD HH:MM"
             topic: Optional topic description
             use_llm: Whether to use LLM for generation (if post_content is empty)
+            generate_from_trending: Pick the top trending topic at schedule time
+            provider: Generation provider that wrote post_content (None if written by hand)
         """
         try:
             # Parse schedule time
@@ -64,20 +212,24 @@ class PostScheduler:
                 scheduled_datetime = datetime.strptime(schedule_time, "%Y-%m-%d %H:%M")
             
             # If post_content is empty and use_llm is True, we'll generate it at schedule time
-            post_id = f"post_{int(time.time())}"
+            # Suffix keeps ids unique when several sessions schedule in the same second
+            post_id = f"post_{int(time.time())}_{uuid.uuid4().hex[:6]}"
             
-            scheduled_post = {
-                "id": post_id,
-                "content": post_content,
-                "topic": topic,
-                "scheduled_time": scheduled_datetime.strftime("%Y-%m-%d %H:%M:%S"),
-                "status": "scheduled",
-                "use_llm": use_llm,
-                "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            }
+            scheduled_post = ScheduledPost(
+                id=post_id,
+                content=post_content,
+                topic=topic,
+                scheduled_time=scheduled_datetime.strftime("%Y-%m-%d %H:%M:%S"),
+                status="scheduled",
+                use_llm=use_llm,
+                generate_from_trending=generate_from_trending,
+                created_at=datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            )
+            if provider:
+                scheduled_post['provider'] = provider
             
-            self.scheduled_posts.append(scheduled_post)
-            self.save_scheduled_posts()
+            if not self.store.add(scheduled_post):
+                return False
             
             print(f"✅ Post scheduled for {scheduled_datetime.strftime('%Y-%m-%d %H:%M')}")
             return True
@@ -89,8 +241,7 @@ class PostScheduler:
     def remove_scheduled_post(self, post_id: str) -> bool:
         """Remove a scheduled post"""
         try:
-            self.scheduled_posts = [p for p in self.scheduled_posts if p.get('id') != post_id]
-            self.save_scheduled_posts()
+            self.store.remove(post_id)
             print(f"✅ Scheduled post {post_id} removed")
             return True
         except Exception as e:
@@ -99,124 +250,337 @@ class PostScheduler:
     
     def get_scheduled_posts(self) -> List[Dict]:
         """Get all scheduled posts"""
+        self.sync()
+        
         # Filter out past posts
         now = datetime.now()
         active_posts = []
+        with self._lock:
+            for post in self.scheduled_posts:
+                try:
+                    if post.status != 'scheduled':
+                        continue
+                    scheduled_time = datetime.strptime(post.scheduled_time, "%Y-%m-%d %H:%M:%S")
+                    if scheduled_time > now:
+                        active_posts.append(post)
+                except:
+                    continue
+        
+        # Posts a little late are still published by the scheduler; only expire the ones past the grace period
+        self.expire_missed_posts(now)
+        return active_posts
+    
+    def expire_missed_posts(self, now: datetime = None) -> int:
+        """Mark scheduled posts older than LATE_POST_GRACE_MINUTES as expired"""
+        now = now or datetime.now()
+        cutoff = now - timedelta(minutes=config.LATE_POST_GRACE_MINUTES)
+        with self._lock:
+            cutoff_time = cutoff.strftime(TIME_FORMAT)
+            missed = [p.id for p in self.scheduled_posts
+                      if p.status == 'scheduled' and (p.scheduled_time or '') < cutoff_time]
+        
+        expired = 0
+        # Only if nobody else changed the status meanwhile
+        for post_id in missed:
+            if self.store.update_post(post_id, {'status': 'expired', 'finished_at': now.strftime(TIME_FORMAT)},
+                                      expect={'status': 'scheduled'}):
+                print(f"⌛ Post {post_id} missed its slot by more than {config.LATE_POST_GRACE_MINUTES} minutes, marked expired")
+                metrics.POSTS_TOTAL.labels(status='expired').inc()
+                expired += 1
+        return expired
+    
+    def archive_finished_posts(self, now: datetime = None) -> int:
+        """Move posts finished more than ARCHIVE_AFTER_HOURS ago from the schedule file to the archive"""
+        if not config.POST_ARCHIVE_DIR:
+            return 0
+        now = now or datetime.now()
+        cutoff = (now - timedelta(hours=config.ARCHIVE_AFTER_HOURS)).strftime(TIME_FORMAT)
+        
+        def finished(post):
+            if post.status not in ARCHIVED_STATUSES:
+                return False
+            return (post.posted_at or post.finished_at or post.scheduled_time or '') < cutoff
+        
+        with self._lock:
+            # Cheap in-memory check first; most calls have nothing to archive
+            if not any(finished(p) for p in self.scheduled_posts):
+                return 0
+        
+        archived = []
+        
+        def mutate(posts):
+            done = [p for p in posts if finished(p)]
+            if not done:
+                return False
+            # Archive before the schedule is rewritten: a crash in between archives twice, never loses posts
+            get_post_archive().append(done)
+            archived.extend(done)
+            posts[:] = [p for p in posts if not finished(p)]
+        
+        try:
+            self.store.update(mutate)
+        except Exception as e:
+            print(f"⚠️ Error archiving finished posts: {e}")
+            return 0
+        if archived:
+            print(f"🗄️ Archived {len(archived)} finished post(s) to {config.POST_ARCHIVE_DIR}/")
+        return len(archived)
+    
+    def get_queue_depth(self) -> int:
+        """Number of posts still waiting to be published"""
+        return sum(1 for p in self.scheduled_posts if p.status == 'scheduled')
+    
+    def get_next_due_lag(self) -> float:
+        """Seconds the oldest due (but not yet published) post is overdue"""
+        now = datetime.now()
+        lag = 0.0
         for post in self.scheduled_posts:
+            if post.status != 'scheduled':
+                continue
             try:
-                scheduled_time = datetime.strptime(post['scheduled_time'], "%Y-%m-%d %H:%M:%S")
-                if scheduled_time > now and post.get('status') == 'scheduled':
-                    active_posts.append(post)
-                elif scheduled_time <= now:
-                    # Mark as expired
-                    post['status'] = 'expired'
-            except:
+                scheduled_time = datetime.strptime(post.scheduled_time, "%Y-%m-%d %H:%M:%S")
+            except Exception:
                 continue
-        
-        # Save updated statuses
-        if active_posts != self.scheduled_posts:
-            self.save_scheduled_posts()
-        
-        return active_posts
+            if scheduled_time <= now:
+                lag = max(lag, (now - scheduled_time).total_seconds())
+        return lag
     
+    @tracer.traced("scheduler.execute_post")
     def execute_post(self, post_data: Dict) -> bool:
         """Execute a scheduled post"""
-        try:
+        tracer.annotate(post_id=post_data.get('id'))
+        return self.execute_batch([post_data]).get(post_data.get('id'), False)
+    
+    @tracer.traced("scheduler.execute_batch")
+    def execute_batch(self, posts: List[Dict]) -> Dict[str, bool]:
+        """Publish several posts, sharing one browser session per account
+        
+        Content is generated first; then each account's posts are published in
+        sequence after a single setup + login, BATCH_POST_SPACING seconds
+        apart. Returns {post_id: success}; failures go through the retry policy.
+        """
+        tracer.annotate(batch_size=len(posts))
+        results = {}
+        groups = {}
+        for post_data in posts:
             post_id = post_data.get('id')
             print(f"\n📤 Executing scheduled post: {post_id}")
-            
-            # Generate post if needed
-            post_content = post_data.get('content', '')
-            if not post_content and post_data.get('use_llm'):
-                print("🤖 Generating post using AI...")
-                topic = post_data.get('topic', '')
-                if topic:
-                    topic_dict = {
-                        "title": topic,
-                        "description": "",
-                        "url": "",
-                        "source": "scheduled",
-                        "timestamp": datetime.now().isoformat()
-                    }
-                    
-                    use_llm = post_data.get('use_llm', False)
-                    generator = PostGenerator(use_llm=use_llm)
-                    
-                    # Set API keys if available
-                    if use_llm:
-                        import os
-                        generator.groq_api_key = os.getenv('GROQ_API_KEY', '')
-                        generator.together_api_key = os.getenv('TOGETHER_API_KEY', '')
-                        generator.hf_api_key = os.getenv('HF_API_KEY', '')
-                    
-                    post_content = generator.generate_post(topic_dict)
-                else:
-                    print("⚠️ No topic provided for post generation")
-                    post_data['status'] = 'failed'
-                    self.save_scheduled_posts()
-                    return False
-            
-            if not post_content:
-                print("⚠️ No post content available")
-                post_data['status'] = 'failed'
-                self.save_scheduled_posts()
-                return False
-            
-            # Post to LinkedIn
-            print("🔐 Logging into LinkedIn...")
-            poster = LinkedInPoster()
+            try:
+                content = self._prepare_content(post_data)
+            except Exception as e:
+                print(f"❌ Error generating post {post_id}: {e}")
+                self._record_failure(post_data, self.classify_error(e), str(e))
+                content = None
+            if content:
+                groups.setdefault(post_data.get('account') or config.LINKEDIN_EMAIL, []).append((post_data, content))
+            else:
+                results[post_id] = False
+        
+        for account, items in groups.items():
+            results.update(self._publish_batch(account, items))
+        
+        if len(posts) > 1:
+            published = sum(1 for ok in results.values() if ok)
+            print(f"📦 Batch finished: {published}/{len(posts)} posts published")
+        return results
+    
+    def _make_generator(self, use_llm: bool):
+        from post_generator import PostGenerator
+        generator = PostGenerator(use_llm=use_llm)
+        
+        # Set API keys if available
+        if use_llm:
+            generator.groq_api_key = os.getenv('GROQ_API_KEY', '')
+            generator.together_api_key = os.getenv('TOGETHER_API_KEY', '')
+            generator.hf_api_key = os.getenv('HF_API_KEY', '')
+        return generator
+    
+    @staticmethod
+    def _generated_by(post_data: Dict) -> Dict:
+        """The provider change to save with the post's next update (empty for hand-written posts)"""
+        return {'provider': post_data['provider']} if 'provider' in post_data else {}
+    
+    def _prepare_content(self, post_data: Dict) -> Optional[str]:
+        """Return the post's content, generating it if needed (records failures itself)"""
+        post_content = post_data.get('content', '')
+        if not post_content and (post_data.get('use_llm') or post_data.get('generate_from_trending')):
+            print("🤖 Generating post using AI..." if post_data.get('use_llm') else "📝 Generating post...")
+            topic = post_data.get('topic', '')
+            topic_dict = None
+            if post_data.get('generate_from_trending'):
+                print("🔍 Fetching trending topics...")
+                from trending_finder import TrendingFinder
+                topics = TrendingFinder().get_trending_topics(limit=1)
+                topic_dict = topics[0] if topics else None
+            elif topic:
+                topic_dict = Topic(title=topic, description="", url="", source="scheduled",
+                                   timestamp=datetime.now().isoformat())
+            if topic_dict:
+                generator = self._make_generator(post_data.get('use_llm', False))
+                with metrics.GENERATION_SECONDS.time():
+                    post_content, provider = generator.generate_post_with_provider(topic_dict)
+                if post_content:
+                    # Saved with the post's next update (published or failed), not in a write of its own
+                    post_data['provider'] = provider
+            elif post_data.get('generate_from_trending'):
+                print("⚠️ No trending topics available")
+                self._record_failure(post_data, "generation", "No trending topics available")
+                return None
+            else:
+                print("⚠️ No topic provided for post generation")
+                self._record_failure(post_data, "invalid", "No topic provided for post generation")
+                return None
+        
+        if not post_content:
+            print("⚠️ No post content available")
+            if post_data.get('use_llm') or post_data.get('generate_from_trending'):
+                self._record_failure(post_data, "generation", "Generation returned no content")
+            else:
+                self._record_failure(post_data, "invalid", "No post content available")
+            return None
+        return post_content
+    
+    def _publish_batch(self, account: str, items: List) -> Dict[str, bool]:
+        """Log in once as account and publish each (post_data, content) in turn"""
+        results = {}
+        remaining = list(items)
+        publish_started = time.time()
+        poster = None
+        try:
+            print(f"🔐 Logging into LinkedIn ({len(items)} post(s) in this session)...")
+            from linkedin_poster import LinkedInPoster
+            poster = LinkedInPoster(profile=config.SCHEDULER_BROWSER_PROFILE)
+            if account and account != poster.email:
+                print(f"⚠️ No credentials configured for {account}")
+                for post_data, content in remaining:
+                    self._record_failure(post_data, "invalid", f"No credentials configured for {account}", content=content)
+                    results[post_data.get('id')] = False
+                return results
             poster.setup_driver()
             
             if not poster.login():
                 print("❌ Login failed")
-                post_data['status'] = 'failed'
-                self.save_scheduled_posts()
-                poster.close()
-                return False
-            
-            print("📝 Posting to LinkedIn (automated mode)...")
-            success = poster.post_content(post_content, automated=True)
-            
-            poster.close()
+                # Keep generated content so a retry doesn't regenerate it
+                for post_data, content in remaining:
+                    self._record_failure(post_data, "login", "Login failed", content=content)
+                    results[post_data.get('id')] = False
+                return results
             
-            if success:
-                post_data['status'] = 'posted'
-                post_data['posted_at'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                print(f"✅ Post {post_id} published successfully!")
-            else:
-                post_data['status'] = 'failed'
-                post_data['error'] = "Posting failed"
-                print(f"❌ Post {post_id} failed to publish")
-            
-            self.save_scheduled_posts()
-            return success
+            while remaining:
+                post_data, content = remaining[0]
+                post_id = post_data.get('id')
+                print(f"📝 Posting {post_id} to LinkedIn (automated mode)...")
+                success = poster.post_content(content, automated=True)
+                remaining.pop(0)
+                results[post_id] = success
+                
+                if success:
+                    metrics.POSTS_TOTAL.labels(status='posted').inc()
+                    self._update_post(post_data, status='posted', posted_at=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                                      **self._generated_by(post_data))
+                    print(f"✅ Post {post_id} published successfully!")
+                    record_post(content, post_data.get('topic', ''), "posted", post_id=post_id)
+                else:
+                    print(f"❌ Post {post_id} failed to publish")
+                    self._record_failure(post_data, "publish", "Posting failed", content=content)
+                
+                if remaining and config.BATCH_POST_SPACING:
+                    print(f"⏳ Waiting {config.BATCH_POST_SPACING}s before the next post...")
+                    time.sleep(config.BATCH_POST_SPACING)
             
         except Exception as e:
             print(f"❌ Error executing post: {e}")
             import traceback
             traceback.print_exc()
-            post_data['status'] = 'failed'
-            post_data['error'] = str(e)
-            self.save_scheduled_posts()
-            return False
+            error_class = self.classify_error(e)
+            for post_data, content in remaining:
+                self._record_failure(post_data, error_class, str(e), content=content)
+                results[post_data.get('id')] = False
+        finally:
+            if poster is not None:
+                try:
+                    poster.close()
+                except Exception:
+                    pass
+            # Setup and login are shared, so each post is charged an equal share of the session
+            elapsed = time.time() - publish_started
+            for _ in items:
+                metrics.PUBLISH_SECONDS.observe(elapsed / len(items))
+        return results
     
     def check_and_execute_posts(self):
         """Check for posts that need to be executed and execute them"""
+        self.sync()
         now = datetime.now()
+        metrics.LAST_CHECK_TIMESTAMP.set(time.time())
+        self.materialize_recurring_posts(now)
         
-        for post in self.scheduled_posts:
-            if post.get('status') != 'scheduled':
-                continue
-            
-            try:
-                scheduled_time = datetime.strptime(post['scheduled_time'], "%Y-%m-%d %H:%M:%S")
+        self.expire_missed_posts(now)
+        self.recover_stuck_posts(now)
+        self.archive_finished_posts(now)
+        
+        # Pick due posts under the lock, publish outside it so adds/removes aren't blocked
+        due_posts = []
+        with self._lock:
+            for post in self.scheduled_posts:
+                if post.status != 'scheduled':
+                    continue
                 
-                # Execute if scheduled time has passed (within 1 minute tolerance)
-                if now >= scheduled_time - timedelta(minutes=1) and now <= scheduled_time + timedelta(minutes=5):
-                    self.execute_post(post)
+                try:
+                    scheduled_time = datetime.strptime(post['scheduled_time'], "%Y-%m-%d %H:%M:%S")
                     
-            except Exception as e:
-                print(f"⚠️ Error checking post {post.get('id')}: {e}")
+                    # Execute once due (1 minute early tolerance); late posts still go out within the grace period
+                    if now >= scheduled_time - timedelta(minutes=1):
+                        due_posts.append(post)
+                        
+                except Exception as e:
+                    print(f"⚠️ Error checking post {post.get('id')}: {e}")
+        
+        # Claim due posts, then retries whose backoff has elapsed, up to one batch;
+        # the rest are picked up by the next check
+        batch = []
+        for post in due_posts:
+            if len(batch) >= config.BATCH_MAX_POSTS:
+                break
+            claimed = self._claim(post.get('id'), 'scheduled')
+            if claimed:
+                batch.append(claimed)
+        for post_id in self._pop_due_retries(now, config.BATCH_MAX_POSTS - len(batch)):
+            claimed = self._claim(post_id, 'retrying')
+            if claimed:
+                batch.append(claimed)
+        
+        if len(batch) == 1:
+            self.execute_post(batch[0])
+        elif batch:
+            self.execute_batch(batch)
+    
+    def _claim(self, post_id: str, from_status: str) -> Optional[Dict]:
+        """Claim a post so another process running a scheduler can't publish it too"""
+        claimed = self.store.update_post(
+            post_id, {'status': 'publishing', 'publishing_since': datetime.now().strftime(TIME_FORMAT)},
+            expect={'status': from_status})
+        if not claimed:
+            return None
+        with self._lock:
+            return next((p for p in self.scheduled_posts if p.id == post_id), None)
+    
+    def recover_stuck_posts(self, now: datetime = None) -> int:
+        """Retry posts left in "publishing" by a scheduler that died mid-publish"""
+        now = now or datetime.now()
+        cutoff = (now - timedelta(minutes=config.PUBLISHING_TIMEOUT_MINUTES)).strftime(TIME_FORMAT)
+        with self._lock:
+            stuck = [p.copy() for p in self.scheduled_posts
+                     if p.status == 'publishing' and (p.publishing_since or '') < cutoff]
+        
+        recovered = 0
+        for post in stuck:
+            # Re-claim with compare-and-swap so only one process handles it
+            if self.store.update_post(post['id'], {'publishing_since': now.strftime(TIME_FORMAT)},
+                                      expect={'status': 'publishing', 'publishing_since': post.get('publishing_since')}):
+                self._record_failure(post, "interrupted", "Publishing did not finish")
+                recovered += 1
+        return recovered
     
     def start_scheduler(self):
         """Start the scheduler in a background thread"""
@@ -226,13 +590,19 @@ class PostScheduler:
         
         self.running = True
         
+        if config.METRICS_PORT:
+            metrics.QUEUE_DEPTH.set_function(self.get_queue_depth)
+            metrics.NEXT_DUE_LAG_SECONDS.set_function(self.get_next_due_lag)
+            metrics.start_metrics_server()
+        
         # Schedule the check function to run every minute
-        schedule.every(1).minutes.do(self.check_and_execute_posts)
+        self.jobs.every(1).minutes.do(self.check_and_execute_posts)
         
         def run_scheduler():
             print("🚀 Scheduler started. Checking for scheduled posts every minute...")
             while self.running:
-                schedule.run_pending()
+                self.sync()
+                self.jobs.run_pending()
                 time.sleep(1)
         
         self.scheduler_thread = Thread(target=run_scheduler, daemon=True)
@@ -242,11 +612,11 @@ class PostScheduler:
     def stop_scheduler(self):
         """Stop the scheduler"""
         self.running = False
-        schedule.clear()
+        self.jobs.clear()
         print("🛑 Scheduler stopped")
     
-    def schedule_daily_post(self, time_str: str, topic: str = "", use_llm: bool = False, generate_from_trending: bool = False):
-        """Schedule a daily recurring post
+    def schedule_daily_post(self, time_str: str, topic: str = "", use_llm: bool = False, generate_from_trending: bool = False) -> Optional[str]:
+        """Schedule a daily recurring post (stored as a recurring rule, so it survives restarts)
         
         Args:
             time_str: Time in "HH:MM" format
@@ -254,60 +624,219 @@ class PostScheduler:
             use_llm: Whether to use LLM for generation
             generate_from_trending: Whether to generate from trending topics
         """
-        def job():
-            print(f"📅 Daily post job triggered at {datetime.now()}")
+        hour, minute = map(int, time_str.split(':'))
+        rule_id = self.add_recurring_rule(f"{minute} {hour} * * *", topic=topic, use_llm=use_llm,
+                                          generate_from_trending=generate_from_trending)
+        if rule_id:
+            print(f"✅ Daily post scheduled for {time_str} every day")
+        
+        # Start scheduler if not running
+        if not self.running:
+            self.start_scheduler()
+        return rule_id
+    
+    def add_recurring_rule(self, cron: str, topic: str = "", content: str = "", use_llm: bool = False,
+                           generate_from_trending: bool = False, timezone: str = None,
+                           jitter_minutes: int = 0, catch_up: str = None) -> Optional[str]:
+        """Add a persistent recurring post rule and return its id
+        
+        Args:
+            cron: Five-field cron expression, e.g. "30 9 * * mon-fri" or "@daily"
+            topic: Topic for post generation
+            content: Fixed content to publish (skips generation)
+            use_llm: Whether to use LLM for generation
+            generate_from_trending: Whether to generate from trending topics
+            timezone: IANA timezone the expression is evaluated in (default: SCHEDULE_TIMEZONE)
+            jitter_minutes: Publish up to this many minutes after each occurrence
+            catch_up: What to do with occurrences missed while down: skip, latest or all
+        """
+        try:
+            CronExpression(cron)
+            timezone = config.SCHEDULE_TIMEZONE if timezone is None else timezone
+            get_timezone(timezone)
+            catch_up = catch_up or config.RECURRING_CATCH_UP
+            if catch_up not in CATCH_UP_POLICIES:
+                raise ValueError(f"catch_up must be one of {', '.join(CATCH_UP_POLICIES)}")
             
-            # Generate post
-            post_content = ""
-            if generate_from_trending:
-                print("🔍 Fetching trending topics...")
-                finder = TrendingFinder()
-                topics = finder.get_trending_topics(limit=1)
-                if topics:
-                    topic_dict = topics[0]
-                    generator = PostGenerator(use_llm=use_llm)
-                    if use_llm:
-                        import os
-                        generator.groq_api_key = os.getenv('GROQ_API_KEY', '')
-                        generator.together_api_key = os.getenv('TOGETHER_API_KEY', '')
-                        generator.hf_api_key = os.getenv('HF_API_KEY', '')
-                    post_content = generator.generate_post(topic_dict)
-            elif topic:
-                topic_dict = {
-                    "title": topic,
-                    "description": "",
-                    "url": "",
-                    "source": "daily_scheduled",
-                    "timestamp": datetime.now().isoformat()
-                }
-                generator = PostGenerator(use_llm=use_llm)
-                if use_llm:
-                    import os
-                    generator.groq_api_key = os.getenv('GROQ_API_KEY', '')
-                    generator.together_api_key = os.getenv('TOGETHER_API_KEY', '')
-                    generator.hf_api_key = os.getenv('HF_API_KEY', '')
-                post_content = generator.generate_post(topic_dict)
+            rule = {
+                "id": f"rule_{int(time.time())}_{uuid.uuid4().hex[:6]}",
+                "cron": cron,
+                "timezone": timezone,
+                "jitter_minutes": int(jitter_minutes),
+                "catch_up": catch_up,
+                "topic": topic,
+                "content": content,
+                "use_llm": use_llm,
+                "generate_from_trending": generate_from_trending,
+                "enabled": True,
+                # Occurrences up to this wall-clock time (in the rule's timezone) are handled
+                "handled_until": now_in(timezone).strftime(TIME_FORMAT),
+                "created_at": datetime.now().strftime(TIME_FORMAT)
+            }
+            if not self.rules.add(rule):
+                return None
+            
+            next_fire = self._rule_next.get(rule["id"])
+            when = next_fire[0].strftime('%Y-%m-%d %H:%M') if next_fire else "never"
+            print(f"✅ Recurring rule {rule['id']} added ({cron}), next post at {when}")
+            return rule["id"]
+        except Exception as e:
+            print(f"❌ Error adding recurring rule: {e}")
+            return None
+    
+    def remove_recurring_rule(self, rule_id: str) -> bool:
+        """Remove a recurring rule (posts it already created stay scheduled)"""
+        if self.rules.remove(rule_id):
+            print(f"✅ Recurring rule {rule_id} removed")
+            return True
+        print(f"⚠️ Recurring rule {rule_id} not found")
+        return False
+    
+    def get_recurring_rules(self) -> List[Dict]:
+        """All recurring rules with their next fire time (local) as "next_post" """
+        self.rules.refresh()
+        rules = self.rules.read()
+        with self._lock:
+            for rule in rules:
+                next_fire = self._rule_next.get(rule.get('id'))
+                rule['next_post'] = next_fire[0].strftime(TIME_FORMAT) if next_fire else None
+        return rules
+    
+    def materialize_recurring_posts(self, now: datetime = None, lookahead: timedelta = timedelta(minutes=1)) -> int:
+        """Create scheduled posts for rule occurrences due by now + lookahead
+        
+        Returns the number of posts created. Post ids are derived from the
+        rule and occurrence, so several processes doing this at once create
+        each post only once.
+        """
+        now = now or datetime.now()
+        horizon = now + lookahead
+        created = 0
+        while True:
+            with self._lock:
+                if not self._rule_heap or self._rule_heap[0][0] > horizon:
+                    break
+                when, rule_id, occurrence = heapq.heappop(self._rule_heap)
+                if self._rule_next.get(rule_id) != (when, occurrence):
+                    continue  # Stale entry, the rule was rescheduled
+                del self._rule_next[rule_id]
             
-            if post_content:
-                # Execute post immediately
-                post_data = {
-                    "id": f"daily_{int(time.time())}",
-                    "content": post_content,
-                    "topic": topic,
-                    "scheduled_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                    "status": "scheduled",
-                    "use_llm": use_llm,
-                    "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                }
-                self.execute_post(post_data)
+            rule = self.rules.get(rule_id)
+            if rule is None or not rule.get('enabled', True):
+                continue
+            try:
+                created += self._fire_rule(rule, occurrence, when, now)
+            except Exception as e:
+                print(f"⚠️ Error firing recurring rule {rule_id}: {e}")
+            finally:
+                # Reschedule from whatever the store now says
+                latest = self.rules.get(rule_id)
+                if latest is not None:
+                    with self._lock:
+                        self._schedule_rule(latest)
+        return created
+    
+    def _fire_rule(self, rule: Dict, occurrence: str, when: datetime, now: datetime) -> int:
+        """Create the post(s) for one due occurrence, applying the catch-up policy"""
+        occurrence_time = datetime.strptime(occurrence, TIME_FORMAT)
+        if occurrence_time <= datetime.strptime(rule['handled_until'], TIME_FORMAT):
+            return 0
+        
+        handled_until = occurrence_time
+        # Older than the execution window: the scheduler was down when it was due
+        if when < now - timedelta(minutes=5):
+            wall_now = from_local(now, rule.get('timezone'))
+            start = max(occurrence_time - timedelta(minutes=1), wall_now - timedelta(days=31))
+            missed = deque(self._cron(rule).occurrences(start, wall_now), maxlen=config.RECURRING_MAX_CATCH_UP)
+            handled_until = missed[-1] if missed else occurrence_time
+            policy = rule.get('catch_up', 'skip')
+            if policy == "latest":
+                fire = [(missed[-1], now)] if missed else []
+            elif policy == "all":
+                fire = [(o, now) for o in missed]
             else:
-                print("⚠️ Could not generate post content")
+                fire = []
+            print(f"⏭️ Rule {rule['id']} missed occurrences while stopped; catch-up policy '{policy}' "
+                  f"publishes {len(fire)}")
+        else:
+            fire = [(occurrence_time, when)]
         
-        # Schedule the job
-        schedule.every().day.at(time_str).do(job)
-        print(f"✅ Daily post scheduled for {time_str} every day")
+        created = 0
+        for occurrence_time, scheduled_time in fire:
+            post = ScheduledPost(
+                id=f"{rule['id']}@{occurrence_time.strftime('%Y%m%d%H%M')}",
+                content=rule.get('content', ''),
+                topic=rule.get('topic', ''),
+                scheduled_time=scheduled_time.strftime(TIME_FORMAT),
+                status="scheduled",
+                use_llm=rule.get('use_llm', False),
+                generate_from_trending=rule.get('generate_from_trending', False),
+                rule_id=rule['id'],
+                occurrence=occurrence_time.strftime(TIME_FORMAT),
+                created_at=datetime.now().strftime(TIME_FORMAT)
+            )
+            
+            def add_if_absent(posts, post=post):
+                if any(p.get('id') == post['id'] for p in posts):
+                    return False
+                posts.append(post)
+            
+            if self.store.update(add_if_absent) is not None:
+                created += 1
         
-        # Start scheduler if not running
-        if not self.running:
-            self.start_scheduler()
+        self.rules.update_post(rule['id'], {'handled_until': handled_until.strftime(TIME_FORMAT)},
+                               expect={'handled_until': rule['handled_until']})
+        return created
+    
+    def _cron(self, rule: Dict) -> CronExpression:
+        cached = self._crons.get(rule['id'])
+        if cached is None or cached[0] != rule['cron']:
+            cached = (rule['cron'], CronExpression(rule['cron']))
+            self._crons[rule['id']] = cached
+        return cached[1]
+    
+    def _schedule_rule(self, rule: Dict):
+        """Compute a rule's next fire time and push it onto the heap"""
+        rule_id = rule.get('id')
+        occurrence = None
+        try:
+            if rule.get('enabled', True):
+                occurrence = self._cron(rule).next_after(datetime.strptime(rule['handled_until'], TIME_FORMAT))
+            if occurrence is not None:
+                when = to_local(occurrence, rule.get('timezone')) + jitter_offset(rule_id, occurrence, rule.get('jitter_minutes', 0))
+        except Exception as e:
+            print(f"⚠️ Skipping recurring rule {rule_id}: {e}")
+            occurrence = None
+        if occurrence is None:
+            self._rule_next.pop(rule_id, None)
+            return
+        entry = (when, occurrence.strftime(TIME_FORMAT))
+        if self._rule_next.get(rule_id) != entry:
+            self._rule_next[rule_id] = entry
+            heapq.heappush(self._rule_heap, (when, rule_id, entry[1]))
+    
+    def _on_rules_changed(self, changes: Dict):
+        with self._lock:
+            for rule_id in changes["removed"]:
+                self._rule_next.pop(rule_id, None)
+                self._crons.pop(rule_id, None)
+            for rule in changes["upserted"]:
+                self._schedule_rule(rule)
+
+_shared_scheduler = None
+_shared_scheduler_lock = Lock()
 
+
+def get_scheduler() -> PostScheduler:
+    """Return the process-wide scheduler shared by all callers (e.g. Streamlit sessions)
+    
+    The scheduler thread is started right away if persisted posts or
+    recurring rules are waiting, so they survive a restart.
+    """
+    global _shared_scheduler
+    with _shared_scheduler_lock:
+        if _shared_scheduler is None:
+            _shared_scheduler = PostScheduler()
+            if _shared_scheduler.get_queue_depth() or _shared_scheduler._retry_next or _shared_scheduler._rule_next:
+                _shared_scheduler.start_scheduler()
+        return _shared_scheduler
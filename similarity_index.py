@@ -0,0 +1,244 @@
+"""
+Local similarity index over generated and posted drafts
+
+Each post is turned into a fixed-size vector with feature hashing (content
+words and word pairs with plurals folded, sublinear term frequency,
+L2-normalised), so there is no vocabulary to fit and nothing is downloaded. Vectors are appended as
+float32 rows to <SIMILARITY_INDEX_PATH>.f32 and metadata as JSON lines to
+<SIMILARITY_INDEX_PATH>.jsonl. Queries memory-map the matrix and take the
+top-k cosine scores with NumPy if it is installed; without NumPy the rows
+are kept in memory as sparse vectors and scored in pure Python.
+"""
+import hashlib
+import heapq
+import json
+import math
+import os
+import threading
+import zlib
+from array import array
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional
+import config
+from hashtag_index import tokenize
+from schedule_store import file_lock
+
+DIMENSIONS = 1024  # Must be a power of two; changing it needs a fresh index
+
+
+def _stem(token: str) -> str:
+    """Crude plural folding so "startups"/"startup" share a feature"""
+    if len(token) > 4 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def embed(text: str) -> Dict[int, float]:
+    """Sparse hashed vector {dimension: weight} with unit length"""
+    tokens = [_stem(t) for t in tokenize(text)]
+    counts = Counter(tokens)
+    counts.update(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+    vector: Dict[int, float] = {}
+    for term, count in counts.items():
+        # crc32 is stable across processes (hash() is salted); the top bit picks the sign
+        h = zlib.crc32(term.encode("utf-8"))
+        index = h & (DIMENSIONS - 1)
+        weight = (1 + math.log(count)) * (1 if h >> 31 else -1)
+        vector[index] = vector.get(index, 0.0) + weight
+    norm = math.sqrt(sum(w * w for w in vector.values()))
+    if not norm:
+        return {}
+    return {i: w / norm for i, w in vector.items() if w}
+
+
+def post_id_for(content: str) -> str:
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()[:16]
+
+
+class SimilarityIndex:
+    """Append-only store of post vectors with top-k cosine search
+
+    Several processes (app, CLI, scheduler) may append to the same files:
+    writes hold a file lock, and every call first reads rows other
+    processes appended since the last call.
+    """
+
+    def __init__(self, path: str):
+        self.vectors_path = f"{path}.f32"
+        self.meta_path = f"{path}.jsonl"
+        self.lock_path = f"{path}.lock"
+        self._entries: List[Dict] = []
+        self._ids = set()
+        self._sparse: List[Dict[int, float]] = []
+        self._meta_offset = 0
+        self._matrix = None
+        self._lock = threading.Lock()
+        self._use_numpy = _numpy_available()
+        with self._lock, file_lock(self.lock_path):
+            self._repair()
+            self._sync()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, content: str, title: str = "", kind: str = "draft", **meta) -> Optional[Dict]:
+        """Index a post unless the same text with the same kind is already indexed"""
+        entry_id = f"{kind}:{post_id_for(content)}"
+        vector = embed(f"{title}\n{content}")
+        if not vector:
+            return None
+        row = array("f", bytes(4 * DIMENSIONS))
+        for i, w in vector.items():
+            row[i] = w
+        with self._lock, file_lock(self.lock_path):
+            self._sync()
+            if entry_id in self._ids:
+                return None
+            entry = {"id": entry_id, "kind": kind, "title": title, "snippet": content[:200],
+                     "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), **meta}
+            # Vector first: a crash in between leaves a row without metadata, which _repair drops
+            with open(self.vectors_path, "ab") as f:
+                row.tofile(f)
+            line = (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+            with open(self.meta_path, "ab") as f:
+                f.write(line)
+            self._meta_offset += len(line)
+            self._append(entry, vector)
+        return entry
+
+    def similar(self, text: str, k: int = None, min_score: float = None, kind: str = None) -> List[Dict]:
+        """Past posts most similar to text, best first, as entries with a "score" """
+        k = config.SIMILAR_POSTS_TOP_K if k is None else k
+        min_score = config.SIMILAR_POST_MIN_SCORE if min_score is None else min_score
+        query = embed(text)
+        if not query or not k:
+            return []
+        with self._lock:
+            self._sync()
+            scores = self._scores(query)
+            entries = list(self._entries)
+        # Only k results are needed, so keep a k-sized heap instead of sorting every row
+        candidates = ((s, i) for i, s in enumerate(scores)
+                      if s >= min_score and (not kind or entries[i]["kind"] == kind))
+        return [dict(entries[i], score=round(float(score), 3)) for score, i in heapq.nlargest(k, candidates)]
+
+    def _scores(self, query: Dict[int, float]) -> List[float]:
+        if not self._entries:
+            return []
+        if self._use_numpy:
+            import numpy as np
+            if self._matrix is None or len(self._matrix) != len(self._entries):
+                self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r",
+                                         shape=(len(self._entries), DIMENSIONS))
+            q = np.zeros(DIMENSIONS, dtype=np.float32)
+            for i, w in query.items():
+                q[i] = w
+            return (self._matrix @ q).tolist()
+        return [sum(w * row.get(i, 0.0) for i, w in query.items()) for row in self._sparse]
+
+    def _append(self, entry: Dict, vector: Dict[int, float]):
+        self._entries.append(entry)
+        self._ids.add(entry["id"])
+        if not self._use_numpy:
+            self._sparse.append(vector)
+
+    def _sync(self):
+        """Read metadata lines (and, without NumPy, vector rows) appended since the last call"""
+        try:
+            size = os.path.getsize(self.meta_path)
+        except OSError:
+            return
+        if size <= self._meta_offset:
+            return
+        with open(self.meta_path, "rb") as f:
+            f.seek(self._meta_offset)
+            data = f.read(size - self._meta_offset)
+        # Only complete lines; a line still being written is picked up next time
+        data = data[:data.rfind(b"\n") + 1]
+        new_entries = [json.loads(line) for line in data.splitlines() if line.strip()]
+        self._meta_offset += len(data)
+        vectors = [None] * len(new_entries)
+        if not self._use_numpy and new_entries:
+            with open(self.vectors_path, "rb") as f:
+                f.seek(len(self._entries) * 4 * DIMENSIONS)
+                for n in range(len(new_entries)):
+                    row = array("f")
+                    row.fromfile(f, DIMENSIONS)
+                    vectors[n] = {i: w for i, w in enumerate(row) if w}
+        for entry, vector in zip(new_entries, vectors):
+            self._append(entry, vector)
+
+    def _repair(self):
+        """Make the two files agree after a crash between the vector and metadata writes"""
+        if not os.path.exists(self.meta_path) or not os.path.exists(self.vectors_path):
+            for path in (self.meta_path, self.vectors_path):
+                open(path, "ab").close()
+        with open(self.meta_path, "rb") as f:
+            data = f.read()
+        lines = []
+        for line in data.splitlines(keepends=True):
+            if not line.endswith(b"\n"):
+                break
+            try:
+                json.loads(line)
+            except ValueError:
+                break
+            lines.append(line)
+        rows = os.path.getsize(self.vectors_path) // (4 * DIMENSIONS)
+        keep = min(rows, len(lines))
+        if keep != len(lines) or sum(map(len, lines)) != len(data):
+            with open(self.meta_path, "wb") as f:
+                f.writelines(lines[:keep])
+        if os.path.getsize(self.vectors_path) != keep * 4 * DIMENSIONS:
+            os.truncate(self.vectors_path, keep * 4 * DIMENSIONS)
+
+
+def _numpy_available() -> bool:
+    try:
+        import numpy  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+_index: Optional[SimilarityIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_similarity_index() -> SimilarityIndex:
+    """Process-wide index at config.SIMILARITY_INDEX_PATH"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = SimilarityIndex(config.SIMILARITY_INDEX_PATH)
+        return _index
+
+
+def record_post(content: str, title: str = "", kind: str = "draft", **meta):
+    """Add a generated or published post to the history (never raises)"""
+    if not config.SIMILARITY_INDEX_PATH or not content:
+        return None
+    try:
+        return get_similarity_index().add(content, title, kind, **meta)
+    except Exception as e:
+        print(f"⚠️ Could not record post in similarity index: {e}")
+        return None
+
+
+def find_similar_posts(text: str, k: int = None) -> List[Dict]:
+    """Past drafts/posts similar to text ([] if the index is disabled or unreadable)"""
+    if not config.SIMILARITY_INDEX_PATH:
+        return []
+    try:
+        return get_similarity_index().similar(text, k)
+    except Exception as e:
+        print(f"⚠️ Could not search similarity index: {e}")
+        return []
+
+
+def reset_similarity_index():
+    """Drop the process-wide index so the next call picks up changed config"""
+    global _index
+    with _index_lock:
+        _index = None
@@ -0,0 +1,141 @@
+"""
+Registry of trending topic sources
+
+A source declares its endpoints, how to fetch and parse one endpoint, and
+how it may be scheduled: a time budget for the whole source, how many of
+its endpoints may be fetched at once and how long its results stay fresh.
+TrendingFinder runs every enabled source concurrently within those limits,
+so adding feeds costs parallel requests instead of a longer sequential
+refresh. Register more sources with register_source() and enable them by
+name in config.TRENDING_SOURCES (or TrendingFinder.sources).
+"""
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+import config
+from models import Topic
+from feed_stream import stream_json_children, stream_rss_entries
+from tracing import tracer
+
+USER_AGENT = "LinkedIn-AutoPoster/1.0"
+
+
+class Source:
+    """A trending source and its scheduling limits
+
+    endpoints(finder) returns the URLs/names to fetch and
+    fetch(finder, endpoint, limit, timeout) returns up to limit topics from
+    one of them (limit is entries_per_endpoint, or the caller's limit if that
+    is None). Limits not given here come from config.SOURCE_SETTINGS.
+    """
+
+    def __init__(self, name: str, endpoints: Callable, fetch: Callable, entries_per_endpoint: Optional[int] = 2,
+                 timeout: float = None, request_timeout: float = None, max_concurrency: int = None,
+                 refresh_interval: float = None, fallback: bool = False):
+        settings = {**config.SOURCE_SETTINGS.get("default", {}), **config.SOURCE_SETTINGS.get(name, {})}
+        self.name = name
+        self.endpoints = endpoints
+        self.fetch = fetch
+        self.entries_per_endpoint = entries_per_endpoint
+        # Budget for the whole source per refresh; unfinished endpoints are dropped
+        self.timeout = timeout if timeout is not None else settings.get("timeout", 10)
+        self.request_timeout = request_timeout if request_timeout is not None else settings.get("request_timeout", 10)
+        self.max_concurrency = max(1, max_concurrency if max_concurrency is not None else settings.get("max_concurrency", 4))
+        self.refresh_interval = refresh_interval if refresh_interval is not None else settings.get("refresh_interval", 0)
+        # Fallback sources only run when the enabled ones found nothing
+        self.fallback = fallback
+
+
+_registry: Dict[str, Source] = {}
+
+
+def register_source(source: Source) -> Source:
+    """Add (or replace) a source by name"""
+    _registry[source.name] = source
+    return source
+
+
+def get_source(name: str) -> Optional[Source]:
+    return _registry.get(name)
+
+
+def registered_sources() -> List[str]:
+    return list(_registry)
+
+
+# Built-in sources
+
+def fetch_reddit(finder, subreddit: str, limit: int, timeout: float) -> List[Topic]:
+    """Hot posts of one subreddit via the public JSON API (no auth needed for reading)"""
+    import requests
+    topics = []
+    try:
+        with tracer.span("fetch.reddit", subreddit=subreddit) as span:
+            url = f"{finder.reddit_base_url}/r/{subreddit}/hot.json?limit=3"
+            response = requests.get(url, headers={"User-Agent": USER_AGENT}, timeout=timeout, stream=True)
+            span.set_attribute("status_code", response.status_code)
+            if response.status_code != 200:
+                response.close()
+                return topics
+            # Stop reading the listing once the posts we use are parsed
+            children, stats = stream_json_children(response, limit)
+            for key, value in stats.items():
+                span.set_attribute(key, value)
+            # One timestamp per fetch, shared by its topics
+            timestamp = datetime.now().isoformat()
+            for post in children:
+                post_data = post.get("data", {})
+                topics.append(Topic(title=post_data.get("title", ""), url=post_data.get("url", ""),
+                                    score=post_data.get("score", 0), subreddit=subreddit, source="reddit",
+                                    timestamp=timestamp))
+    except Exception as e:
+        print(f"Error fetching from r/{subreddit}: {e}")
+    return topics
+
+
+def fetch_newsapi(finder, url: str, limit: int, timeout: float) -> List[Topic]:
+    """Top technology headlines from NewsAPI (free tier, needs NEWSAPI_KEY)"""
+    import requests
+    topics = []
+    try:
+        params = {"category": "technology", "language": "en", "pageSize": limit, "apiKey": config.NEWSAPI_KEY}
+        with tracer.span("fetch.newsapi") as span:
+            response = requests.get(url, params=params, timeout=timeout)
+            span.set_attribute("status_code", response.status_code)
+            if response.status_code == 200:
+                timestamp = datetime.now().isoformat()
+                for article in response.json().get("articles", []):
+                    topics.append(Topic(title=article.get("title", ""), url=article.get("url", ""),
+                                        description=article.get("description", ""), source="newsapi",
+                                        timestamp=timestamp))
+    except Exception as e:
+        print(f"Error fetching news trends: {e}")
+    return topics[:limit]
+
+
+def fetch_rss(finder, feed_url: str, limit: int, timeout: float) -> List[Topic]:
+    """First entries of one RSS/Atom feed, parsed while it downloads"""
+    import requests
+    topics = []
+    try:
+        with tracer.span("fetch.rss", feed=feed_url) as span:
+            response = requests.get(feed_url, headers={"User-Agent": USER_AGENT}, timeout=timeout, stream=True)
+            span.set_attribute("status_code", response.status_code)
+            if response.status_code != 200:
+                response.close()
+                return topics
+            entries, stats = stream_rss_entries(response, limit)
+            for key, value in stats.items():
+                span.set_attribute(key, value)
+            timestamp = datetime.now().isoformat()
+            for entry in entries:
+                topics.append(Topic(title=entry.get("title", ""), url=entry.get("link", ""),
+                                    description=entry.get("description", ""), source="rss", timestamp=timestamp))
+    except Exception as e:
+        print(f"Error parsing RSS feed {feed_url}: {e}")
+    return topics
+
+
+register_source(Source("reddit", lambda finder: finder.subreddits, fetch_reddit))
+register_source(Source("news", lambda finder: [finder.newsapi_url] if config.NEWSAPI_KEY else [],
+                       fetch_newsapi, entries_per_endpoint=None))
+register_source(Source("rss", lambda finder: finder.rss_feeds, fetch_rss, fallback=True))
@@ -0,0 +1,57 @@
+"""
+Concurrent generation jobs on one shared generator (no network)
+"""
+import threading
+
+import post_generator
+from jobs import SUCCEEDED, JobExecutor
+from post_generator import PostGenerator
+
+
+def test_concurrent_jobs_report_their_own_provider(monkeypatch):
+    monkeypatch.setattr(post_generator, "local_llm_enabled", lambda: False)
+    # One generator for every session, as app.get_generator hands out
+    generator = PostGenerator(use_llm=True)
+    generator.groq_api_key = "groq-key"
+    generator.together_api_key = "together-key"
+    generator.hf_api_key = ""
+    groq_done = threading.Event()
+    together_done = threading.Event()
+
+    def fake_groq(topic):
+        if topic["title"] == "Groq topic":
+            return "post from groq"
+        return None  # quota used up for this one, falls through to Together
+
+    def fake_together(topic):
+        groq_done.wait(5)  # finish after the Groq job has generated
+        return "post from together"
+
+    monkeypatch.setattr(generator, "generate_with_groq", fake_groq)
+    monkeypatch.setattr(generator, "generate_with_together", fake_together)
+
+    def groq_job(job, topic):
+        result = generator.generate_post_with_provider(topic)
+        groq_done.set()
+        together_done.wait(5)  # the worker is descheduled while the other job finishes
+        return result
+
+    def together_job(job, topic):
+        result = generator.generate_post_with_provider(topic)
+        together_done.set()
+        return result
+
+    executor = JobExecutor(max_workers=2)
+    try:
+        first = executor.submit("generate", groq_job, {"title": "Groq topic"})
+        second = executor.submit("generate", together_job, {"title": "Together topic"})
+        executor.shutdown(wait=True)
+    finally:
+        executor.shutdown()
+
+    first_job, second_job = executor.get(first), executor.get(second)
+    assert first_job.status == SUCCEEDED and second_job.status == SUCCEEDED
+    assert first_job.result == ("post from groq", "groq")
+    assert second_job.result == ("post from together", "together")
+    # The shared attribute only holds whichever call finished last
+    assert generator.last_provider == "together"
@@ -0,0 +1,36 @@
+"""
+TF-IDF hashtags see the topic description, like the text generation does
+"""
+import config
+import post_generator
+from hashtag_index import HashtagIndex
+from post_generator import PostGenerator
+
+
+def corpus():
+    index = HashtagIndex()
+    topics = [{"title": f"Release notes roundup {n}", "description": "Kubernetes operators and serverless platforms"}
+              for n in range(config.HASHTAG_MIN_DOCS)]
+    topics += [{"title": f"Hiring market update {n}", "description": "Remote engineering salaries"} for n in range(5)]
+    index.add_topics(topics)
+    return index
+
+
+def test_description_terms_reach_the_index(monkeypatch):
+    monkeypatch.setattr(post_generator, "get_hashtag_index", corpus)
+    generator = PostGenerator(use_llm=False)
+    title = "What platform teams shipped this week"
+    with_description = generator._generate_hashtags(title, "rss", "New Kubernetes operators for serverless apps")
+    without = generator._generate_hashtags(title, "rss")
+    assert "#Kubernetes" in with_description.split()
+    assert "#Kubernetes" not in without.split()
+
+
+def test_cached_hashtags_depend_on_the_description():
+    index = corpus()
+    title = "What platform teams shipped this week"
+    first = index.hashtags(title, "Kubernetes operators", limit=4)
+    second = index.hashtags(title, "Remote salaries", limit=4)
+    assert "#Kubernetes" in first
+    assert "#Kubernetes" not in second
+    assert index.hashtags(title, "Kubernetes operators", limit=4) == first
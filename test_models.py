@@ -0,0 +1,89 @@
+"""
+Record checks: dict compatibility, None vs missing fields, copies and equality
+"""
+import json
+
+import pytest
+
+from models import MISSING, ScheduledPost, Topic
+
+POST = {
+    "id": "post_1",
+    "content": "Hello LinkedIn",
+    "scheduled_time": "2026-10-19 10:00:00",
+    "status": "scheduled",
+    "use_llm": False,
+    "error": None,
+    "custom_flag": "kept",
+}
+
+
+def test_json_round_trip_keeps_none_and_extra_keys():
+    post = ScheduledPost.from_dict(json.loads(json.dumps(POST)))
+    assert post.to_dict() == POST
+    assert json.loads(json.dumps(post.to_dict())) == POST
+    assert post == POST
+
+
+def test_none_is_a_value_not_a_missing_field():
+    post = ScheduledPost(id="post_1")
+    post["error"] = None
+    assert "error" in post
+    assert post["error"] is None
+    assert post.get("error", "default") is None
+    assert post.to_dict() == {"id": "post_1", "error": None}
+
+
+def test_missing_field_behaves_like_missing_key():
+    post = ScheduledPost(id="post_1")
+    assert "status" not in post
+    assert post.get("status") is None
+    assert post.get("status", "scheduled") == "scheduled"
+    with pytest.raises(KeyError):
+        post["status"]
+    with pytest.raises(KeyError):
+        del post["status"]
+    assert post.pop("status", "gone") == "gone"
+    # Attribute reads see the falsy marker
+    assert post.status is MISSING
+    assert not post.status
+
+
+def test_delete_and_pop_unset_fields():
+    post = ScheduledPost(POST)
+    del post["error"]
+    assert "error" not in post
+    assert post.pop("custom_flag") == "kept"
+    assert "custom_flag" not in post
+    assert set(post) == {"id", "content", "scheduled_time", "status", "use_llm"}
+    assert len(post) == 5
+
+
+def test_copy_is_independent():
+    post = ScheduledPost(POST)
+    copy = post.copy()
+    assert copy == post
+    assert copy is not post
+    copy["status"] = "posted"
+    copy["custom_flag"] = "changed"
+    assert post["status"] == "scheduled"
+    assert post["custom_flag"] == "kept"
+    assert copy != post
+
+
+def test_equality():
+    assert ScheduledPost(POST) == ScheduledPost(dict(POST))
+    assert ScheduledPost(id="a", error=None) != ScheduledPost(id="a")
+    assert ScheduledPost(id="a", custom_flag=1) != ScheduledPost(id="a")
+    assert Topic(title="a") != ScheduledPost(id="a")
+    assert Topic(title="a") == {"title": "a"}
+    assert Topic(title="a") != {"title": "a", "url": None}
+
+
+def test_build_from_record_and_pairs():
+    topic = Topic([("title", "AI agents"), ("score", 3)])
+    assert Topic(topic) == topic
+    assert dict(topic) == {"title": "AI agents", "score": 3}
+    assert Topic.from_dict(topic) is topic
+    topic.update({"url": None}, score=4)
+    assert topic.to_dict() == {"title": "AI agents", "url": None, "score": 4}
@@ -0,0 +1,43 @@
+"""
+Rate limiter checks against recorded provider headers (no network)
+"""
+from rate_limiter import ProviderLimiter
+
+
+class RecordedResponse:
+    def __init__(self, headers, status_code=200):
+        self.headers = headers
+        self.status_code = status_code
+
+    def json(self):
+        return {}
+
+
+# Headers from a typical Groq chat completion: request limits are per day, token limits per minute
+GROQ_HEADERS = {
+    "x-ratelimit-limit-requests": "14400",
+    "x-ratelimit-remaining-requests": "14370",
+    "x-ratelimit-reset-requests": "2m59.56s",
+    "x-ratelimit-limit-tokens": "6000",
+    "x-ratelimit-remaining-tokens": "5800",
+    "x-ratelimit-reset-tokens": "2s",
+}
+
+
+def test_groq_request_headers_leave_rpm_bucket_alone():
+    limiter = ProviderLimiter("groq", 30, 6000)
+    limiter.record_response(RecordedResponse(GROQ_HEADERS))
+    assert limiter.requests.capacity == 30
+    assert limiter.requests.refill_per_second == 0.5
+    assert limiter.blocked_until == 0.0
+    # Token headers are per minute and still synced
+    assert limiter.tokens.capacity == 6000
+    assert limiter.tokens.level <= 5800
+
+
+def test_exhausted_request_quota_pauses_provider():
+    limiter = ProviderLimiter("groq", 30, 6000)
+    headers = dict(GROQ_HEADERS, **{"x-ratelimit-remaining-requests": "0"})
+    limiter.record_response(RecordedResponse(headers))
+    assert limiter.requests.capacity == 30
+    assert not limiter.acquire(max_wait=0)
@@ -0,0 +1,172 @@
+"""
+Cron parsing, next fire times and recurring-rule catch-up on a fixed clock
+"""
+import time
+from datetime import datetime
+
+import pytest
+
+import config
+from recurrence import CronExpression, from_local, to_local
+from scheduler import PostScheduler
+
+NOW = datetime(2026, 10, 19, 12, 10)
+
+
+@pytest.fixture
+def utc(monkeypatch):
+    """Run with UTC as the system timezone so local-time conversions are fixed"""
+    if not hasattr(time, "tzset"):
+        pytest.skip("needs time.tzset")
+    monkeypatch.setenv("TZ", "UTC")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+@pytest.fixture
+def scheduler(tmp_path, monkeypatch, utc):
+    monkeypatch.chdir(tmp_path)
+    return PostScheduler()
+
+
+def add_rule(scheduler, cron="0 * * * *", handled_until="2026-10-19 05:00:00", catch_up="skip", timezone=""):
+    rule = {"id": "rule_test", "cron": cron, "timezone": timezone, "jitter_minutes": 0, "catch_up": catch_up,
+            "topic": "AI agents", "content": "", "use_llm": False, "generate_from_trending": False,
+            "enabled": True, "handled_until": handled_until, "created_at": handled_until}
+    assert scheduler.rules.add(rule)
+    return rule
+
+
+def occurrences(scheduler):
+    return sorted(p["occurrence"][11:16] for p in scheduler.store.read() if p.get("rule_id") == "rule_test")
+
+
+# Parsing
+
+
+def test_parse_fields():
+    cron = CronExpression("*/15 9-17 1,15 jan,jul mon-fri")
+    assert cron.minutes == {0, 15, 30, 45}
+    assert cron.hours == set(range(9, 18))
+    assert cron.days == {1, 15}
+    assert cron.months == {1, 7}
+    assert cron.weekdays == {1, 2, 3, 4, 5}
+
+
+def test_shortcuts_and_aliases():
+    assert CronExpression("@daily").hours == {0}
+    assert CronExpression("@weekly").weekdays == {0}
+    assert CronExpression("0 9 * * 7").weekdays == {0}
+    assert CronExpression("0 9 * * weekends").weekdays == {0, 6}
+    assert CronExpression("5/20 * * * *").minutes == {5, 25, 45}
+
+
+@pytest.mark.parametrize("expression", ["* * * *", "60 * * * *", "* 24 * * *", "0 0 0 * *", "*/0 * * * *",
+                                        "0 0 * 13 *", "5-1 * * * *", "0 0 * * funday"])
+def test_invalid_expressions(expression):
+    with pytest.raises(ValueError):
+        CronExpression(expression)
+
+
+# Next fire time
+
+
+def test_next_after_is_strictly_after():
+    cron = CronExpression("30 9 * * *")
+    assert cron.next_after(datetime(2026, 10, 19, 9, 30)) == datetime(2026, 10, 20, 9, 30)
+    assert cron.next_after(datetime(2026, 10, 19, 9, 29, 59)) == datetime(2026, 10, 19, 9, 30)
+
+
+def test_next_after_skips_short_months():
+    cron = CronExpression("0 9 31 * *")
+    assert cron.next_after(datetime(2026, 1, 31, 9, 0)) == datetime(2026, 3, 31, 9, 0)
+    assert cron.next_after(datetime(2026, 3, 31, 9, 0)) == datetime(2026, 5, 31, 9, 0)
+
+
+def test_next_after_rolls_over_month_and_year_ends():
+    assert CronExpression("59 23 * * *").next_after(datetime(2026, 12, 31, 23, 59)) == datetime(2027, 1, 1, 23, 59)
+    assert CronExpression("@monthly").next_after(datetime(2026, 2, 28, 12, 0)) == datetime(2026, 3, 1, 0, 0)
+    assert CronExpression("0 0 29 2 *").next_after(datetime(2026, 3, 1)) == datetime(2028, 2, 29, 0, 0)
+
+
+def test_day_of_month_or_weekday_when_both_restricted():
+    cron = CronExpression("0 9 1 * mon")
+    # Tue 2026-09-01 (first of the month), then Mon 2026-09-07
+    assert cron.next_after(datetime(2026, 8, 31, 10, 0)) == datetime(2026, 9, 1, 9, 0)
+    assert cron.next_after(datetime(2026, 9, 1, 9, 0)) == datetime(2026, 9, 7, 9, 0)
+
+
+def test_occurrences_window():
+    cron = CronExpression("0 */6 * * *")
+    assert list(cron.occurrences(datetime(2026, 10, 19, 0, 0), datetime(2026, 10, 19, 18, 0))) == [
+        datetime(2026, 10, 19, 6, 0), datetime(2026, 10, 19, 12, 0), datetime(2026, 10, 19, 18, 0)]
+
+
+def test_wall_times_across_dst_changes(utc):
+    cron = CronExpression("0 9 * * *")
+    # Europe/Berlin switches to summer time on 2026-03-29 and back on 2026-10-25
+    before = cron.next_after(datetime(2026, 3, 28, 0, 0))
+    after = cron.next_after(before)
+    assert (before, after) == (datetime(2026, 3, 28, 9, 0), datetime(2026, 3, 29, 9, 0))
+    assert to_local(before, "Europe/Berlin") == datetime(2026, 3, 28, 8, 0)
+    assert to_local(after, "Europe/Berlin") == datetime(2026, 3, 29, 7, 0)
+    assert to_local(datetime(2026, 10, 25, 9, 0), "Europe/Berlin") == datetime(2026, 10, 25, 8, 0)
+    # A wall time skipped by the spring change still fires (an hour later in real time)
+    skipped = CronExpression("30 2 * * *").next_after(datetime(2026, 3, 28, 3, 0))
+    assert skipped == datetime(2026, 3, 29, 2, 30)
+    assert to_local(skipped, "Europe/Berlin") == datetime(2026, 3, 29, 1, 30)
+    assert from_local(datetime(2026, 3, 29, 1, 30), "Europe/Berlin") == datetime(2026, 3, 29, 3, 30)
+
+
+# Catch-up after downtime (fixed clock: NOW is 12:10, the rule last ran at 05:00)
+
+
+def test_on_time_occurrence_is_scheduled_for_its_slot(scheduler):
+    add_rule(scheduler, handled_until="2026-10-19 11:00:00")
+    assert scheduler.materialize_recurring_posts(now=datetime(2026, 10, 19, 11, 59, 30)) == 1
+    post = scheduler.store.get("rule_test@202610191200")
+    assert post["scheduled_time"] == "2026-10-19 12:00:00"
+    assert post["status"] == "scheduled"
+    assert scheduler.rules.get("rule_test")["handled_until"] == "2026-10-19 12:00:00"
+
+
+def test_catch_up_skip(scheduler):
+    add_rule(scheduler, catch_up="skip")
+    assert scheduler.materialize_recurring_posts(now=NOW) == 0
+    assert occurrences(scheduler) == []
+    assert scheduler.rules.get("rule_test")["handled_until"] == "2026-10-19 12:00:00"
+    assert scheduler._rule_next["rule_test"][0] == datetime(2026, 10, 19, 13, 0)
+
+
+def test_catch_up_latest(scheduler):
+    add_rule(scheduler, catch_up="latest")
+    assert scheduler.materialize_recurring_posts(now=NOW) == 1
+    assert occurrences(scheduler) == ["12:00"]
+    assert scheduler.store.get("rule_test@202610191200")["scheduled_time"] == "2026-10-19 12:10:00"
+
+
+def test_catch_up_all_is_bounded(scheduler, monkeypatch):
+    monkeypatch.setattr(config, "RECURRING_MAX_CATCH_UP", 3)
+    add_rule(scheduler, catch_up="all")
+    # 06:00 through 12:00 were missed; only the newest three are published
+    assert scheduler.materialize_recurring_posts(now=NOW) == 3
+    assert occurrences(scheduler) == ["10:00", "11:00", "12:00"]
+    assert scheduler.rules.get("rule_test")["handled_until"] == "2026-10-19 12:00:00"
+
+
+def test_catch_up_in_rule_timezone(scheduler):
+    # 12:10 UTC is 14:10 in Berlin, so the missed wall-clock occurrences run up to 14:00
+    add_rule(scheduler, catch_up="latest", timezone="Europe/Berlin", handled_until="2026-10-19 07:00:00")
+    assert scheduler.materialize_recurring_posts(now=NOW) == 1
+    assert occurrences(scheduler) == ["14:00"]
+
+
+def test_materializing_twice_creates_each_post_once(scheduler):
+    add_rule(scheduler, catch_up="all")
+    other = PostScheduler()  # second process on the same files
+    assert scheduler.materialize_recurring_posts(now=NOW) == 5
+    assert other.materialize_recurring_posts(now=NOW) == 0
+    assert scheduler.materialize_recurring_posts(now=NOW) == 0
+    assert len(occurrences(scheduler)) == 5
@@ -0,0 +1,174 @@
+"""
+Failure classification, retry backoff and dead-lettering on a fixed clock
+"""
+from datetime import datetime, timedelta
+
+import pytest
+import requests
+import urllib3.exceptions
+from selenium.common.exceptions import TimeoutException
+
+import config
+import linkedin_poster
+import scheduler as scheduler_module
+from models import ScheduledPost
+from scheduler import TIME_FORMAT, PostScheduler
+
+NOW = datetime(2026, 10, 19, 12, 0, 0)
+
+
+class FrozenDatetime(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return NOW
+
+
+@pytest.fixture
+def scheduler(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(scheduler_module, "datetime", FrozenDatetime)
+    monkeypatch.setattr(config, "RETRY_JITTER", 0)
+    return PostScheduler()
+
+
+def add_post(scheduler, **fields):
+    post = ScheduledPost(id="post_1", content="Hello LinkedIn", topic="AI", scheduled_time="2026-10-19 11:59:00",
+                         status="publishing", **fields)
+    assert scheduler.store.add(post)
+    return scheduler.scheduled_posts[0]
+
+
+def at(seconds):
+    return (NOW + timedelta(seconds=seconds)).strftime(TIME_FORMAT)
+
+
+@pytest.mark.parametrize("error, error_class", [
+    (TimeoutException("page did not load"), "browser"),
+    (urllib3.exceptions.ProtocolError("connection aborted"), "browser"),
+    (requests.ConnectionError("no route"), "generation"),
+    (ValueError("something else"), "unknown"),
+])
+def test_classify_error(error, error_class):
+    assert PostScheduler.classify_error(error) == error_class
+
+
+@pytest.mark.parametrize("error_class", sorted(config.RETRY_POLICIES))
+def test_first_failure_of_each_class(scheduler, error_class):
+    policy = config.RETRY_POLICIES[error_class]
+    post = add_post(scheduler)
+    scheduler._record_failure(post, error_class, "boom")
+    stored = scheduler.store.get("post_1")
+    assert stored["attempts"] == 1
+    assert stored["error_class"] == error_class
+    assert stored["error"] == "boom"
+    if policy["max_attempts"] == 1:
+        assert stored["status"] == "dead_letter"
+        assert stored["finished_at"] == NOW.strftime(TIME_FORMAT)
+        assert "next_attempt_at" not in stored
+    else:
+        assert stored["status"] == "retrying"
+        assert stored["next_attempt_at"] == at(policy["base_delay"])
+
+
+def test_backoff_doubles_then_dead_letters_at_max_attempts(scheduler):
+    post = add_post(scheduler)
+    # publish: 3 attempts, 120 s base delay, factor 2
+    scheduler._record_failure(post, "publish", "Posting failed")
+    assert (post["status"], post["attempts"], post["next_attempt_at"]) == ("retrying", 1, at(120))
+    scheduler._record_failure(post, "publish", "Posting failed")
+    assert (post["status"], post["attempts"], post["next_attempt_at"]) == ("retrying", 2, at(240))
+    scheduler._record_failure(post, "publish", "Posting failed")
+    stored = scheduler.store.get("post_1")
+    assert (stored["status"], stored["attempts"]) == ("dead_letter", 3)
+    assert stored["finished_at"] == NOW.strftime(TIME_FORMAT)
+    assert "post_1" not in scheduler._retry_next
+
+
+def test_backoff_is_capped_at_max_delay(scheduler, monkeypatch):
+    monkeypatch.setitem(config.RETRY_POLICIES, "publish",
+                        {"max_attempts": 10, "base_delay": 120, "factor": 2, "max_delay": 1800})
+    post = add_post(scheduler, attempts=5)
+    scheduler._record_failure(post, "publish", "Posting failed")
+    # 120 * 2**5 = 3840 s, capped at 1800
+    assert (post["attempts"], post["next_attempt_at"]) == (6, at(1800))
+
+
+def test_unknown_error_class_uses_unknown_policy(scheduler):
+    post = add_post(scheduler)
+    scheduler._record_failure(post, "cosmic_rays", "bit flip")
+    assert post["next_attempt_at"] == at(config.RETRY_POLICIES["unknown"]["base_delay"])
+    scheduler._record_failure(post, "cosmic_rays", "bit flip")
+    assert post["status"] == "dead_letter"
+
+
+@pytest.mark.parametrize("draw", [-1.0, 0.0, 1.0])
+def test_jitter_stays_within_bounds(scheduler, monkeypatch, draw):
+    monkeypatch.setattr(config, "RETRY_JITTER", 0.1)
+    calls = []
+
+    def uniform(low, high):
+        calls.append((low, high))
+        return draw * high
+
+    monkeypatch.setattr(scheduler_module.random, "uniform", uniform)
+    post = add_post(scheduler)
+    scheduler._record_failure(post, "browser", "chrome crashed")
+    assert calls == [(-0.1, 0.1)]
+    # 60 s base delay +/- 10%
+    assert post["next_attempt_at"] == at(60 * (1 + draw * 0.1))
+
+
+def test_retry_becomes_due_at_next_attempt(scheduler):
+    post = add_post(scheduler)
+    scheduler._record_failure(post, "generation", "quota")
+    assert scheduler._pop_due_retries(NOW + timedelta(seconds=59)) == []
+    assert scheduler._pop_due_retries(NOW + timedelta(seconds=60)) == ["post_1"]
+
+
+class FailingPoster:
+    """Stands in for LinkedInPoster; fails the way the test asks"""
+
+    fail_with = None
+
+    def __init__(self, profile=None):
+        self.email = config.LINKEDIN_EMAIL
+
+    def setup_driver(self):
+        if self.fail_with:
+            raise self.fail_with
+
+    def login(self):
+        return True
+
+    def post_content(self, content, automated=False):
+        return False
+
+    def close(self):
+        pass
+
+
+def test_publish_failure_keeps_content_for_the_retry(scheduler, monkeypatch):
+    monkeypatch.setattr(linkedin_poster, "LinkedInPoster", FailingPoster)
+    post = add_post(scheduler, provider="groq")
+    assert scheduler.execute_post(post) is False
+    stored = scheduler.store.get("post_1")
+    assert (stored["status"], stored["error_class"], stored["attempts"]) == ("retrying", "publish", 1)
+    assert stored["next_attempt_at"] == at(120)
+    assert (stored["content"], stored["provider"]) == ("Hello LinkedIn", "groq")
+
+
+def test_browser_error_is_retried_as_browser(scheduler, monkeypatch):
+    monkeypatch.setattr(FailingPoster, "fail_with", TimeoutException("chrome did not start"))
+    monkeypatch.setattr(linkedin_poster, "LinkedInPoster", FailingPoster)
+    post = add_post(scheduler)
+    assert scheduler.execute_post(post) is False
+    stored = scheduler.store.get("post_1")
+    assert (stored["status"], stored["error_class"], stored["next_attempt_at"]) == ("retrying", "browser", at(60))
+
+
+def test_missing_content_is_dead_lettered_at_once(scheduler):
+    post = add_post(scheduler)
+    post["content"] = ""
+    assert scheduler.execute_post(post) is False
+    stored = scheduler.store.get("post_1")
+    assert (stored["status"], stored["error_class"], stored["attempts"]) == ("dead_letter", "invalid", 1)
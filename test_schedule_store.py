@@ -0,0 +1,162 @@
+"""
+ScheduleStore concurrency control: versions, compare-and-swap and change feed
+"""
+import json
+import os
+import threading
+
+from models import ScheduledPost
+from schedule_store import ScheduleStore
+
+
+def make_post(post_id, status="scheduled", **fields):
+    return ScheduledPost(id=post_id, content=f"Post {post_id}", scheduled_time="2030-01-01 10:00:00",
+                         status=status, **fields)
+
+
+def on_disk(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_two_stores_keep_each_others_updates(tmp_path):
+    path = str(tmp_path / "scheduled_posts.json")
+    first = ScheduleStore(path, record=ScheduledPost)
+    first.replace([make_post("a"), make_post("b")])
+    second = ScheduleStore(path, record=ScheduledPost)
+
+    assert first.update_post("a", {"status": "posted"})
+    # second still holds the old snapshot; its write must re-read instead of overwriting
+    assert second.version == 1
+    assert second.update_post("b", {"status": "expired"})
+
+    data = on_disk(path)
+    assert data["version"] == 3
+    assert {p["id"]: p["status"] for p in data["posts"]} == {"a": "posted", "b": "expired"}
+    first.refresh()
+    assert first.version == 3
+    assert first.get("b")["status"] == "expired"
+
+
+def test_stale_expected_version_is_rejected(tmp_path):
+    path = str(tmp_path / "scheduled_posts.json")
+    first = ScheduleStore(path, record=ScheduledPost)
+    first.replace([make_post("a")])
+    second = ScheduleStore(path, record=ScheduledPost)
+    seen_version = second.version
+
+    first.update_post("a", {"content": "edited elsewhere"})
+
+    def overwrite(posts):
+        posts[0]["content"] = "stale edit"
+
+    assert second.update(overwrite, expected_version=seen_version) is None
+    assert on_disk(path)["posts"][0]["content"] == "edited elsewhere"
+    # The failed write still brought the snapshot up to date, so a retry works
+    assert second.update(overwrite, expected_version=second.version) == 3
+    assert on_disk(path)["posts"][0]["content"] == "stale edit"
+
+
+def test_compare_and_swap_conflict(tmp_path):
+    path = str(tmp_path / "scheduled_posts.json")
+    first = ScheduleStore(path, record=ScheduledPost)
+    first.replace([make_post("a")])
+    second = ScheduleStore(path, record=ScheduledPost)
+
+    assert first.update_post("a", {"status": "publishing"}, expect={"status": "scheduled"})
+    assert not second.update_post("a", {"status": "publishing"}, expect={"status": "scheduled"})
+    assert not second.update_post("missing", {"status": "posted"})
+    assert on_disk(path)["version"] == 2
+
+
+def test_only_one_concurrent_claim_wins(tmp_path):
+    path = str(tmp_path / "scheduled_posts.json")
+    ScheduleStore(path, record=ScheduledPost).replace([make_post("a")])
+    stores = [ScheduleStore(path, record=ScheduledPost) for _ in range(4)]
+    start = threading.Barrier(len(stores))
+    won = []
+
+    def claim(store, name):
+        start.wait()
+        if store.update_post("a", {"status": "publishing", "account": name}, expect={"status": "scheduled"}):
+            won.append(name)
+
+    threads = [threading.Thread(target=claim, args=(store, f"worker{i}")) for i, store in enumerate(stores)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(won) == 1
+    assert on_disk(path)["posts"][0]["account"] == won[0]
+
+
+def test_concurrent_increments_are_not_lost(tmp_path):
+    path = str(tmp_path / "scheduled_posts.json")
+    ScheduleStore(path, record=ScheduledPost).replace([make_post("a", attempts=0)])
+    stores = [ScheduleStore(path, record=ScheduledPost) for _ in range(2)]
+
+    def bump(posts):
+        posts[0]["attempts"] += 1
+
+    def worker(store):
+        for _ in range(10):
+            store.update(bump)
+
+    threads = [threading.Thread(target=worker, args=(store,)) for store in stores]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    data = on_disk(path)
+    assert data["posts"][0]["attempts"] == 20
+    assert data["version"] == 21
+
+
+def test_reload_after_external_write(tmp_path):
+    path = str(tmp_path / "scheduled_posts.json")
+    store = ScheduleStore(path, record=ScheduledPost)
+    store.replace([make_post("a"), make_post("b")])
+    changes = []
+    store.subscribe(changes.append)
+
+    # Another process rewrites the file the same way the store does (temp file + rename)
+    tmp = f"{path}.external"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": 7, "posts": [make_post("a", status="posted").to_dict(), make_post("c").to_dict()]}, f)
+    os.replace(tmp, path)
+
+    assert store.refresh()
+    assert store.version == 7
+    assert [p["id"] for p in store.read()] == ["a", "c"]
+    assert len(changes) == 1
+    assert sorted(p.id for p in changes[0]["upserted"]) == ["a", "c"]
+    assert changes[0]["removed"] == ["b"]
+    # Nothing changed since, so no second notification
+    assert not store.refresh()
+    assert len(changes) == 1
+
+    # The next write builds on the external version
+    assert store.update_post("c", {"status": "posted"})
+    assert on_disk(path)["version"] == 8
+
+
+def test_legacy_list_file_loads_as_version_zero(tmp_path):
+    path = tmp_path / "scheduled_posts.json"
+    path.write_text(json.dumps([make_post("a").to_dict()]), encoding="utf-8")
+    store = ScheduleStore(str(path), record=ScheduledPost)
+    assert store.version == 0
+    assert store.get("a")["status"] == "scheduled"
+    assert store.update_post("a", {"status": "posted"})
+    assert on_disk(str(path))["version"] == 1
+
+
+def test_reads_are_copies(tmp_path):
+    store = ScheduleStore(str(tmp_path / "scheduled_posts.json"), record=ScheduledPost)
+    store.replace([make_post("a")])
+    post = store.read()[0]
+    post["status"] = "posted"
+    store.get("a")["content"] = "changed"
+    assert store.get("a")["status"] == "scheduled"
+    assert store.get("a")["content"] == "Post a"
@@ -0,0 +1,54 @@
+"""
+Similarity index search: top-k order, score threshold and kind filter
+"""
+import similarity_index
+from similarity_index import SimilarityIndex, embed
+
+POSTS = [
+    ("AI agents are changing how startups build software products", "draft"),
+    ("How AI agents help startups ship software faster", "posted"),
+    ("Remote work tips for distributed engineering teams", "draft"),
+    ("Startups adopting AI agents for customer support", "draft"),
+    ("Quarterly earnings of cloud providers beat expectations", "posted"),
+    ("Building software with AI agents: lessons from startups", "posted"),
+]
+
+
+def full_sort(text, k, min_score, kind=None):
+    query = embed(text)
+    scored = [(sum(w * embed(f"\n{content}").get(i, 0.0) for i, w in query.items()), n)
+              for n, (content, post_kind) in enumerate(POSTS) if not kind or post_kind == kind]
+    return [n for score, n in sorted(scored, reverse=True) if score >= min_score][:k]
+
+
+def build(tmp_path, monkeypatch, use_numpy):
+    monkeypatch.setattr(similarity_index, "_numpy_available", lambda: use_numpy)
+    index = SimilarityIndex(str(tmp_path / f"history_{use_numpy}"))
+    for content, kind in POSTS:
+        index.add(content, kind=kind)
+    return index
+
+
+def positions(results):
+    ids = [f"{kind}:{similarity_index.post_id_for(content)}" for content, kind in POSTS]
+    return [ids.index(entry["id"]) for entry in results]
+
+
+def test_top_k_matches_a_full_sort(tmp_path, monkeypatch):
+    text = "AI agents for startups building software"
+    for use_numpy in {False, similarity_index._numpy_available()}:
+        index = build(tmp_path, monkeypatch, use_numpy)
+        results = index.similar(text, k=3, min_score=0.0)
+        assert positions(results) == full_sort(text, 3, 0.0)
+        scores = [entry["score"] for entry in results]
+        assert scores == sorted(scores, reverse=True)
+
+
+def test_kind_filter_and_min_score(tmp_path, monkeypatch):
+    index = build(tmp_path, monkeypatch, False)
+    text = "AI agents for startups building software"
+    posted = index.similar(text, k=3, min_score=0.0, kind="posted")
+    assert positions(posted) == full_sort(text, 3, 0.0, kind="posted")
+    assert all(entry["kind"] == "posted" for entry in posted)
+    assert index.similar(text, k=3, min_score=0.99) == []
+    assert index.similar(text, k=0) == []
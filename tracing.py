@@ -0,0 +1,198 @@
+"""
+Lightweight step-level tracing for the posting pipeline
+
+Spans record start/end time, duration, attributes and parent/child links.
+Finished spans are kept in memory and, if TRACE_FILE is set, appended to
+that file as JSON lines.
+"""
+import json
+import threading
+import time
+import uuid
+from collections import deque
+from contextvars import ContextVar
+from functools import wraps
+from typing import Dict, List, Optional
+import config
+
+
+class Span:
+    """A single timed operation"""
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str] = None, attributes: Dict = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.attributes = dict(attributes or {})
+        self.start_time = time.time()
+        self.end_time = None
+        self.duration_ms = None
+        self.status = "ok"
+        self.error = None
+        self.thread = threading.current_thread().name
+        self._start_perf = time.perf_counter()
+        self._open_step = None
+
+    def set_attribute(self, key: str, value):
+        """Attach an attribute to the span"""
+        self.attributes[key] = value
+
+    def set_error(self, error):
+        """Mark the span as failed"""
+        self.status = "error"
+        self.error = str(error)
+
+    def to_dict(self) -> Dict:
+        """Serialize the span for export"""
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start_time,
+            "end": self.end_time,
+            "duration_ms": self.duration_ms,
+            "status": self.status,
+            "error": self.error,
+            "thread": self.thread,
+            "attributes": self.attributes
+        }
+
+
+class Tracer:
+    """Creates spans and collects finished ones"""
+
+    def __init__(self, trace_file: str = None, max_spans: int = 10000):
+        self.trace_file = trace_file
+        self.finished_spans = deque(maxlen=max_spans)
+        self._current = ContextVar("current_span", default=None)
+        self._lock = threading.Lock()
+
+    def current_span(self) -> Optional[Span]:
+        """Return the span active in this thread/context, if any"""
+        return self._current.get()
+
+    def annotate(self, **attributes):
+        """Set attributes on the current span (no-op outside a span)"""
+        span = self.current_span()
+        if span is not None:
+            span.attributes.update(attributes)
+
+    def span(self, name: str, **attributes):
+        """Context manager that times a block as a child of the current span"""
+        return _SpanContext(self, name, attributes)
+
+    def start_span(self, name: str, parent: Optional[Span] = None, **attributes) -> Span:
+        """Create a span without activating it (use end_span to finish it)"""
+        parent = parent if parent is not None else self.current_span()
+        trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        return Span(name, trace_id, parent.span_id if parent else None, attributes)
+
+    def end_span(self, span: Span):
+        """Finish a span and record it"""
+        if span.end_time is not None:
+            return
+        if span._open_step is not None:
+            step = span._open_step
+            span._open_step = None
+            if span.status == "error" and step.status == "ok":
+                step.set_error(span.error)
+            self.end_span(step)
+        span.end_time = time.time()
+        span.duration_ms = round((time.perf_counter() - span._start_perf) * 1000, 3)
+        self._record(span)
+
+    def step(self, name: str, **attributes) -> Optional[Span]:
+        """Start a sequential step inside the current span
+
+        The previous step (if any) is finished first, and the last open step
+        is finished together with its parent span.
+        """
+        parent = self.current_span()
+        if parent is None:
+            return None
+        if parent._open_step is not None:
+            self.end_span(parent._open_step)
+        step = self.start_span(name, parent=parent, **attributes)
+        parent._open_step = step
+        return step
+
+    def step_annotate(self, **attributes):
+        """Set attributes on the open step of the current span (or the span itself)"""
+        span = self.current_span()
+        if span is not None:
+            target = span._open_step or span
+            target.attributes.update(attributes)
+
+    def traced(self, name: str, **attributes):
+        """Decorator that wraps a function call in a span
+
+        Boolean return values are recorded as the span's "success" attribute.
+        """
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name, **attributes) as span:
+                    result = func(*args, **kwargs)
+                    if isinstance(result, bool):
+                        span.set_attribute("success", result)
+                    return result
+            return wrapper
+        return decorator
+
+    def get_finished_spans(self, name: str = None) -> List[Dict]:
+        """Return finished spans as dicts, optionally filtered by name"""
+        with self._lock:
+            spans = list(self.finished_spans)
+        return [s.to_dict() for s in spans if name is None or s.name == name]
+
+    def export_jsonl(self, path: str) -> int:
+        """Write all finished spans to a JSON lines file"""
+        spans = self.get_finished_spans()
+        with open(path, 'w', encoding='utf-8') as f:
+            for span in spans:
+                f.write(json.dumps(span, ensure_ascii=False, default=str) + "\n")
+        return len(spans)
+
+    def clear(self):
+        """Drop all finished spans"""
+        with self._lock:
+            self.finished_spans.clear()
+
+    def _record(self, span: Span):
+        with self._lock:
+            self.finished_spans.append(span)
+            if self.trace_file:
+                try:
+                    with open(self.trace_file, 'a', encoding='utf-8') as f:
+                        f.write(json.dumps(span.to_dict(), ensure_ascii=False, default=str) + "\n")
+                except Exception as e:
+                    print(f"⚠️ Error writing trace: {e}")
+
+
+class _SpanContext:
+    """Activates a span for the duration of a with-block"""
+
+    def __init__(self, tracer: Tracer, name: str, attributes: Dict):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+        self.span = None
+        self._token = None
+
+    def __enter__(self) -> Span:
+        self.span = self.tracer.start_span(self.name, **self.attributes)
+        self._token = self.tracer._current.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None:
+            self.span.set_error(exc)
+        self.tracer._current.reset(self._token)
+        self.tracer.end_span(self.span)
+        return False
+
+
+# Shared tracer used across the pipeline
+tracer = Tracer(trace_file=config.TRACE_FILE or None)
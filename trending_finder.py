@@ -1,137 +1,270 @@
 """
 Module to find trending topics from free sources
+
+Sources are registered in sources.py and fetched concurrently. requests (and
+feedparser, for malformed feeds) are imported inside the fetch functions so
+that creating a TrendingFinder (e.g. at CLI startup) stays cheap. Feeds and
+listings are parsed while they stream in and the download stops once the
+entries we use are read (see feed_stream.py).
 """
-import requests
-import feedparser
-from typing import List, Dict
-from datetime import datetime
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import zip_longest
+from typing import List, Dict, Optional
 import config
+from tracing import tracer
+from hashtag_index import get_hashtag_index
+from models import Topic
+from sources import get_source, registered_sources
 
 
-class TrendingFinder:
-    """Finds trending topics from various free sources"""
+class TrendingCache:
+    """Process-wide TTL cache of trending results with refresh-ahead
+
+    Entries are keyed by source set and limit. A miss is fetched once even
+    when several callers ask at the same time; a hit older than
+    refresh_ahead * ttl triggers a background refresh so the next caller
+    still gets a warm entry. Callers get a new list of the same Topic
+    records, which are treated as read-only.
+    """
     
-    def __init__(self):
-        self.sources = config.TRENDING_SOURCES
+    def __init__(self, ttl: float, refresh_ahead: float):
+        self.ttl = ttl
+        self.refresh_ahead = refresh_ahead
+        self._entries = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
     
-    def get_reddit_trending(self, limit: int = 5) -> List[Dict]:
-        """Fetch trending topics from Reddit (free, no auth required for public data)"""
-        topics = []
-        try:
-            # Using Reddit's public JSON API (no auth needed for reading)
-            subreddits = ["technology", "programming", "business", "startups", "entrepreneur"]
-            
-            for subreddit in subreddits[:limit]:
-                try:
-                    url = f"https://www.reddit.com/r/{subreddit}/hot.json?limit=3"
-                    headers = {"User-Agent": "LinkedIn-AutoPoster/1.0"}
-                    response = requests.get(url, headers=headers, timeout=10)
-                    
-                    if response.status_code == 200:
-                        data = response.json()
-                        for post in data.get("data", {}).get("children", [])[:2]:
-                            post_data = post.get("data", {})
-                            topics.append({
-                                "title": post_data.get("title", ""),
-                                "url": post_data.get("url", ""),
-                                "score": post_data.get("score", 0),
-                                "subreddit": subreddit,
-                                "source": "reddit",
-                                "timestamp": datetime.now().isoformat()
-                            })
-                except Exception as e:
-                    print(f"Error fetching from r/{subreddit}: {e}")
-                    continue
-        except Exception as e:
-            print(f"Error fetching Reddit trends: {e}")
+    def get(self, key, fetch, force_refresh: bool = False) -> List[Topic]:
+        """Return cached topics for key, calling fetch() on miss/expiry/bypass"""
+        with self._lock:
+            entry = self._entries.get(key)
+            age = time.time() - entry["fetched_at"] if entry else None
+            if entry and not force_refresh and age < self.ttl:
+                if age >= self.ttl * self.refresh_ahead and key not in self._inflight:
+                    self._inflight[key] = threading.Event()
+                    threading.Thread(target=self._refresh, args=(key, fetch), daemon=True).start()
+                return list(entry["topics"])
+            waiter = self._inflight.get(key)
+            if waiter is None:
+                self._inflight[key] = threading.Event()
         
-        return topics[:limit]
+        if waiter is not None:
+            # Someone else is already fetching this key - share their result
+            waiter.wait(timeout=60)
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry:
+                return list(entry["topics"])
+            return fetch()
+        
+        return list(self._refresh(key, fetch))
     
-    def get_news_trending(self, limit: int = 5) -> List[Dict]:
-        """Fetch trending tech/business news from NewsAPI (free tier available)"""
+    def age(self, key) -> Optional[float]:
+        """Seconds since the entry for key was fetched (None if not cached)"""
+        with self._lock:
+            entry = self._entries.get(key)
+        return time.time() - entry["fetched_at"] if entry else None
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def _refresh(self, key, fetch) -> List[Topic]:
         topics = []
         try:
-            if config.NEWSAPI_KEY:
-                url = "https://newsapi.org/v2/top-headlines"
-                params = {
-                    "category": "technology",
-                    "language": "en",
-                    "pageSize": limit,
-                    "apiKey": config.NEWSAPI_KEY
-                }
-                response = requests.get(url, params=params, timeout=10)
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    for article in data.get("articles", []):
-                        topics.append({
-                            "title": article.get("title", ""),
-                            "url": article.get("url", ""),
-                            "description": article.get("description", ""),
-                            "source": "newsapi",
-                            "timestamp": datetime.now().isoformat()
-                        })
-            else:
-                # Fallback to RSS feeds if no API key
-                return self.get_rss_trending(limit)
+            topics = fetch()
         except Exception as e:
-            print(f"Error fetching news trends: {e}")
-        
-        return topics[:limit]
+            print(f"⚠️ Error refreshing trending cache: {e}")
+        finally:
+            with self._lock:
+                # Empty results (e.g. network down) are not cached
+                if topics:
+                    self._entries[key] = {"topics": topics, "fetched_at": time.time()}
+                waiter = self._inflight.pop(key, None)
+            if waiter:
+                waiter.set()
+        return topics
+
+
+# Shared by every TrendingFinder in the process (CLI, Streamlit sessions, scheduler)
+trending_cache = TrendingCache(config.TRENDING_CACHE_TTL, config.TRENDING_REFRESH_AHEAD)
+
+# Endpoint fetches of all sources share one pool; each source limits its own share
+_fetch_pool = ThreadPoolExecutor(max_workers=config.SOURCE_MAX_WORKERS, thread_name_prefix="source")
+# Last result per (source, endpoints, limit, base URLs), for refresh intervals
+_source_results = {}
+_source_results_lock = threading.Lock()
+
+
+class TrendingFinder:
+    """Finds trending topics from various free sources"""
     
-    def get_rss_trending(self, limit: int = 5) -> List[Dict]:
-        """Fetch trending topics from RSS feeds (completely free)"""
-        topics = []
-        rss_feeds = [
+    def __init__(self):
+        self.sources = config.TRENDING_SOURCES
+        # Public endpoints (overridable, e.g. to point at a local fixture server)
+        self.reddit_base_url = "https://www.reddit.com"
+        self.newsapi_url = "https://newsapi.org/v2/top-headlines"
+        self.subreddits = ["technology", "programming", "business", "startups", "entrepreneur"]
+        self.rss_feeds = [
             "https://rss.nytimes.com/services/xml/rss/nyt/Technology.xml",
             "https://feeds.feedburner.com/oreilly/radar",
             "https://techcrunch.com/feed/"
-        ]
-        
-        try:
-            for feed_url in rss_feeds[:limit]:
-                try:
-                    feed = feedparser.parse(feed_url)
-                    for entry in feed.entries[:2]:
-                        topics.append({
-                            "title": entry.get("title", ""),
-                            "url": entry.get("link", ""),
-                            "description": entry.get("description", ""),
-                            "source": "rss",
-                            "timestamp": datetime.now().isoformat()
-                        })
-                except Exception as e:
-                    print(f"Error parsing RSS feed {feed_url}: {e}")
-                    continue
-        except Exception as e:
-            print(f"Error fetching RSS trends: {e}")
-        
-        return topics[:limit]
+        ] + config.EXTRA_RSS_FEEDS
+    
+    def get_reddit_trending(self, limit: int = 5) -> List[Topic]:
+        """Fetch trending topics from Reddit (free, no auth required for public data)"""
+        return self._fetch_sources(["reddit"], limit, force_refresh=True, max_endpoints=limit).get("reddit", [])[:limit]
+    
+    def get_news_trending(self, limit: int = 5) -> List[Topic]:
+        """Fetch trending tech/business news from NewsAPI (free tier available)"""
+        if not config.NEWSAPI_KEY:
+            # Fallback to RSS feeds if no API key
+            return self.get_rss_trending(limit)
+        return self._fetch_sources(["news"], limit, force_refresh=True).get("news", [])[:limit]
     
-    def get_trending_topics(self, limit: int = None) -> List[Dict]:
-        """Get trending topics from all available sources"""
+    def get_rss_trending(self, limit: int = 5) -> List[Topic]:
+        """Fetch trending topics from RSS feeds (completely free)"""
+        return self._fetch_sources(["rss"], limit, force_refresh=True, max_endpoints=limit).get("rss", [])[:limit]
+    
+    @tracer.traced("trending.get_topics")
+    def get_trending_topics(self, limit: int = None, force_refresh: bool = False) -> List[Topic]:
+        """Get trending topics from all enabled sources
+        
+        Sources whose refresh_interval hasn't passed reuse their last result
+        unless force_refresh is set.
+        """
         if limit is None:
             limit = config.TOPICS_TO_FETCH
         
-        all_topics = []
-        
-        if "reddit" in self.sources:
-            all_topics.extend(self.get_reddit_trending(limit))
+        results = self._fetch_sources(self.sources, limit, force_refresh)
+        all_topics = [topic for name in self.sources for topic in results.get(name, [])[:limit]]
         
-        if "news" in self.sources:
-            all_topics.extend(self.get_news_trending(limit))
-        
-        if "rss" in self.sources or not all_topics:
-            all_topics.extend(self.get_rss_trending(limit))
+        if not all_topics:
+            # Nothing from the enabled sources: try the fallback ones (RSS)
+            fallbacks = [name for name in registered_sources()
+                         if get_source(name).fallback and name not in self.sources]
+            results = self._fetch_sources(fallbacks, limit, force_refresh)
+            all_topics = [topic for name in fallbacks for topic in results.get(name, [])[:limit]]
         
         # Remove duplicates and sort by relevance
         unique_topics = []
         seen_titles = set()
         for topic in all_topics:
-            title_lower = topic["title"].lower()
+            title_lower = (topic.title or "").lower()
             if title_lower not in seen_titles and len(title_lower) > 10:
                 seen_titles.add(title_lower)
                 unique_topics.append(topic)
         
+        # Every fetched topic grows the corpus the hashtag engine scores against
+        get_hashtag_index().add_topics(unique_topics)
+        
         return unique_topics[:limit]
+    
+    def _fetch_sources(self, names: List[str], limit: int, force_refresh: bool = False,
+                       max_endpoints: int = None) -> Dict[str, List[Topic]]:
+        """Fetch sources concurrently, each within its own budget and concurrency limit
+        
+        Returns topics per source name, taking entries from each endpoint in
+        turn so no single feed crowds out the others. max_endpoints only
+        fetches the first endpoints of each source.
+        """
+        results = {}
+        runs = {}
+        now = time.time()
+        for name in names:
+            source = get_source(name)
+            if source is None:
+                print(f"⚠️ Unknown trending source '{name}'")
+                continue
+            endpoints = list(source.endpoints(self))[:max_endpoints]
+            # Fetchers build URLs from the finder's base URLs too, so they are part of the key
+            key = (name, tuple(endpoints), limit, self.reddit_base_url, self.newsapi_url)
+            with _source_results_lock:
+                cached = _source_results.get(key)
+            if cached and not force_refresh and now - cached["fetched_at"] < source.refresh_interval:
+                results[name] = list(cached["topics"])
+                continue
+            runs[name] = {
+                "source": source,
+                "key": key,
+                "pending": deque(enumerate(endpoints)),
+                "results": [[] for _ in endpoints],
+                "running": 0,
+                "deadline": now + source.timeout,
+            }
+        
+        inflight = {}
+        
+        def submit_next(name):
+            run = runs[name]
+            source = run["source"]
+            while run["pending"] and run["running"] < source.max_concurrency:
+                remaining = run["deadline"] - time.time()
+                if remaining <= 0:
+                    break
+                position, endpoint = run["pending"].popleft()
+                per_endpoint = source.entries_per_endpoint or limit
+                # Run in a copy of this context so fetch spans nest under the current trace
+                future = _fetch_pool.submit(contextvars.copy_context().run, source.fetch, self, endpoint,
+                                            per_endpoint, min(source.request_timeout, remaining))
+                inflight[future] = (name, position)
+                run["running"] += 1
+        
+        for name in runs:
+            submit_next(name)
+        
+        while inflight:
+            active = {name for name, _ in inflight.values()}
+            wait_for = max(0.0, min(runs[name]["deadline"] for name in active) - time.time())
+            done, _ = wait(list(inflight), timeout=wait_for, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, position = inflight.pop(future)
+                run = runs[name]
+                run["running"] -= 1
+                try:
+                    # Sources registered elsewhere may still return plain dicts
+                    run["results"][position] = [Topic.from_dict(t) for t in future.result() or []]
+                except Exception as e:
+                    print(f"⚠️ Error fetching {name} source: {e}")
+                submit_next(name)
+            # Sources out of budget give up on whatever is still running or queued
+            for name in active:
+                run = runs[name]
+                if time.time() >= run["deadline"] and (run["running"] or run["pending"]):
+                    skipped = run["running"] + len(run["pending"])
+                    print(f"⏱️ {name}: {run['source'].timeout:g}s budget used up, skipped {skipped} endpoint(s)")
+                    for future in [f for f, (n, _) in inflight.items() if n == name]:
+                        del inflight[future]
+                    run["pending"].clear()
+                    run["running"] = 0
+        
+        for name, run in runs.items():
+            # Round-robin over endpoints
+            topics = [topic for group in zip_longest(*run["results"]) for topic in group if topic is not None]
+            results[name] = topics
+            if topics:
+                with _source_results_lock:
+                    _source_results[run["key"]] = {"topics": topics, "fetched_at": time.time()}
+        return results
+    
+    def _cache_key(self, limit: int):
+        return (tuple(sorted(self.sources)), limit, self.reddit_base_url, self.newsapi_url,
+                tuple(self.subreddits), tuple(self.rss_feeds))
+    
+    def get_cached_trending_topics(self, limit: int = None, force_refresh: bool = False) -> List[Topic]:
+        """Get trending topics through the shared TTL cache (force_refresh bypasses it)"""
+        if limit is None:
+            limit = config.TOPICS_TO_FETCH
+        # force_refresh bypasses the shared cache; sources still honour their refresh intervals
+        return trending_cache.get(self._cache_key(limit), lambda: self.get_trending_topics(limit), force_refresh)
+    
+    def cache_age(self, limit: int = None) -> Optional[float]:
+        """Seconds since the cached result for this limit was fetched"""
+        if limit is None:
+            limit = config.TOPICS_TO_FETCH
+        return trending_cache.age(self._cache_key(limit))
 